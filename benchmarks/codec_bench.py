@@ -0,0 +1,45 @@
+from timeit import repeat
+
+from chordlite import \
+    IPEndpointId, ResourceKey, ChordRequest, ChordResponse, ChordRequestType
+from chordlite.key import SHA256_KEYSPACE
+from chordlite.http_msg import JSON_CODEC, BINARY_CODEC, ChordCodec
+
+
+def create_messages():
+    request = ChordRequest(
+        ChordRequestType.JOIN,
+        IPEndpointId("10.0.0.2", "5555"),
+        IPEndpointId("10.0.0.3", "5555"),
+        IPEndpointId("10.0.0.1", "5555"),
+        ResourceKey((1 << 255) + 12345),
+        IPEndpointId("10.0.0.4", "5555"),
+        IPEndpointId("10.0.0.5", "5555")
+    )
+    response = ChordResponse(
+        IPEndpointId("10.0.0.2", "5555"),
+        IPEndpointId("10.0.0.3", "5555"),
+        IPEndpointId("10.0.0.1", "5555")
+    )
+    return request, response
+
+
+def bench_codec(codec: ChordCodec, num_ops: int=20_000):
+    request, response = create_messages()
+    ser_request = codec.serialize_request(request)
+    ser_response = codec.serialize_response(response)
+
+    def round_trip():
+        codec.deserialize_request(codec.serialize_request(request), SHA256_KEYSPACE)
+        codec.deserialize_response(codec.serialize_response(response), SHA256_KEYSPACE)
+
+    secs = min(repeat(round_trip, number=num_ops, repeat=3))
+    print(f"{codec.content_type}")
+    print(f"  request size:  {len(ser_request):5d} bytes")
+    print(f"  response size: {len(ser_response):5d} bytes")
+    print(f"  round trips:   {num_ops / secs:8.0f} ops/s")
+
+
+if __name__ == "__main__":
+    bench_codec(JSON_CODEC)
+    bench_codec(BINARY_CODEC)
@@ -0,0 +1,46 @@
+from json import dumps
+from time import perf_counter
+from random import Random
+
+from chordlite import IPEndpointId, VirtualNetwork, create_ring
+from dht_service.dht import DHTService
+from dht_service.virtual_http import VirtualHttpNetwork
+
+
+def create_services(num_nodes: int):
+    network, http = VirtualNetwork(), VirtualHttpNetwork()
+    nodes = create_ring(network, [IPEndpointId(f"10.0.{i // 256}.{i % 256}", "5555")
+                                  for i in range(num_nodes)])
+
+    services = [DHTService(n, http, lambda body, status: (body, status), dht_port=5555)
+                for n in nodes]
+    for service in services:
+        service.activate()
+        http.register_service(f"{service.node.node_id.ip_address}:5555", service.routes)
+    return services
+
+
+def bench_inserts(num_nodes: int=32, num_keys: int=20_000, batch_size: int=1000):
+    rng = Random(42)
+    keys = [rng.getrandbits(256) for _ in range(num_keys)]
+    coordinator = create_services(num_nodes)[0]
+
+    start = perf_counter()
+    for key in keys[:num_keys // 10]:
+        coordinator.insert(dumps({"resource_id": key, "value": "x"}).encode("utf-8"))
+    single_rate = (num_keys // 10) / (perf_counter() - start)
+
+    start = perf_counter()
+    for i in range(0, num_keys, batch_size):
+        coordinator.multi_insert(dumps({
+            "resources": [{"resource_id": k, "value": "x"} for k in keys[i:i+batch_size]]
+        }).encode("utf-8"))
+    batch_rate = num_keys / (perf_counter() - start)
+
+    print(f"{num_nodes} nodes, replication factor {coordinator.replication_factor}")
+    print(f"  /insert:            {single_rate:8.0f} keys/s")
+    print(f"  /mput ({batch_size} keys): {batch_rate:8.0f} keys/s")
+
+
+if __name__ == "__main__":
+    bench_inserts()
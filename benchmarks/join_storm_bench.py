@@ -0,0 +1,129 @@
+from dataclasses import dataclass, field
+from random import Random
+from statistics import quantiles
+from threading import Lock, Thread
+from time import perf_counter, sleep
+from typing import Callable, Dict, List, Set
+
+from chordlite import \
+    IPEndpointId, VirtualNetwork, NetworkedChordNode, ChordRemoteEndpoint, \
+    ChordRequest, ChordResponse, nearest_member
+
+KEYSPACE = 1 << 32
+BootstrapSelection = Callable[[IPEndpointId, Set[IPEndpointId]], IPEndpointId]
+
+
+@dataclass
+class BusyNode:
+    """Serves one message at a time and takes service_secs for each, so the
+    nodes receiving most of the joins queue up like real servers would."""
+    node: NetworkedChordNode
+    service_secs: float
+    num_messages: int = 0
+    mutex: Lock = field(default_factory=Lock)
+
+    @property
+    def node_id(self) -> IPEndpointId:
+        return self.node.node_id
+
+    def process_message(self, message: ChordRequest) -> ChordResponse:
+        # only the service time is serialized, forwarded requests
+        # mustn't wait for the worker of the node forwarding them
+        with self.mutex:
+            self.num_messages += 1
+            if self.service_secs > 0:
+                sleep(self.service_secs)
+        return self.node.process_message(message)
+
+
+def create_nodes(num_nodes: int, network: VirtualNetwork, service_secs: float,
+                 rng: Random, **node_options) -> List[BusyNode]:
+    nodes = []
+    for _ in range(num_nodes):
+        address = ".".join(str(rng.randrange(256)) for _ in range(3))
+        node_id = IPEndpointId(f"10.{address}", "5555", KEYSPACE)
+        node = NetworkedChordNode(node_id, network, **node_options)
+        nodes.append(BusyNode(node, service_secs))
+        network.register_node(nodes[-1])
+    return nodes
+
+
+def stabilize_until_converged(nodes: List[NetworkedChordNode]) -> int:
+    sorted_ids = sorted(n.node_id for n in nodes)
+    by_id = { n.node_id: n for n in nodes }
+    def is_converged() -> bool:
+        return all(by_id[node_id].node.successor.node_id == sorted_ids[(i + 1) % len(nodes)]
+                   for i, node_id in enumerate(sorted_ids))
+    rounds = 0
+    while not is_converged():
+        for node in nodes:
+            node.node.stabilize()
+        rounds += 1
+    return rounds
+
+
+def join_storm(num_members: int, num_joiners: int, select: BootstrapSelection,
+               service_secs: float=0.0005, **node_options) -> Dict[str, float]:
+    network, rng = VirtualNetwork(), Random(42)
+    members = create_nodes(num_members, network, 0.0, rng, **node_options)
+    for member in members:
+        member.node.node.initiate_join(
+            ChordRemoteEndpoint(member.node_id, members[0].node_id, network))
+    stabilize_until_converged([m.node for m in members])
+    for member in members:
+        member.node.node.update_finger_table()
+        member.service_secs = service_secs
+
+    joiners = create_nodes(num_joiners, network, service_secs, rng, **node_options)
+    member_ids = {m.node_id for m in members}
+    latencies: List[float] = []
+
+    def join(joiner: BusyNode):
+        start = perf_counter()
+        bootstrap_id = select(joiner.node_id, member_ids)
+        joiner.node.node.initiate_join(ChordRemoteEndpoint(joiner.node_id, bootstrap_id, network))
+        latencies.append(perf_counter() - start)
+
+    start = perf_counter()
+    threads = [Thread(target=join, args=(joiner,)) for joiner in joiners]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    storm_secs = perf_counter() - start
+
+    nodes = members + joiners
+    rounds = stabilize_until_converged([n.node for n in nodes])
+    return {
+        "storm_secs": storm_secs,
+        "p50_secs": quantiles(latencies, n=100)[49],
+        "p99_secs": quantiles(latencies, n=100)[98],
+        "hottest_share": max(n.num_messages for n in nodes) / sum(n.num_messages for n in nodes),
+        "rejected": sum(n.node.node.admission.num_rejected for n in nodes
+                        if n.node.node.admission is not None),
+        "stabilize_rounds": rounds
+    }
+
+
+def bench_join_storm(num_joiners: int=128):
+    smallest_member: BootstrapSelection = lambda node_id, member_ids: min(member_ids)
+    settings = {
+        "smallest member": (smallest_member, {}),
+        "nearest member": (nearest_member, {}),
+        "nearest member + pending limit": (nearest_member, {"max_pending_joins": 2}),
+        "nearest member + rate limit": (nearest_member, {"join_rate_limit": 200.0}),
+    }
+    for num_members in [1, 16]:
+        print(f"{num_joiners} nodes joining a ring of {num_members} at once")
+        for label, (select, options) in settings.items():
+            result = join_storm(num_members, num_joiners, select, **options)
+            print(f"{label:>32}: {result['storm_secs']:6.2f} s, "
+                  f"p50 {result['p50_secs'] * 1000:7.1f} ms, "
+                  f"p99 {result['p99_secs'] * 1000:7.1f} ms, "
+                  f"hottest node {result['hottest_share'] * 100:4.1f}% of messages, "
+                  f"{result['rejected']} rejected, "
+                  f"{result['stabilize_rounds']} stabilize rounds")
+
+
+if __name__ == "__main__":
+    bench_join_storm()
@@ -0,0 +1,67 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from timeit import repeat
+from random import Random
+from typing import Union
+
+from chordlite.key import SHA256_KEYSPACE, ResourceKey, ring_distance
+
+
+@dataclass(unsafe_hash=True)
+class LegacyResourceKey:
+    """The dataclass-based key that ResourceKey replaced, kept as a reference."""
+    value: int
+    keyspace: int = SHA256_KEYSPACE
+
+    def __post_init__(self):
+        if self.value < 0:
+            self.value += ((self.value // self.keyspace) + 1) * self.keyspace
+        self.value = self.value % self.keyspace
+
+    def __sub__(self, other: Union[int, LegacyResourceKey]) -> LegacyResourceKey:
+        other_value = other if isinstance(other, int) else other.value
+        new_value = (self.value - other_value) % self.keyspace
+        return LegacyResourceKey(new_value, self.keyspace)
+
+    def __le__(self, other: Union[int, LegacyResourceKey]) -> bool:
+        other_value = other if isinstance(other, int) else other.value
+        return self.value <= other_value
+
+
+def best_of(func, num_ops: int, repetitions: int=5) -> float:
+    return min(repeat(func, number=num_ops, repeat=repetitions))
+
+
+def bench_routing_check(num_ops: int=200_000):
+    """Benchmark the 'key in [node, successor]' check of find_predecessor."""
+    rng = Random(0)
+    node, succ, key = [rng.randrange(SHA256_KEYSPACE) for _ in range(3)]
+
+    l_node, l_succ, l_key = [LegacyResourceKey(v) for v in (node, succ, key)]
+    legacy = best_of(lambda: l_key - l_node <= l_succ - l_node, num_ops)
+
+    r_node, r_succ, r_key = [ResourceKey(v) for v in (node, succ, key)]
+    objects = best_of(lambda: r_key - r_node <= r_succ - r_node, num_ops)
+
+    raw = best_of(lambda: ring_distance(node, key, SHA256_KEYSPACE) \
+        <= ring_distance(node, succ, SHA256_KEYSPACE), num_ops)
+
+    print(f"routing check ({num_ops} ops)")
+    print(f"  legacy dataclass keys: {num_ops / legacy:12.0f} ops/s")
+    print(f"  slotted keys:          {num_ops / objects:12.0f} ops/s ({legacy / objects:.1f}x)")
+    print(f"  raw-int helpers:       {num_ops / raw:12.0f} ops/s ({legacy / raw:.1f}x)")
+
+
+def bench_key_creation(num_ops: int=200_000):
+    value = Random(0).randrange(SHA256_KEYSPACE)
+    legacy = best_of(lambda: LegacyResourceKey(-value), num_ops)
+    slotted = best_of(lambda: ResourceKey(-value), num_ops)
+
+    print(f"key creation ({num_ops} ops)")
+    print(f"  legacy dataclass keys: {num_ops / legacy:12.0f} ops/s")
+    print(f"  slotted keys:          {num_ops / slotted:12.0f} ops/s ({legacy / slotted:.1f}x)")
+
+
+if __name__ == "__main__":
+    bench_routing_check()
+    bench_key_creation()
@@ -0,0 +1,41 @@
+from json import dumps
+from time import perf_counter
+
+from chordlite import IPEndpointId, VirtualNetwork, NetworkedChordNode, ChordRemoteEndpoint
+from dht_service.dht import DHTService
+from dht_service.virtual_http import VirtualHttpNetwork
+
+
+def bench_migration(num_keys: int=50_000, chunk_size: int=1000, value_size: int=100):
+    network, http = VirtualNetwork(), VirtualHttpNetwork()
+    ids = sorted([IPEndpointId(f"10.0.0.{i}", "5555") for i in range(2)], key=lambda i: i.key)
+    newcomer, old_owner = [
+        DHTService(NetworkedChordNode(i, network), http, lambda body, status: (body, status),
+                   dht_port=5555, replication_factor=1, write_quorum=1, read_quorum=1,
+                   transfer_chunk_size=chunk_size)
+        for i in ids]
+    for service in [old_owner, newcomer]:
+        network.register_node(service.node)
+        http.register_service(f"{service.node.node_id.ip_address}:5555", service.routes)
+        service.activate()
+
+    # the small keys belong to the newcomer with the lower id once it joined
+    value = "x" * value_size
+    for key in range(num_keys):
+        old_owner.local_data[key] = dumps([1, False, value])
+    old_owner.node.node.initiate_join(old_owner.node.node)
+    newcomer.node.node.initiate_join(
+        ChordRemoteEndpoint(newcomer.node.node_id, old_owner.node.node_id, network))
+
+    start = perf_counter()
+    progress, = newcomer.migrate_in()
+    secs = perf_counter() - start
+    print(f"{progress.num_keys} keys in {progress.num_chunks} chunks of {chunk_size}")
+    print(f"  throughput: {progress.num_keys / secs:8.0f} keys/s, "
+          f"{progress.num_bytes / secs / 2**20:6.1f} MiB/s")
+
+
+if __name__ == "__main__":
+    bench_migration(chunk_size=100)
+    bench_migration(chunk_size=1000)
+    bench_migration(chunk_size=10000)
@@ -0,0 +1,65 @@
+from statistics import mean, quantiles
+from random import Random
+from typing import List, Optional
+
+from chordlite import IPEndpointId, VirtualNetwork, NetworkedChordNode, ResourceKey, create_ring
+
+REGIONS = 4
+KEYSPACE = 1 << 32
+
+
+def region_of(endpoint: IPEndpointId) -> int:
+    return int(endpoint.ip_address.split(".")[-2])
+
+
+def region_latency(sender: Optional[IPEndpointId], receiver: IPEndpointId) -> float:
+    """One-way delay of 2 ms within a region and 20-60 ms across regions."""
+    if sender is None:
+        return 0.0
+    gap = abs(region_of(sender) - region_of(receiver))
+    return 0.002 if gap == 0 else 0.02 * gap
+
+
+def create_region_ring(num_nodes: int, **node_options) -> List[NetworkedChordNode]:
+    network = VirtualNetwork(latency=region_latency)
+    node_ids = [IPEndpointId(f"10.0.{i % REGIONS}.{i // REGIONS}", "5555", KEYSPACE)
+                for i in range(num_nodes)]
+    # all nodes share one virtual clock, so setting up the ring alone would
+    # age out the RTT estimates long before the lookups
+    nodes = create_ring(network, node_ids, location_cache_size=0, clock=network.clock,
+                        successor_list_size=8, rtt_max_age_secs=float("inf"), **node_options)
+    # the first pass probes the candidates of unknown RTT in the background
+    for _ in range(2):
+        for node in nodes:
+            node.node.fix_fingers(len(node.node.fingers))
+            node.prober.drain()
+    return nodes
+
+
+def lookup_latencies(nodes: List[NetworkedChordNode], num_lookups: int) -> List[float]:
+    rng = Random(42)
+    clock = nodes[0].clock
+    latencies = []
+    for _ in range(num_lookups):
+        node = rng.choice(nodes)
+        start = clock()
+        node.lookup(ResourceKey(rng.randrange(KEYSPACE), KEYSPACE))
+        latencies.append(clock() - start)
+    return latencies
+
+
+def bench_proximity_routing(num_nodes: int=256, num_lookups: int=2000):
+    print(f"lookup latency on {num_nodes} nodes in {REGIONS} regions")
+    settings = {
+        "baseline": {},
+        "proximity fingers": {"pns_candidates": 8},
+        "proximity fingers + hops": {"pns_candidates": 8, "proximity_hops": 3},
+    }
+    for label, options in settings.items():
+        latencies = lookup_latencies(create_region_ring(num_nodes, **options), num_lookups)
+        p95 = quantiles(latencies, n=20)[-1]
+        print(f"{label:>26}: mean {mean(latencies) * 1000:6.1f} ms, p95 {p95 * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    bench_proximity_routing()
@@ -0,0 +1,30 @@
+from json import dumps
+from time import perf_counter
+
+from chordlite.simulation import RingSimulation, ChurnEvent, region_latency
+
+
+def bench_ring_simulation(num_nodes: int=10_000, duration_secs: float=30.0):
+    sim = RingSimulation(
+        num_nodes, latency=region_latency(4, 0.005, 0.05), maintenance_interval_secs=10.0)
+    start = perf_counter()
+    sim.build_ring()
+    build_secs = perf_counter() - start
+
+    # 1% of the nodes join and another 1% leave gracefully
+    churn = max(1, num_nodes // 100)
+    sim.schedule_churn([ChurnEvent(10.0, joins=churn), ChurnEvent(15.0, leaves=churn)])
+    sim.schedule_lookups(100, 0.0, duration_secs)
+    start = perf_counter()
+    report = sim.run(duration_secs)
+    run_secs = perf_counter() - start
+
+    num_messages = sum(report.messages.values())
+    print(f"{num_nodes} nodes, {duration_secs:.0f} s simulated")
+    print(f"  built ring in {build_secs:.1f} s, simulated in {run_secs:.1f} s "
+          f"({num_messages / run_secs:.0f} messages/s)")
+    print(dumps(report.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    bench_ring_simulation()
@@ -0,0 +1,51 @@
+import logging
+from http.client import HTTPConnection
+from threading import Thread
+from time import sleep, perf_counter
+
+from dht_service.server import PooledWSGIServer
+
+
+def io_bound_app(environ, start_response):
+    # simulates a handler waiting on the next chord hop
+    environ["wsgi.input"].read(int(environ.get("CONTENT_LENGTH") or 0))
+    sleep(0.005)
+    start_response("200 OK", [("Content-Length", "2")])
+    return [b"ok"]
+
+
+def run_load(num_workers: int, num_clients: int=32, duration_secs: float=2.0):
+    server = PooledWSGIServer(
+        "127.0.0.1", 0, io_bound_app, num_workers=num_workers,
+        max_queue_size=num_clients)
+    server_thread = Thread(target=server.serve_forever)
+    server_thread.start()
+
+    counts = [0 for _ in range(num_clients)]
+    deadline = perf_counter() + duration_secs
+
+    def client(i: int):
+        while perf_counter() < deadline:
+            conn = HTTPConnection("127.0.0.1", server.port, timeout=10)
+            conn.request("POST", "/lookup", body=b"{}", headers={"Connection": "close"})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            counts[i] += 1 if response.status == 200 else 0
+
+    clients = [Thread(target=client, args=(i,)) for i in range(num_clients)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    server.shutdown()
+    server_thread.join()
+
+    print(f"{num_workers:3d} workers: {sum(counts) / duration_secs:8.0f} req/s, "
+          f"{server.num_rejected} rejected")
+
+
+if __name__ == "__main__":
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    for workers in [1, 2, 4, 8, 16, 32]:
+        run_load(workers)
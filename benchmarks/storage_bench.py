@@ -0,0 +1,42 @@
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+from random import Random
+from tempfile import TemporaryDirectory
+
+from dht_service.storage import StorageBackend, DictStorage, LogStructuredStorage
+
+
+def bench_storage(name: str, storage: StorageBackend,
+                  num_ops: int=20_000, num_writers: int=1):
+    rng = Random(42)
+    keys = [rng.getrandbits(256) for _ in range(num_ops)]
+    value = "x" * 100
+
+    start = perf_counter()
+    with ThreadPoolExecutor(num_writers) as pool:
+        for start_id in range(num_writers):
+            pool.submit(lambda i: [storage.__setitem__(k, value)
+                                   for k in keys[i::num_writers]], start_id)
+    insert_secs = perf_counter() - start
+
+    rng.shuffle(keys)
+    start = perf_counter()
+    for key in keys:
+        _ = storage[key]
+    lookup_secs = perf_counter() - start
+    storage.close()
+
+    print(f"{name}")
+    print(f"  inserts: {num_ops / insert_secs:10.0f} ops/s")
+    print(f"  lookups: {num_ops / lookup_secs:10.0f} ops/s")
+
+
+if __name__ == "__main__":
+    bench_storage("dict", DictStorage())
+    with TemporaryDirectory() as data_dir:
+        bench_storage("log (no fsync)", LogStructuredStorage(data_dir, sync_writes=False))
+    with TemporaryDirectory() as data_dir:
+        bench_storage("log (fsync, 1 writer)", LogStructuredStorage(data_dir), num_ops=2_000)
+    with TemporaryDirectory() as data_dir:
+        bench_storage("log (fsync, 16 writers)", LogStructuredStorage(data_dir),
+                      num_ops=2_000, num_writers=16)
@@ -0,0 +1,296 @@
+"""Reproducible benchmark suite for routing, joins, codecs and the DHT.
+
+Every case runs a seeded workload and records ops/s, p50/p99 latency,
+hop counts where the case routes messages, and the peak memory allocated
+per operation. Results are saved as JSON and can be compared against a
+stored baseline, so performance regressions fail the run:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+"""
+import argparse
+import platform
+import sys
+import tracemalloc
+from dataclasses import dataclass, field, asdict
+from itertools import accumulate
+from json import dumps, loads
+from random import Random
+from threading import Thread
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+from chordlite import ResourceKey, ChordRemoteEndpoint, VirtualNetwork
+from chordlite.key import SHA256_KEYSPACE
+from chordlite.http_msg import JSON_CODEC, BINARY_CODEC, ChordCodec
+from chordlite.simulation import RingSimulation, percentile
+from benchmarks.codec_bench import create_messages
+from benchmarks.dht_batch_bench import create_services
+from benchmarks.join_storm_bench import create_nodes
+
+# an op returns the number of hops or messages it took, if it routes any
+BenchOp = Callable[[int], Optional[int]]
+
+
+@dataclass
+class BenchResult:
+    name: str
+    ops: int
+    ops_per_sec: float
+    p50_secs: float
+    p99_secs: float
+    mean_hops: Optional[float]
+    alloc_bytes_per_op: Optional[float]
+    extra: Dict[str, float] = field(default_factory=dict)
+
+
+class KeyWorkload:
+    """Seeded keys drawn from a fixed population of random keys, either
+    uniformly or Zipf distributed, i.e. a few hot keys take most requests."""
+
+    def __init__(self, distribution: str, keyspace: int, seed: int=42,
+                 population: int=10_000, zipf_exponent: float=1.1):
+        self.distribution, self.keyspace = distribution, keyspace
+        self.rng = Random(seed)
+        self.population = [self.rng.randrange(keyspace) for _ in range(population)]
+        self.cum_weights = list(accumulate(
+            1 / rank ** zipf_exponent for rank in range(1, population + 1)))
+
+    def next_value(self) -> int:
+        if self.distribution == "uniform":
+            return self.rng.choice(self.population)
+        return self.rng.choices(self.population, cum_weights=self.cum_weights)[0]
+
+    def next_key(self) -> ResourceKey:
+        return ResourceKey(self.next_value(), self.keyspace)
+
+
+def run_case(name: str, op: BenchOp, num_ops: int,
+             repeats: int=3, alloc_samples: int=50) -> BenchResult:
+    # the fastest of a few runs is the least disturbed by other processes
+    best_secs, latencies, hops = float("inf"), [], []
+    for repeat in range(repeats):
+        run_latencies, run_hops = [], []
+        start = perf_counter()
+        for i in range(repeat * num_ops, (repeat + 1) * num_ops):
+            op_start = perf_counter()
+            num_hops = op(i)
+            run_latencies.append(perf_counter() - op_start)
+            if num_hops is not None:
+                run_hops.append(num_hops)
+        total_secs = perf_counter() - start
+        if total_secs < best_secs:
+            best_secs, latencies, hops = total_secs, run_latencies, run_hops
+
+    # tracing allocations slows things down, so it gets its own short run
+    tracemalloc.start()
+    peaks = []
+    for i in range(alloc_samples):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        op(repeats * num_ops + i)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return BenchResult(
+        name, num_ops, num_ops / best_secs,
+        percentile(latencies, 0.5), percentile(latencies, 0.99),
+        sum(hops) / len(hops) if hops else None,
+        sum(peaks) / len(peaks))
+
+
+def routing_cases(num_nodes: int, num_ops: int) -> List[BenchResult]:
+    sim = RingSimulation(num_nodes)
+    sim.build_ring()
+    node_ids = sim.live_ids
+    results = []
+
+    for distribution in ["uniform", "zipf"]:
+        workload = KeyWorkload(distribution, sim.keyspace)
+        rng = Random(7)
+
+        def find_successor(_: int) -> int:
+            sim.hops = 0
+            sim.nodes[rng.choice(node_ids)].node.find_successor(workload.next_key())
+            return sim.hops
+
+        results.append(run_case(
+            f"routing/find_successor/{distribution}/n={num_nodes}", find_successor, num_ops))
+
+    rng = Random(7)
+
+    def update_finger_table(_: int) -> int:
+        sent = sum(sim.messages.values())
+        sim.nodes[rng.choice(node_ids)].node.update_finger_table()
+        return sum(sim.messages.values()) - sent
+
+    results.append(run_case(
+        f"routing/update_finger_table/n={num_nodes}", update_finger_table,
+        max(10, num_ops // 20), alloc_samples=10))
+    return results
+
+
+def concurrent_join_case(num_nodes: int, num_threads: int=8, service_secs: float=0.0002,
+                         repeats: int=3) -> BenchResult:
+    runs = [join_ring(num_nodes, num_threads, service_secs) for _ in range(repeats)]
+    result = max(runs, key=lambda result: result.ops_per_sec)
+    # tracing allocations slows the joins down, so it gets its own run
+    result.alloc_bytes_per_op = \
+        join_ring(num_nodes, num_threads, service_secs, trace_allocs=True).alloc_bytes_per_op
+    return result
+
+
+def join_ring(num_nodes: int, num_threads: int, service_secs: float,
+              trace_allocs: bool=False) -> BenchResult:
+    # nodes serve one message at a time, so joins at the same node queue up
+    network = VirtualNetwork()
+    nodes = [n.node for n in create_nodes(num_nodes, network, service_secs, Random(42))]
+    bootstrap_id = nodes[0].node_id
+    latencies: List[float] = []
+
+    def join_all(offset: int):
+        for node in nodes[1 + offset::num_threads]:
+            start = perf_counter()
+            node.node.initiate_join(ChordRemoteEndpoint(node.node_id, bootstrap_id, network))
+            latencies.append(perf_counter() - start)
+
+    if trace_allocs:
+        tracemalloc.start()
+    start = perf_counter()
+    threads = [Thread(target=join_all, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    join_secs = perf_counter() - start
+    # joins overlap, so the peak of the whole run gets shared among them
+    alloc_bytes_per_op = None
+    if trace_allocs:
+        alloc_bytes_per_op = tracemalloc.get_traced_memory()[1] / len(latencies)
+        tracemalloc.stop()
+
+    # stabilize until every node has its true neighbors
+    sorted_ids = sorted(n.node_id for n in nodes)
+    by_id = { n.node_id: n for n in nodes }
+    def is_converged() -> bool:
+        return all(by_id[node_id].node.successor.node_id == sorted_ids[(i + 1) % num_nodes]
+                   and by_id[node_id].node.predecessor.node_id == sorted_ids[i - 1]
+                   for i, node_id in enumerate(sorted_ids))
+
+    start, rounds = perf_counter(), 0
+    while not is_converged():
+        for node in nodes:
+            node.node.stabilize()
+        rounds += 1
+    convergence_secs = perf_counter() - start
+
+    return BenchResult(
+        f"join/concurrent/n={num_nodes}", len(latencies), len(latencies) / join_secs,
+        percentile(latencies, 0.5), percentile(latencies, 0.99), None, alloc_bytes_per_op,
+        {"stabilize_rounds": rounds, "convergence_secs": convergence_secs,
+         "service_secs": service_secs})
+
+
+def codec_cases(codec: ChordCodec, num_ops: int) -> List[BenchResult]:
+    request, response = create_messages()
+    name = "json" if codec is JSON_CODEC else "binary"
+
+    def request_round_trip(_: int):
+        codec.deserialize_request(codec.serialize_request(request), SHA256_KEYSPACE)
+
+    def response_round_trip(_: int):
+        codec.deserialize_response(codec.serialize_response(response), SHA256_KEYSPACE)
+
+    return [run_case(f"codec/{name}/request", request_round_trip, num_ops),
+            run_case(f"codec/{name}/response", response_round_trip, num_ops)]
+
+
+def dht_cases(num_nodes: int, num_ops: int) -> List[BenchResult]:
+    services = create_services(num_nodes)
+    results = []
+    for distribution in ["uniform", "zipf"]:
+        workload = KeyWorkload(distribution, SHA256_KEYSPACE)
+        rng = Random(7)
+
+        def insert(i: int):
+            rng.choice(services).insert(dumps(
+                {"resource_id": workload.next_value(), "value": i}).encode("utf-8"))
+
+        def lookup(_: int):
+            rng.choice(services).lookup(dumps(
+                {"resource_id": workload.next_value()}).encode("utf-8"))
+
+        results.append(run_case(f"dht/insert/{distribution}/n={num_nodes}", insert, num_ops))
+        results.append(run_case(f"dht/lookup/{distribution}/n={num_nodes}", lookup, num_ops))
+    return results
+
+
+def run_suite(ring_sizes: List[int], num_ops: int) -> List[BenchResult]:
+    results = []
+    for num_nodes in ring_sizes:
+        results += routing_cases(num_nodes, num_ops)
+    results.append(concurrent_join_case(64))
+    results += codec_cases(JSON_CODEC, num_ops * 10)
+    results += codec_cases(BINARY_CODEC, num_ops * 10)
+    results += dht_cases(16, num_ops // 2)
+    return results
+
+
+def compare(results: List[BenchResult], baseline: dict, tolerance: float) -> List[str]:
+    """Cases that got slower than the baseline by more than the tolerance."""
+    baseline_cases = { case["name"]: case for case in baseline["results"] }
+    regressions = []
+    for result in results:
+        old = baseline_cases.get(result.name)
+        if old is None:
+            continue
+        if result.ops_per_sec < old["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{result.name}: {result.ops_per_sec:.0f} ops/s, "
+                               f"baseline {old['ops_per_sec']:.0f} ops/s")
+        # p99 of sub-millisecond ops is mostly scheduler noise, so gate on p50
+        if result.p50_secs > old["p50_secs"] * (1 + tolerance):
+            regressions.append(f"{result.name}: p50 {result.p50_secs * 1000:.3f} ms, "
+                               f"baseline {old['p50_secs'] * 1000:.3f} ms")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", default="64,1024,10000",
+                        help="comma separated ring sizes of the routing cases")
+    parser.add_argument("--ops", type=int, default=2000, help="operations per case")
+    parser.add_argument("--output", help="file to save the results to")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    results = run_suite([int(size) for size in args.sizes.split(",")], args.ops)
+    for result in results:
+        hops = f"{result.mean_hops:5.2f}" if result.mean_hops is not None else "    -"
+        alloc = f"{result.alloc_bytes_per_op / 1024:7.1f}" \
+            if result.alloc_bytes_per_op is not None else "      -"
+        print(f"{result.name:>40}: {result.ops_per_sec:9.0f} ops/s, "
+              f"p50 {result.p50_secs * 1000:8.3f} ms, p99 {result.p99_secs * 1000:8.3f} ms, "
+              f"hops {hops}, {alloc} KiB/op")
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": [asdict(result) for result in results]
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            regressions = compare(results, loads(file.read()), args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+from statistics import mean, pstdev
+from typing import Dict, List
+
+from chordlite import IPEndpointId, ring_distance
+from chordlite.key import SHA256_KEYSPACE
+
+
+def keyspace_shares(num_vnodes: Dict[str, int]) -> Dict[str, float]:
+    """Share of the keyspace owned by each host, i.e. the summed lengths
+    of the arcs (predecessor, vnode] of all its vnodes."""
+    positions = sorted(
+        (IPEndpointId(ip, "5555", vnode=v).value, ip)
+        for ip, count in num_vnodes.items() for v in range(count))
+    shares = { ip: 0.0 for ip in num_vnodes }
+    for (pred, _), (pos, ip) in zip(positions[-1:] + positions[:-1], positions):
+        shares[ip] += ring_distance(pred, pos, SHA256_KEYSPACE) / SHA256_KEYSPACE
+    return shares
+
+
+def report(label: str, shares: List[float]):
+    avg = mean(shares)
+    print(f"{label:>28}: std dev {pstdev(shares) / avg:6.1%} of mean, "
+          f"max {max(shares) / avg:5.2f}x mean")
+
+
+def bench_vnode_balance(num_hosts: int=10):
+    hosts = [f"10.0.0.{i}" for i in range(num_hosts)]
+    print(f"keyspace share of {num_hosts} hosts")
+    for vnodes in [1, 2, 4, 8, 16, 32, 64, 128]:
+        shares = keyspace_shares({ ip: vnodes for ip in hosts })
+        report(f"{vnodes} vnodes", list(shares.values()))
+
+    # half of the hosts are twice as big, so they should own twice as much
+    weights = { ip: 1 + i % 2 for i, ip in enumerate(hosts) }
+    shares = keyspace_shares({ ip: 32 * w for ip, w in weights.items() })
+    report("weighted 32/64 vnodes", [shares[ip] / w for ip, w in weights.items()])
+
+
+if __name__ == "__main__":
+    bench_vnode_balance()
@@ -1,10 +1,28 @@
-from chordlite.key import ChordKey, ResourceKey
-from chordlite.endpoint import IPEndpointId, local_endpoint
-from chordlite.node import ChordNode, ChordStatus
+from chordlite.key import ChordKey, ResourceKey, ring_distance, in_interval
+from chordlite.endpoint import \
+    IPEndpointId, EndpointRegistry, intern_endpoint, local_endpoint
+from chordlite.node import \
+    ChordNode, ChordStatus, FingerIndex, RoutingFailure, PeerUnreachable, PeerBusy, ServerBusy
+from chordlite.async_node import AsyncChordNode
+from chordlite.stabilization import StabilizationScheduler, AsyncStabilizationScheduler
+from chordlite.cache import LocationCache
+from chordlite.latency import RttTracker
+from chordlite.failure import FailureDetector
+from chordlite.admission import JoinAdmission
+from chordlite.tracing import \
+    Tracer, TraceContext, Span, JsonlSpanSink, current_trace
+from chordlite.metrics import \
+    MetricsRegistry, ChordMetrics, Counter, Histogram, Gauge, PROMETHEUS_CONTENT_TYPE
 from chordlite.transport import \
     ChordRequest, ChordResponse, ChordRequestType, ChordServer, \
     ChordRemoteEndpoint, NetworkedChordNode
-from chordlite.network import VirtualNetwork
+from chordlite.async_transport import \
+    AsyncChordServer, AsyncChordRemoteEndpoint, AsyncNetworkedChordNode
+from chordlite.vnodes import VirtualNodeHost
+from chordlite.network import VirtualNetwork, AsyncVirtualNetwork, VirtualClock, create_ring
+from chordlite.simulation import RingSimulation, ChurnEvent, PartitionModel
 from chordlite.http_msg import \
-    send_chord_request, receive_chord_request
-from chordlite.bootstrap import NetworkBootstrapper
+    send_chord_request, receive_chord_request, \
+    ChordCodec, JSON_CODEC, BINARY_CODEC, codec_for
+from chordlite.bootstrap import \
+    Bootstrapper, NetworkBootstrapper, SeedBootstrapper, nearest_member
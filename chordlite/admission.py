@@ -0,0 +1,59 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict
+from threading import Lock
+from time import monotonic
+
+from chordlite.key import ChordKey
+
+
+@dataclass
+class JoinAdmission:
+    """Limits the joins a node takes on at once.
+
+    At most max_pending joins are in flight at once, from admitting the
+    joiner until it confirmed it's linked into the ring or join_timeout_secs
+    passed, e.g. because it crashed. A token bucket admits rate_per_sec joins
+    on average in bursts of up to burst joins; zero disables either limit.
+    Rejected joiners back off and try again, so a join storm queues up at
+    the joiners instead of at this node."""
+    max_pending: int = 0
+    rate_per_sec: float = 0.0
+    burst: int = 8
+    join_timeout_secs: float = 5.0
+    clock: Callable[[], float] = field(default=monotonic)
+    in_flight: Dict[ChordKey, float] = field(init=False, default_factory=dict)
+    tokens: float = field(init=False)
+    refilled_at: float = field(init=False)
+    num_rejected: int = field(init=False, default=0)
+    mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+
+    def __post_init__(self):
+        self.tokens, self.refilled_at = float(self.burst), self.clock()
+
+    @property
+    def pending(self) -> int:
+        return len(self.in_flight)
+
+    def try_admit(self, joiner_id: ChordKey) -> bool:
+        with self.mutex:
+            now = self.clock()
+            self.in_flight = { joiner: admitted_at for joiner, admitted_at
+                               in self.in_flight.items()
+                               if now - admitted_at < self.join_timeout_secs }
+            if 0 < self.max_pending <= len(self.in_flight) and joiner_id not in self.in_flight:
+                self.num_rejected += 1
+                return False
+            if self.rate_per_sec > 0:
+                self.tokens = min(
+                    float(self.burst), self.tokens + (now - self.refilled_at) * self.rate_per_sec)
+                self.refilled_at = now
+                if self.tokens < 1:
+                    self.num_rejected += 1
+                    return False
+                self.tokens -= 1
+            self.in_flight[joiner_id] = now
+            return True
+
+    def release(self, joiner_id: ChordKey):
+        with self.mutex:
+            self.in_flight.pop(joiner_id, None)
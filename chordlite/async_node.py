@@ -0,0 +1,147 @@
+from __future__ import annotations
+import asyncio
+from typing import Tuple, Optional, Protocol, Union
+from dataclasses import dataclass, field
+
+from chordlite.key import ChordKey
+from chordlite.node import ChordNode, ChordStatus, ChordEndpoint
+
+
+class AsyncChordEndpoint(Protocol):
+
+    @property
+    def node_id(self) -> ChordKey:
+        raise NotImplementedError()
+
+    async def get_successor(self) -> AsyncChordEndpoint:
+        raise NotImplementedError()
+
+    async def get_predecessor(self) -> Optional[AsyncChordEndpoint]:
+        raise NotImplementedError()
+
+    async def find_successor(self, key: ChordKey) -> AsyncChordEndpoint:
+        raise NotImplementedError()
+
+    async def find_predecessor(self, key: ChordKey) -> AsyncChordEndpoint:
+        raise NotImplementedError()
+
+    async def next_hop(self, key: ChordKey) -> AsyncChordEndpoint:
+        raise NotImplementedError()
+
+    async def challenge_join(
+            self, joining_node: AsyncChordEndpoint) -> Tuple[ChordStatus, AsyncChordEndpoint]:
+        raise NotImplementedError()
+
+    async def notify(self, new_successor: AsyncChordEndpoint) -> ChordStatus:
+        raise NotImplementedError()
+
+    async def notify_predecessor(self, new_predecessor: AsyncChordEndpoint) -> ChordStatus:
+        raise NotImplementedError()
+
+
+@dataclass
+class AsyncChordNode:
+    """The asyncio counterpart of ChordNode.
+
+    The routing state and all purely local decisions are delegated to a
+    wrapped ChordNode whose fingers hold async endpoints. Only the steps
+    that talk to other nodes are reimplemented as coroutines, so a single
+    event loop can keep many lookups in flight at once."""
+    node_id: ChordKey
+    iterative_lookup: bool = False
+    node: ChordNode = field(init=False)
+
+    def __post_init__(self):
+        self.node = ChordNode(self.node_id, iterative_lookup=self.iterative_lookup)
+
+    def endpoint(self, endpoint: Union[ChordEndpoint, AsyncChordEndpoint]) -> AsyncChordEndpoint:
+        # the wrapped node refers to itself with its synchronous object
+        return self if endpoint.node_id == self.node_id else endpoint
+
+    async def get_successor(self) -> AsyncChordEndpoint:
+        return self.endpoint(self.node.successor)
+
+    async def get_predecessor(self) -> Optional[AsyncChordEndpoint]:
+        pred = self.node.predecessor
+        return self.endpoint(pred) if pred is not None else None
+
+    async def find_successor(self, key: ChordKey) -> AsyncChordEndpoint:
+        pred = await self.find_predecessor(key)
+        return await pred.get_successor()
+
+    async def find_predecessor(self, key: ChordKey) -> AsyncChordEndpoint:
+        if self.node.iterative_lookup:
+            return await self.find_predecessor_iteratively(key)
+        elif self.node.is_uninitialized:
+            return self
+        elif self.node.precedes(key):
+            return self
+        else:
+            forward = self.endpoint(self.node.closest_preceding_finger(key))
+            return await forward.find_predecessor(key)
+
+    async def find_predecessor_iteratively(self, key: ChordKey) -> AsyncChordEndpoint:
+        hop: AsyncChordEndpoint = self
+        next_hop = await self.next_hop(key)
+        while next_hop.node_id != hop.node_id:
+            hop, next_hop = next_hop, await next_hop.next_hop(key)
+        return hop
+
+    async def next_hop(self, key: ChordKey) -> AsyncChordEndpoint:
+        return self.endpoint(self.node.next_hop(key))
+
+    async def update_finger_table(self, bootstrap: Optional[AsyncChordEndpoint]=None):
+        forward = bootstrap if bootstrap else self
+        i = 0
+        while i < len(self.node.fingers):
+            succ = await forward.find_successor(self.node.finger_starts[i])
+            i = self.node.assign_finger(i, succ)
+        self.node.reindex_fingers()
+
+    async def fix_fingers(self, count: int=1):
+        num_fingers = len(self.node.fingers)
+        for _ in range(count):
+            i = self.node.next_finger
+            succ = await self.find_successor(self.node.finger_starts[i])
+            self.node.next_finger = self.node.assign_finger(i, succ) % num_fingers
+        self.node.reindex_fingers()
+
+    async def stabilize(self):
+        if self.node.is_uninitialized:
+            return
+        successor = self.endpoint(self.node.successor)
+        candidate = await successor.get_predecessor()
+        successor = self.endpoint(self.node.consider_successor(candidate))
+        await successor.notify_predecessor(self)
+
+    async def initiate_join(self, bootstrap: AsyncChordEndpoint):
+        if bootstrap.node_id != self.node_id and self.node.is_uninitialized:
+            self.node.predecessor = self
+            status = ChordStatus.FAILURE
+            for attempt in range(self.node.max_join_attempts):
+                new_successor = await bootstrap.find_successor(self.node_id)
+                status, new_predecessor = await new_successor.challenge_join(self)
+                if status == ChordStatus.SUCCESS:
+                    break
+                if status == ChordStatus.BUSY:
+                    await asyncio.sleep(self.node.join_backoff(attempt))
+            if status != ChordStatus.SUCCESS:
+                raise RuntimeError(f"Node {self.node_id} failed to join the network!")
+
+            self.node.set_all_fingers(new_successor)
+            self.node.predecessor = new_predecessor
+            if new_predecessor.node_id != new_successor.node_id:
+                await new_predecessor.notify(self)
+            # tells the successor the join is done, so it takes on further joins
+            await new_successor.notify_predecessor(self)
+
+    async def challenge_join(
+            self, joining_node: AsyncChordEndpoint) -> Tuple[ChordStatus, AsyncChordEndpoint]:
+        status, old_predecessor = self.node.challenge_join(joining_node)
+        return status, self.endpoint(old_predecessor)
+
+    async def notify(self, new_successor: AsyncChordEndpoint) -> ChordStatus:
+        return self.node.notify(new_successor)
+
+    async def notify_predecessor(self, new_predecessor: AsyncChordEndpoint) -> ChordStatus:
+        return self.node.notify_predecessor(new_predecessor)
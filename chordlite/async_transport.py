@@ -0,0 +1,220 @@
+from __future__ import annotations
+from typing import Tuple, Callable, Optional, Awaitable
+from dataclasses import dataclass, field
+
+from chordlite.key import ChordKey
+from chordlite.endpoint import IPEndpointId
+from chordlite.node import ChordStatus
+from chordlite.async_node import AsyncChordNode, AsyncChordEndpoint
+from chordlite.transport import ChordRequest, ChordResponse, ChordRequestType
+from chordlite.stabilization import AsyncStabilizationScheduler
+
+
+AsyncRequestSender = Callable[[ChordRequest], Awaitable[ChordResponse]]
+
+
+@dataclass
+class AsyncChordRemoteEndpoint:
+    local_id: IPEndpointId
+    remote_id: IPEndpointId
+    network: AsyncRequestSender
+
+    @property
+    def node_id(self) -> ChordKey:
+        return self.remote_id
+
+    async def get_successor(self) -> AsyncChordEndpoint:
+        request = ChordRequest(
+            ChordRequestType.SUCC_LOOKUP,
+            self.remote_id,
+            self.local_id,
+            self.remote_id,
+            self.remote_id
+        )
+        response = await self.network(request)
+        endpoint = AsyncChordRemoteEndpoint(
+            self.local_id, response.successor_id, self.network
+        )
+        return endpoint
+
+    async def get_predecessor(self) -> Optional[AsyncChordEndpoint]:
+        request = ChordRequest(
+            ChordRequestType.PRED_LOOKUP,
+            self.remote_id,
+            self.local_id,
+            self.remote_id,
+            self.remote_id
+        )
+        response = await self.network(request)
+        if response.predecessor_id is None:
+            return None
+        endpoint = AsyncChordRemoteEndpoint(
+            self.local_id, response.predecessor_id, self.network
+        )
+        return endpoint
+
+    async def find_successor(self, key: ChordKey) -> AsyncChordEndpoint:
+        request = ChordRequest(
+            ChordRequestType.FIND_SUCC,
+            self.remote_id,
+            self.local_id,
+            self.local_id,
+            key
+        )
+        response = await self.network(request)
+        endpoint = AsyncChordRemoteEndpoint(
+            self.local_id, response.successor_id, self.network
+        )
+        return endpoint
+
+    async def find_predecessor(self, key: ChordKey) -> AsyncChordEndpoint:
+        request = ChordRequest(
+            ChordRequestType.FIND_PRED,
+            self.remote_id,
+            self.local_id,
+            self.local_id,
+            key
+        )
+        response = await self.network(request)
+        endpoint = AsyncChordRemoteEndpoint(
+            self.local_id, response.predecessor_id, self.network
+        )
+        return endpoint
+
+    async def next_hop(self, key: ChordKey) -> AsyncChordEndpoint:
+        request = ChordRequest(
+            ChordRequestType.NEXT_HOP,
+            self.remote_id,
+            self.local_id,
+            self.local_id,
+            key
+        )
+        response = await self.network(request)
+        endpoint = AsyncChordRemoteEndpoint(
+            self.local_id, response.predecessor_id, self.network
+        )
+        return endpoint
+
+    async def challenge_join(
+            self, joining_node: AsyncChordEndpoint) -> Tuple[ChordStatus, AsyncChordEndpoint]:
+        request = ChordRequest(
+            ChordRequestType.JOIN,
+            self.remote_id,
+            self.remote_id,
+            joining_node.node_id,
+            joining_node.node_id
+        )
+        response = await self.network(request)
+        endpoint = AsyncChordRemoteEndpoint(
+            self.local_id, response.predecessor_id, self.network
+        )
+        return response.status, endpoint
+
+    async def notify(self, new_successor: AsyncChordEndpoint) -> ChordStatus:
+        request = ChordRequest(
+            ChordRequestType.NOTIFY,
+            self.remote_id,
+            self.remote_id,
+            new_successor.node_id,
+            new_successor.node_id
+        )
+        response = await self.network(request)
+        return response.status
+
+    async def notify_predecessor(self, new_predecessor: AsyncChordEndpoint) -> ChordStatus:
+        request = ChordRequest(
+            ChordRequestType.NOTIFY_PRED,
+            self.remote_id,
+            self.remote_id,
+            new_predecessor.node_id,
+            new_predecessor.node_id
+        )
+        response = await self.network(request)
+        return response.status
+
+
+@dataclass
+class AsyncChordServer:
+    network: AsyncRequestSender
+    local: AsyncChordNode
+
+    @property
+    def node_id(self) -> ChordKey:
+        return self.local.node_id
+
+    async def process_message(self, message: ChordRequest) -> ChordResponse:
+        local_id: IPEndpointId = self.local.node_id
+        if message.request_type == ChordRequestType.SUCC_LOOKUP:
+            succ = await self.local.get_successor()
+            response = ChordResponse(local_id, successor_id=succ.node_id)
+            return response
+        elif message.request_type == ChordRequestType.PRED_LOOKUP:
+            pred = await self.local.get_predecessor()
+            pred_id = pred.node_id if pred is not None else None
+            response = ChordResponse(local_id, predecessor_id=pred_id)
+            return response
+        elif message.request_type == ChordRequestType.FIND_PRED:
+            pred = await self.local.find_predecessor(message.requested_resource_id)
+            response = ChordResponse(local_id, predecessor_id=pred.node_id)
+            return response
+        elif message.request_type == ChordRequestType.FIND_SUCC:
+            succ = await self.local.find_successor(message.requested_resource_id)
+            response = ChordResponse(local_id, successor_id=succ.node_id)
+            return response
+        elif message.request_type == ChordRequestType.NEXT_HOP:
+            hop = await self.local.next_hop(message.requested_resource_id)
+            response = ChordResponse(local_id, predecessor_id=hop.node_id)
+            return response
+        elif message.request_type == ChordRequestType.JOIN:
+            joining_node = AsyncChordRemoteEndpoint(local_id, message.requester_id, self.network)
+            status, pred = await self.local.challenge_join(joining_node)
+            response = ChordResponse(local_id, predecessor_id=pred.node_id, status=status)
+            return response
+        elif message.request_type == ChordRequestType.NOTIFY:
+            joining_node = AsyncChordRemoteEndpoint(local_id, message.requester_id, self.network)
+            status = await self.local.notify(joining_node)
+            response = ChordResponse(local_id, status=status)
+            return response
+        elif message.request_type == ChordRequestType.NOTIFY_PRED:
+            joining_node = AsyncChordRemoteEndpoint(local_id, message.requester_id, self.network)
+            status = await self.local.notify_predecessor(joining_node)
+            response = ChordResponse(local_id, status=status)
+            return response
+        else:
+            raise RuntimeError("Unsupported request type!")
+
+
+@dataclass
+class AsyncNetworkedChordNode:
+    node_id: IPEndpointId
+    network: AsyncRequestSender
+    finger_update_interval_secs: float = 1.0
+    finger_update_jitter_secs: float = 0.5
+    fingers_per_update: int = 4
+    iterative_lookup: bool = False
+    node: AsyncChordNode = field(init=False)
+    server: AsyncChordServer = field(init=False)
+    scheduler: AsyncStabilizationScheduler = field(init=False)
+
+    def __post_init__(self):
+        self.node = AsyncChordNode(self.node_id, iterative_lookup=self.iterative_lookup)
+        self.server = AsyncChordServer(self.network, self.node)
+        self.scheduler = AsyncStabilizationScheduler(
+            self.node, self.finger_update_interval_secs,
+            self.finger_update_jitter_secs, self.fingers_per_update)
+
+    async def join_network(self, bootstrap_id: IPEndpointId):
+        bootstrap = AsyncChordRemoteEndpoint(self.node_id, bootstrap_id, self.network)
+        await self.node.initiate_join(bootstrap)
+        self.scheduler.start()
+
+    async def shutdown(self):
+        await self.scheduler.stop()
+
+    async def lookup(self, key: ChordKey) -> IPEndpointId:
+        endpoint = await self.node.find_successor(key)
+        endpoint_id: IPEndpointId = endpoint.node_id
+        return endpoint_id
+
+    async def process_message(self, message: ChordRequest) -> ChordResponse:
+        return await self.server.process_message(message)
@@ -1,47 +1,187 @@
 import socket
 from json import loads, dumps
-from typing import Set
+from typing import Set, List, Callable, Optional, Protocol
 from dataclasses import dataclass, field
-from threading import Thread
-from time import sleep
+from threading import Thread, Condition
+from time import monotonic, sleep
+from chordlite.key import ring_distance
 from chordlite.endpoint import IPEndpointId
+from chordlite.http_msg import deserialize_endpoint
+
+
+class Bootstrapper(Protocol):
+
+    def find_bootstrap(self) -> IPEndpointId:
+        raise NotImplementedError()
+
+    def close(self):
+        raise NotImplementedError()
+
+
+def nearest_member(node_id: IPEndpointId, member_ids: Set[IPEndpointId]) -> IPEndpointId:
+    """The member most closely preceding the node on the ring. Its successor
+    is where the node joins, so the join takes the fewest hops, and nodes
+    joining at the same time spread over all members instead of one."""
+    return min(member_ids, key=lambda m: (
+        ring_distance(m.value, node_id.value, node_id.keyspace), m.key))
 
 
 @dataclass
 class NetworkBootstrapper:
+    """Finds a node to join the ring through by UDP broadcasts.
+
+    A node announces itself until it found a bootstrap node, and answers the
+    announcements of others for as long as it runs, telling whether it's a
+    member of the ring. Of the members answering within answer_window_secs,
+    the one nearest to the node's position is the bootstrap node. As long as
+    there's no ring yet, the node with the smallest key heard of within
+    settle_secs founds it. The other nodes wait for a share of spread_secs
+    by their rank among the nodes heard of and then join through the nearest
+    member by that time, so the nodes that joined already take on the later
+    joins instead of the founder taking on all of them. If no member answers
+    within another settle_secs, they join through the founder anyway."""
     endpoint_id: IPEndpointId
     broadcast_port: int
-    repetitions: int = 10
-    wait_time: int = 2
-    all_node_ids: Set[IPEndpointId] = field(default_factory=set)
+    is_member: Callable[[], bool] = field(default=lambda: False, repr=False)
+    settle_secs: float = 2.0
+    spread_secs: float = 2.0
+    answer_window_secs: float = 0.05
+    announce_interval_secs: float = 0.25
+    max_announce_interval_secs: float = 2.0
+    broadcast_address: str = "255.255.255.255"
+    poll_interval_secs: float = 0.2
+    all_node_ids: Set[IPEndpointId] = field(init=False, default_factory=set)
+    member_ids: Set[IPEndpointId] = field(init=False, default_factory=set)
+    sock: Optional[socket.socket] = field(init=False, default=None, repr=False)
+    receiver: Optional[Thread] = field(init=False, default=None, repr=False)
+    changed: Condition = field(init=False, default_factory=Condition, repr=False)
+    is_running: bool = field(init=False, default=False)
+
+    def start(self):
+        # one socket sends the announcements and receives the announcements
+        # and answers of other nodes, so answers reach the announcing node
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.sock.bind(("", self.broadcast_port))
+        self.sock.settimeout(self.poll_interval_secs)
+        self.is_running = True
+        self.receiver = Thread(target=self.receive, daemon=True)
+        self.receiver.start()
+
+    def close(self):
+        self.is_running = False
+        if self.receiver is not None:
+            self.receiver.join()
+            self.receiver = None
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
 
     def find_bootstrap(self) -> IPEndpointId:
-        sender_thread = Thread(target=self.send_nodeid)
-        receiver_thread = Thread(target=self.receive_nodeid)
-        sender_thread.start()
-        receiver_thread.start()
-        sender_thread.join()
-        receiver_thread.join(5)
-        return min(self.all_node_ids, key=lambda n: n.key)
-
-    def send_nodeid(self):
-        msg = dumps({ "node_id": str(self.endpoint_id) }).encode("utf-8")
-        for i in range(self.repetitions):
-            ip = self.endpoint_id.ip_address
-            print(f'sending on {ip}')
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            sock.bind((ip, 0))
-            sock.sendto(msg, ("255.255.255.255", self.broadcast_port))
-            sock.close()
-            sleep(self.wait_time)
-
-    def receive_nodeid(self):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.bind(('', self.broadcast_port))
+        if not self.is_running:
+            self.start()
+        with self.changed:
+            self.announce(monotonic() + self.settle_secs)
+            if not self.member_ids:
+                node_ids = sorted(self.all_node_ids | {self.endpoint_id}, key=lambda n: n.key)
+                founder_id, rank = node_ids[0], node_ids.index(self.endpoint_id)
+                if founder_id == self.endpoint_id:
+                    return founder_id
+                self.wait_until(monotonic() + self.spread_secs * rank / len(node_ids))
+                self.announce(monotonic() + self.settle_secs)
+                if not self.member_ids:
+                    return founder_id
+            # the members answer at about the same time, so pick
+            # the nearest of them rather than the fastest one
+            self.wait_until(monotonic() + self.answer_window_secs)
+            return nearest_member(self.endpoint_id, self.member_ids)
+
+    def announce(self, deadline: float):
+        # announces at least once, so members that joined since get heard of
+        interval = self.announce_interval_secs
         while True:
-            msg = sock.recvfrom(1024)[0].decode("utf-8")
-            raw_node_id: str = loads(msg)["node_id"]
-            ip_addr, port = raw_node_id.split(":")[0], raw_node_id.split(":")[1]
-            node_id = IPEndpointId(ip_addr, port)
+            self.send(self.message(), (self.broadcast_address, self.broadcast_port))
+            self.changed.wait(min(interval, max(0.0, deadline - monotonic())))
+            if self.member_ids or monotonic() >= deadline:
+                return
+            interval = min(2 * interval, self.max_announce_interval_secs)
+
+    def wait_until(self, deadline: float):
+        while monotonic() < deadline:
+            self.changed.wait(max(0.0, deadline - monotonic()))
+
+    def message(self, is_answer: bool=False) -> bytes:
+        return dumps({
+            "node_id": str(self.endpoint_id),
+            "is_member": self.is_member(),
+            "is_answer": is_answer
+        }).encode("utf-8")
+
+    def send(self, msg: bytes, address):
+        try:
+            self.sock.sendto(msg, address)
+        except OSError:
+            # a lost announcement gets repeated, a lost answer gets asked for again
+            pass
+
+    def receive(self):
+        while self.is_running:
+            try:
+                data, address = self.sock.recvfrom(1024)
+                msg = loads(data.decode("utf-8"))
+                node_id = deserialize_endpoint(msg["node_id"], self.endpoint_id.keyspace)
+            except socket.timeout:
+                continue
+            except (OSError, ValueError, KeyError):
+                continue
+            if node_id == self.endpoint_id:
+                continue
+            self.handle(node_id, msg.get("is_member", False))
+            if not msg.get("is_answer", False):
+                self.send(self.message(is_answer=True), address)
+
+    def handle(self, node_id: IPEndpointId, is_member: bool):
+        with self.changed:
             self.all_node_ids.add(node_id)
+            # only members wake the announcing node, otherwise all starting
+            # nodes would keep announcing in response to each other
+            if is_member:
+                self.member_ids.add(node_id)
+                self.changed.notify_all()
+            else:
+                self.member_ids.discard(node_id)
+
+
+@dataclass
+class SeedBootstrapper:
+    """Finds a node to join the ring through from a fixed list of seed nodes.
+
+    Of the seeds that are members of the ring, the one nearest to the node's
+    position is the bootstrap node. As long as there's no ring
+    yet, the first seed founds it and all other nodes wait until it's up,
+    so nodes starting at the same time can't found separate rings."""
+    endpoint_id: IPEndpointId
+    seed_ids: List[IPEndpointId]
+    is_member: Callable[[IPEndpointId], bool] = field(repr=False)
+    retry_interval_secs: float = 0.25
+    max_retry_interval_secs: float = 2.0
+    timeout_secs: float = 120.0
+
+    def find_bootstrap(self) -> IPEndpointId:
+        deadline = monotonic() + self.timeout_secs
+        interval = self.retry_interval_secs
+        while True:
+            member_ids = {seed_id for seed_id in self.seed_ids
+                          if seed_id != self.endpoint_id and self.is_member(seed_id)}
+            if member_ids:
+                return nearest_member(self.endpoint_id, member_ids)
+            if self.seed_ids and self.seed_ids[0] == self.endpoint_id:
+                return self.endpoint_id
+            if monotonic() >= deadline:
+                raise TimeoutError(f"None of the seeds {self.seed_ids} joined the ring!")
+            sleep(interval)
+            interval = min(2 * interval, self.max_retry_interval_secs)
+
+    def close(self):
+        pass
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+from bisect import bisect_left, insort
+from threading import Lock
+from time import monotonic
+
+from chordlite.key import ChordKey, in_interval
+
+
+@dataclass
+class CachedArc:
+    start: int
+    owner_id: ChordKey
+    expires_at: float
+
+
+@dataclass
+class LocationCache:
+    """Remembers which node owns the keys of a ring arc (start, owner], so
+    keys of recently resolved ranges can be sent to their owner right away.
+
+    Cached owners may be stale. Callers invalidate the affected arcs once an
+    owner rejects a key or the ring around the local node changes, and the
+    TTL bounds how long changes elsewhere on the ring go unnoticed."""
+    keyspace: int
+    max_entries: int = 1024
+    ttl_secs: float = 30.0
+    clock: Callable[[], float] = field(default=monotonic)
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+    arcs: OrderedDict = field(init=False, repr=False, default_factory=OrderedDict)
+    owner_values: List[int] = field(init=False, repr=False, default_factory=list)
+    mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+
+    def __len__(self) -> int:
+        return len(self.arcs)
+
+    def get(self, key: ChordKey) -> Optional[ChordKey]:
+        with self.mutex:
+            arc = self.find_arc(key.value)
+            if arc is not None and arc.expires_at <= self.clock():
+                self.remove_arc(arc)
+                arc = None
+            if arc is None:
+                self.misses += 1
+                return None
+            self.arcs.move_to_end(arc.owner_id.value)
+            self.hits += 1
+            return arc.owner_id
+
+    def put(self, start: int, owner_id: ChordKey):
+        with self.mutex:
+            owner_value = owner_id.value
+            if owner_value in self.arcs:
+                self.remove_arc(self.arcs[owner_value])
+            # the new arc claims there's no node between its start and owner,
+            # so arcs owned by nodes in there are outdated
+            for value in [v for v in self.owner_values
+                          if in_interval(v, start, owner_value, self.keyspace)]:
+                self.remove_arc(self.arcs[value])
+            # and an arc spanning the new owner missed that node, so it's outdated as well
+            spanning = self.find_arc(owner_value)
+            if spanning is not None:
+                self.remove_arc(spanning)
+
+            self.arcs[owner_value] = CachedArc(start, owner_id, self.clock() + self.ttl_secs)
+            insort(self.owner_values, owner_value)
+            while len(self.arcs) > self.max_entries:
+                self.remove_arc(next(iter(self.arcs.values())))
+
+    def invalidate(self, value: int):
+        """Drop the arc containing the given ring position and the arc owned by it."""
+        with self.mutex:
+            arc = self.find_arc(value)
+            if arc is not None:
+                self.remove_arc(arc)
+            if value in self.arcs:
+                self.remove_arc(self.arcs[value])
+
+    def clear(self):
+        with self.mutex:
+            self.arcs.clear()
+            self.owner_values.clear()
+
+    def find_arc(self, value: int) -> Optional[CachedArc]:
+        # arcs don't overlap, so only the arc of the next owner can contain the value
+        if not self.owner_values:
+            return None
+        pos = bisect_left(self.owner_values, value) % len(self.owner_values)
+        arc: CachedArc = self.arcs[self.owner_values[pos]]
+        is_contained = in_interval(
+            value, arc.start, arc.owner_id.value, self.keyspace, inclusive=True)
+        return arc if is_contained else None
+
+    def remove_arc(self, arc: CachedArc):
+        owner_value = arc.owner_id.value
+        del self.arcs[owner_value]
+        del self.owner_values[bisect_left(self.owner_values, owner_value)]
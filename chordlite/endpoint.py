@@ -1,28 +1,36 @@
 import socket
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Union
+from threading import Lock
+from typing import Union, Tuple
 from hashlib import sha256
 from chordlite.key import \
     SHA256_KEYSPACE, ChordKey, ResourceKey
 
 
-@dataclass
+@dataclass(frozen=True)
 class IPEndpointId:
     ip_address: str
     port: str
     keyspace: int = SHA256_KEYSPACE
+    vnode: int = 0
     key: ChordKey = field(init=False)
 
     def __post_init__(self):
-        node_name = f"{self.ip_address}:{self.port}"
+        # vnode 0 keeps the plain address, so single-node hosts keep their ids
+        node_name = str(self)
         node_hash = sha256(node_name.encode("ascii"))
-        value = int(node_hash.hexdigest(), 16)
-        self.key = ResourceKey(value, self.keyspace)
+        value = int.from_bytes(node_hash.digest(), "big")
+        object.__setattr__(self, "key", ResourceKey(value, self.keyspace))
 
     @property
     def value(self) -> int:
         return self.key.value
 
+    @property
+    def address(self) -> str:
+        return f"{self.ip_address}:{self.port}"
+
     def __add__(self, other: Union[int, ChordKey]) -> ChordKey:
         return self.key + other
 
@@ -54,13 +62,51 @@ class IPEndpointId:
         return self.key.__hash__()
 
     def __str__(self) -> str:
-        return f"{self.ip_address}:{self.port}"
+        return f"{self.ip_address}:{self.port}#{self.vnode}" \
+            if self.vnode else f"{self.ip_address}:{self.port}"
 
     def __repr__(self) -> str:
-        return f"{self.ip_address}:{self.port}"
+        return str(self)
+
+
+@dataclass
+class EndpointRegistry:
+    """A bounded, thread-safe LRU cache of interned endpoint ids, so peers that
+    are already known don't get their keys rehashed on every message."""
+    max_size: int = 65536
+    endpoints: OrderedDict = field(default_factory=OrderedDict)
+    mutex: Lock = field(default_factory=Lock)
+
+    def intern(self, ip_address: str, port: Union[int, str],
+               keyspace: int=SHA256_KEYSPACE, vnode: int=0) -> IPEndpointId:
+        cache_key: Tuple[str, str, int, int] = (ip_address, str(port), keyspace, vnode)
+        with self.mutex:
+            endpoint = self.endpoints.get(cache_key)
+            if endpoint is not None:
+                self.endpoints.move_to_end(cache_key)
+                return endpoint
+
+        # hash outside of the lock, a concurrent insert of the same endpoint is harmless
+        endpoint = IPEndpointId(ip_address, str(port), keyspace, vnode)
+        with self.mutex:
+            endpoint = self.endpoints.setdefault(cache_key, endpoint)
+            while len(self.endpoints) > self.max_size:
+                self.endpoints.popitem(last=False)
+        return endpoint
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+
+ENDPOINT_REGISTRY = EndpointRegistry()
+
+
+def intern_endpoint(ip_address: str, port: Union[int, str],
+                    keyspace: int=SHA256_KEYSPACE, vnode: int=0) -> IPEndpointId:
+    return ENDPOINT_REGISTRY.intern(ip_address, port, keyspace, vnode)
 
 
 def local_endpoint(chord_port: str) -> IPEndpointId:
     hostname = socket.gethostname()
     ip_address = socket.gethostbyname(hostname)
-    return IPEndpointId(ip_address, chord_port)
+    return intern_endpoint(ip_address, chord_port)
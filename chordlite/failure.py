@@ -0,0 +1,51 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+from threading import Lock
+from time import monotonic
+
+from chordlite.key import ChordKey
+
+
+@dataclass
+class FailureDetector:
+    """Suspects peers that failed to answer max_failures requests in a row,
+    so a single lost message doesn't count as a crash. Routing avoids
+    suspected peers until they answer again or the suspicion expires,
+    so a briefly unreachable peer gets another chance later on. A streak
+    ends suspicion_secs after its last failure, and report_failure clears
+    the ended streaks of all peers at most once per suspicion_secs."""
+    max_failures: int = 3
+    suspicion_secs: float = 10.0
+    clock: Callable[[], float] = field(default=monotonic)
+    failures: Dict[ChordKey, Tuple[int, float]] = field(init=False, default_factory=dict)
+    pruned_at: float = field(init=False, repr=False, default=0.0)
+    mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+
+    def report_failure(self, peer_id: ChordKey):
+        now = self.clock()
+        with self.mutex:
+            count, failed_at = self.failures.get(peer_id, (0, 0.0))
+            if now - failed_at >= self.suspicion_secs:
+                count = 0
+            self.failures[peer_id] = (count + 1, now)
+            if now - self.pruned_at > self.suspicion_secs:
+                self.failures = { peer_id: failure for peer_id, failure
+                                  in self.failures.items()
+                                  if now - failure[1] < self.suspicion_secs }
+                self.pruned_at = now
+
+    def report_success(self, peer_id: ChordKey):
+        # as long as no peer failed, answers don't even need a lookup
+        if self.failures and peer_id in self.failures:
+            with self.mutex:
+                self.failures.pop(peer_id, None)
+
+    def is_suspected(self, peer_id: ChordKey) -> bool:
+        if not self.failures:
+            return False
+        count, failed_at = self.failures.get(peer_id, (0, 0.0))
+        return count >= self.max_failures and self.clock() - failed_at < self.suspicion_secs
+
+    @property
+    def suspects(self) -> List[ChordKey]:
+        return [peer_id for peer_id in list(self.failures) if self.is_suspected(peer_id)]
@@ -1,11 +1,15 @@
+import socket
+import struct
 from json import loads, dumps
-from typing import Callable, Optional
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple, List
 
 from chordlite.key import ResourceKey
-from chordlite.endpoint import IPEndpointId
+from chordlite.endpoint import IPEndpointId, intern_endpoint
 from chordlite.node import ChordStatus
 from chordlite.transport import \
     ChordRequest, ChordResponse, ChordRequestType
+from chordlite.tracing import TraceContext
 
 
 def serialize_endpoint(endpoint: Optional[IPEndpointId]) -> Optional[str]:
@@ -14,12 +18,17 @@ def serialize_endpoint(endpoint: Optional[IPEndpointId]) -> Optional[str]:
 
 def deserialize_endpoint(data: str, keyspace: int) -> Optional[IPEndpointId]:
     if data:
-        parts = data.split(":")
-        return IPEndpointId(parts[0], parts[1], keyspace)
+        address, _, vnode = data.partition("#")
+        ip_address, port = address.rsplit(":", 1)
+        return intern_endpoint(ip_address, port, keyspace, int(vnode or 0))
     else:
         return None
 
 
+def deserialize_trace(data: Optional[List[int]]) -> Optional[TraceContext]:
+    return TraceContext(int(data[0]), int(data[1])) if data else None
+
+
 def deserialize_request(data: bytes, keyspace: int) -> ChordRequest:
     data_dict = loads(data)
     new_endpoint = lambda d: deserialize_endpoint(d, keyspace)
@@ -29,9 +38,11 @@ def deserialize_request(data: bytes, keyspace: int) -> ChordRequest:
         new_endpoint(data_dict["forward_id"]),
         new_endpoint(data_dict["receiver_id"]),
         new_endpoint(data_dict["requester_id"]),
-        ResourceKey(int(data_dict["requested_resource_id"])),
+        ResourceKey(int(data_dict["requested_resource_id"]), keyspace),
         new_endpoint(data_dict["new_successor_id"]),
-        new_endpoint(data_dict["new_predecessor_id"])
+        new_endpoint(data_dict["new_predecessor_id"]),
+        [ResourceKey(int(k), keyspace) for k in data_dict.get("requested_resource_ids", [])],
+        deserialize_trace(data_dict.get("trace"))
     )
 
 
@@ -43,8 +54,11 @@ def serialize_request(request: ChordRequest) -> bytes:
         "requester_id": serialize_endpoint(request.requester_id),
         "requested_resource_id": request.requested_resource_id.value,
         "new_successor_id": serialize_endpoint(request.new_successor_id),
-        "new_predecessor_id": serialize_endpoint(request.new_predecessor_id)
+        "new_predecessor_id": serialize_endpoint(request.new_predecessor_id),
+        "requested_resource_ids": [k.value for k in request.requested_resource_ids]
     }
+    if request.trace is not None:
+        data["trace"] = [request.trace.trace_id, request.trace.span_id]
     return dumps(data).encode("utf-8")
 
 
@@ -56,7 +70,9 @@ def deserialize_response(data: bytes, keyspace: int) -> ChordResponse:
         new_endpoint(data_dict["responder_id"]),
         new_endpoint(data_dict["successor_id"]),
         new_endpoint(data_dict["predecessor_id"]),
-        ChordStatus(data_dict["status"])
+        ChordStatus(data_dict["status"]),
+        [new_endpoint(d) for d in data_dict.get("successor_ids", [])],
+        data_dict.get("num_hops", 0)
     )
 
 
@@ -65,24 +81,243 @@ def serialize_response(response: ChordResponse) -> bytes:
         "responder_id": serialize_endpoint(response.responder_id),
         "successor_id": serialize_endpoint(response.successor_id),
         "predecessor_id": serialize_endpoint(response.predecessor_id),
-        "status": int(response.status)
+        "status": int(response.status),
+        "successor_ids": [serialize_endpoint(e) for e in response.successor_ids]
     }
+    if response.num_hops:
+        data["num_hops"] = response.num_hops
     return dumps(data).encode("utf-8")
 
 
+BINARY_VERSION = 1
+NO_ENDPOINT, HOSTNAME_ENDPOINT, IPV4_ENDPOINT, IPV6_ENDPOINT = 0, 1, 4, 6
+REQUEST_HEADER = struct.Struct(">BB32s")
+RESPONSE_HEADER = struct.Struct(">BB")
+PORT = struct.Struct(">H")
+VNODE = struct.Struct(">H")
+VNODE_FLAG = 0x80
+LIST_LENGTH = struct.Struct(">H")
+TRACE = struct.Struct(">QQ")
+HOPS = struct.Struct(">H")
+
+
+def pack_endpoint(endpoint: Optional[IPEndpointId]) -> bytes:
+    if endpoint is None:
+        return bytes([NO_ENDPOINT])
+    # vnode indices are only sent when set, so plain endpoints keep their size
+    flag, suffix = (VNODE_FLAG, VNODE.pack(endpoint.vnode)) if endpoint.vnode else (0, b"")
+    port = PORT.pack(int(endpoint.port)) + suffix
+    try:
+        return bytes([IPV4_ENDPOINT | flag]) \
+            + socket.inet_pton(socket.AF_INET, endpoint.ip_address) + port
+    except OSError:
+        pass
+    try:
+        return bytes([IPV6_ENDPOINT | flag]) \
+            + socket.inet_pton(socket.AF_INET6, endpoint.ip_address) + port
+    except OSError:
+        pass
+    hostname = endpoint.ip_address.encode("ascii")
+    return bytes([HOSTNAME_ENDPOINT | flag, len(hostname)]) + hostname + port
+
+
+def unpack_endpoint(
+        data: bytes, offset: int, keyspace: int) -> Tuple[Optional[IPEndpointId], int]:
+    family, has_vnode = data[offset] & ~VNODE_FLAG, data[offset] & VNODE_FLAG
+    offset += 1
+    if family == NO_ENDPOINT:
+        return None, offset
+    elif family == IPV4_ENDPOINT:
+        ip_address = socket.inet_ntop(socket.AF_INET, data[offset:offset+4])
+        offset += 4
+    elif family == IPV6_ENDPOINT:
+        ip_address = socket.inet_ntop(socket.AF_INET6, data[offset:offset+16])
+        offset += 16
+    elif family == HOSTNAME_ENDPOINT:
+        length = data[offset]
+        ip_address = data[offset+1:offset+1+length].decode("ascii")
+        offset += 1 + length
+    else:
+        raise ValueError(f"Unsupported endpoint family {family}!")
+    port = PORT.unpack_from(data, offset)[0]
+    offset += PORT.size
+    vnode = 0
+    if has_vnode:
+        vnode = VNODE.unpack_from(data, offset)[0]
+        offset += VNODE.size
+    return intern_endpoint(ip_address, port, keyspace, vnode), offset
+
+
+def unpack_endpoints(
+        data: bytes, offset: int, keyspace: int,
+        count: int) -> Tuple[List[Optional[IPEndpointId]], int]:
+    endpoints = []
+    for _ in range(count):
+        endpoint, offset = unpack_endpoint(data, offset, keyspace)
+        endpoints.append(endpoint)
+    return endpoints, offset
+
+
+def pack_endpoint_list(endpoints: List[IPEndpointId]) -> bytes:
+    return LIST_LENGTH.pack(len(endpoints)) + b"".join(pack_endpoint(e) for e in endpoints)
+
+
+def unpack_endpoint_list(
+        data: bytes, offset: int, keyspace: int) -> Tuple[List[IPEndpointId], int]:
+    # lists are optional trailers, so messages of older peers just end earlier
+    if offset >= len(data):
+        return [], offset
+    count = LIST_LENGTH.unpack_from(data, offset)[0]
+    return unpack_endpoints(data, offset + LIST_LENGTH.size, keyspace, count)
+
+
+def pack_keys(keys: List[ResourceKey]) -> bytes:
+    return LIST_LENGTH.pack(len(keys)) + b"".join(k.value.to_bytes(32, "big") for k in keys)
+
+
+def unpack_keys(data: bytes, offset: int, keyspace: int) -> Tuple[List[ResourceKey], int]:
+    if offset >= len(data):
+        return [], offset
+    count = LIST_LENGTH.unpack_from(data, offset)[0]
+    offset += LIST_LENGTH.size
+    keys = [ResourceKey(int.from_bytes(data[o:o+32], "big"), keyspace)
+            for o in range(offset, offset + 32 * count, 32)]
+    return keys, offset + 32 * count
+
+
+def pack_trace(trace: Optional[TraceContext]) -> bytes:
+    # only traced requests carry the context, so the others keep their size
+    return TRACE.pack(trace.trace_id, trace.span_id) if trace is not None else b""
+
+
+def unpack_trace(data: bytes, offset: int) -> Optional[TraceContext]:
+    if offset + TRACE.size > len(data):
+        return None
+    return TraceContext(*TRACE.unpack_from(data, offset))
+
+
+def pack_hops(num_hops: int) -> bytes:
+    # only forwarded lookups report hops, so the other responses keep their size
+    return HOPS.pack(num_hops) if num_hops else b""
+
+
+def unpack_hops(data: bytes, offset: int) -> int:
+    if offset + HOPS.size > len(data):
+        return 0
+    return HOPS.unpack_from(data, offset)[0]
+
+
+def serialize_request_binary(request: ChordRequest) -> bytes:
+    header = REQUEST_HEADER.pack(
+        BINARY_VERSION, int(request.request_type),
+        request.requested_resource_id.value.to_bytes(32, "big"))
+    return b"".join([
+        header,
+        pack_endpoint(request.forward_id),
+        pack_endpoint(request.receiver_id),
+        pack_endpoint(request.requester_id),
+        pack_endpoint(request.new_successor_id),
+        pack_endpoint(request.new_predecessor_id),
+        pack_keys(request.requested_resource_ids),
+        pack_trace(request.trace)
+    ])
+
+
+def deserialize_request_binary(data: bytes, keyspace: int) -> ChordRequest:
+    version, request_type, raw_key = REQUEST_HEADER.unpack_from(data)
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported message version {version}!")
+    (forward_id, receiver_id, requester_id, new_successor_id, new_predecessor_id), offset = \
+        unpack_endpoints(data, REQUEST_HEADER.size, keyspace, 5)
+    requested_resource_ids, offset = unpack_keys(data, offset, keyspace)
+
+    return ChordRequest(
+        ChordRequestType(request_type),
+        forward_id,
+        receiver_id,
+        requester_id,
+        ResourceKey(int.from_bytes(raw_key, "big"), keyspace),
+        new_successor_id,
+        new_predecessor_id,
+        requested_resource_ids,
+        unpack_trace(data, offset)
+    )
+
+
+def serialize_response_binary(response: ChordResponse) -> bytes:
+    return b"".join([
+        RESPONSE_HEADER.pack(BINARY_VERSION, int(response.status)),
+        pack_endpoint(response.responder_id),
+        pack_endpoint(response.successor_id),
+        pack_endpoint(response.predecessor_id),
+        pack_endpoint_list(response.successor_ids),
+        pack_hops(response.num_hops)
+    ])
+
+
+def deserialize_response_binary(data: bytes, keyspace: int) -> ChordResponse:
+    version, status = RESPONSE_HEADER.unpack_from(data)
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported message version {version}!")
+    (responder_id, successor_id, predecessor_id), offset = \
+        unpack_endpoints(data, RESPONSE_HEADER.size, keyspace, 3)
+    successor_ids, offset = unpack_endpoint_list(data, offset, keyspace)
+
+    return ChordResponse(
+        responder_id,
+        successor_id,
+        predecessor_id,
+        ChordStatus(status),
+        successor_ids,
+        unpack_hops(data, offset)
+    )
+
+
+@dataclass(frozen=True)
+class ChordCodec:
+    content_type: str
+    serialize_request: Callable[[ChordRequest], bytes]
+    deserialize_request: Callable[[bytes, int], ChordRequest]
+    serialize_response: Callable[[ChordResponse], bytes]
+    deserialize_response: Callable[[bytes, int], ChordResponse]
+
+
+JSON_CODEC = ChordCodec(
+    "application/json",
+    serialize_request, deserialize_request,
+    serialize_response, deserialize_response)
+
+BINARY_CODEC = ChordCodec(
+    "application/x-chord",
+    serialize_request_binary, deserialize_request_binary,
+    serialize_response_binary, deserialize_response_binary)
+
+CODECS = { c.content_type: c for c in [JSON_CODEC, BINARY_CODEC] }
+
+
+def codec_for(content_type: Optional[str]) -> ChordCodec:
+    # peers that don't state a content type are assumed to speak JSON
+    mime_type = content_type.split(";")[0].strip() if content_type else None
+    return CODECS.get(mime_type, JSON_CODEC)
+
+
 def receive_chord_request(
         process_message: Callable[[ChordRequest], ChordResponse],
-        keyspace: int, ser_request: bytes):
-    req = deserialize_request(ser_request, keyspace)
+        keyspace: int, ser_request: bytes,
+        content_type: Optional[str]=JSON_CODEC.content_type) -> bytes:
+    codec = codec_for(content_type)
+    req = codec.deserialize_request(ser_request, keyspace)
     resp = process_message(req)
-    resp_ser = serialize_response(resp)
+    resp_ser = codec.serialize_response(resp)
     return resp_ser
 
 
 def send_chord_request(
-        send_request: Callable[[str, bytes], bytes],
-        keyspace: int, request: ChordRequest) -> ChordResponse:
-    ser_request = serialize_request(request)
-    ser_resp = send_request(f"http://{request.forward_id}/chord", ser_request)
-    response = deserialize_response(ser_resp, keyspace)
+        send_request: Callable[[str, bytes, str], bytes],
+        keyspace: int, request: ChordRequest,
+        codec: ChordCodec=JSON_CODEC) -> ChordResponse:
+    ser_request = codec.serialize_request(request)
+    ser_resp = send_request(
+        f"http://{request.forward_id.address}/chord", ser_request, codec.content_type)
+    response = codec.deserialize_response(ser_resp, keyspace)
     return response
@@ -1,5 +1,4 @@
 from __future__ import annotations
-from dataclasses import dataclass
 from typing import Union, Protocol
 
 
@@ -49,57 +48,87 @@ class ChordKey(Protocol):
         raise NotImplementedError()
 
 
-@dataclass(unsafe_hash=True)
+def ring_distance(start: int, end: int, keyspace: int) -> int:
+    return (end - start) % keyspace
+
+
+def in_interval(value: int, start: int, end: int,
+                keyspace: int, inclusive: bool=False) -> bool:
+    """Check whether the value lies within the ring interval (start, end),
+    or (start, end] when inclusive. An interval with start == end spans
+    the whole ring except for its start, just like in the Chord paper."""
+    value_dist = (value - start) % keyspace
+    end_dist = (end - start) % keyspace or keyspace
+    return 0 < value_dist < end_dist or (inclusive and value_dist == end_dist % keyspace)
+
+
 class ResourceKey:
-    value: int
-    keyspace: int = SHA256_KEYSPACE
+    """An immutable key on the Chord ring. Arithmetic results are already
+    reduced by the keyspace, so they skip the normalization on creation."""
+    __slots__ = ("value", "keyspace")
+
+    def __init__(self, value: int, keyspace: int=SHA256_KEYSPACE):
+        _set_value(self, value % keyspace)
+        _set_keyspace(self, keyspace)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
-    def __post_init__(self):
-        if self.value < 0:
-            self.value += ((self.value // self.keyspace) + 1) * self.keyspace
-        self.value = self.value % self.keyspace
+    def __reduce__(self):
+        return (ResourceKey, (self.value, self.keyspace))
 
     def __add__(self, other: Union[int, ChordKey]) -> ChordKey:
-        other_value = other if isinstance(other, int) else other.value
-        new_value = (self.value + other_value) % self.keyspace
-        return ResourceKey(new_value, self.keyspace)
+        other_value = other if other.__class__ is int else other.value
+        return _new_key((self.value + other_value) % self.keyspace, self.keyspace)
 
     def __sub__(self, other: Union[int, ChordKey]) -> ChordKey:
-        other_value = other if isinstance(other, int) else other.value
-        new_value = (self.value - other_value) % self.keyspace
-        return ResourceKey(new_value, self.keyspace)
+        other_value = other if other.__class__ is int else other.value
+        return _new_key((self.value - other_value) % self.keyspace, self.keyspace)
 
     def __mul__(self, other: Union[int, ChordKey]) -> ChordKey:
-        other_value = other if isinstance(other, int) else other.value
-        new_value = (self.value * other_value) % self.keyspace
-        return ResourceKey(new_value, self.keyspace)
+        other_value = other if other.__class__ is int else other.value
+        return _new_key((self.value * other_value) % self.keyspace, self.keyspace)
 
     def __lt__(self, other: Union[int, ChordKey]) -> bool:
-        other_value = other if isinstance(other, int) else other.value
+        other_value = other if other.__class__ is int else other.value
         return self.value < other_value
 
     def __le__(self, other: Union[int, ChordKey]) -> bool:
-        other_value = other if isinstance(other, int) else other.value
+        other_value = other if other.__class__ is int else other.value
         return self.value <= other_value
 
     def __gt__(self, other: Union[int, ChordKey]) -> bool:
-        other_value = other if isinstance(other, int) else other.value
+        other_value = other if other.__class__ is int else other.value
         return self.value > other_value
 
     def __ge__(self, other: Union[int, ChordKey]) -> bool:
-        other_value = other if isinstance(other, int) else other.value
+        other_value = other if other.__class__ is int else other.value
         return self.value >= other_value
 
     def __eq__(self, other: Union[int, ChordKey]) -> bool:
-        other_value = other if isinstance(other, int) else other.value
+        other_value = other if other.__class__ is int else other.value
         return self.value == other_value
 
     def __neq__(self, other: Union[int, ChordKey]) -> bool:
-        other_value = other if isinstance(other, int) else other.value
+        other_value = other if other.__class__ is int else other.value
         return self.value != other_value
 
+    def __hash__(self):
+        return hash((self.value, self.keyspace))
+
     def __str__(self) -> str:
         return f"{self.value} (mod {self.keyspace})"
 
     def __repr__(self) -> str:
         return f"{self.value} (mod {self.keyspace})"
+
+
+_set_value = ResourceKey.value.__set__
+_set_keyspace = ResourceKey.keyspace.__set__
+
+
+def _new_key(value: int, keyspace: int) -> ResourceKey:
+    key = object.__new__(ResourceKey)
+    _set_value(key, value)
+    _set_keyspace(key, keyspace)
+    return key
@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Protocol, Set, Tuple
+from threading import Lock
+from time import monotonic
+
+from chordlite.key import ChordKey
+
+
+class Pingable(Protocol):
+    @property
+    def node_id(self) -> ChordKey:
+        raise NotImplementedError()
+
+    def ping(self):
+        raise NotImplementedError()
+
+
+@dataclass
+class RttTracker:
+    """Keeps an exponentially weighted moving average of the round trip
+    time to each peer. Estimates older than max_age_secs count as unknown,
+    so peers whose latency changed get probed again. At most once per
+    max_age_secs, observe drops all expired estimates, so only the peers
+    measured lately are kept."""
+    alpha: float = 0.2
+    max_age_secs: float = 60.0
+    clock: Callable[[], float] = field(default=monotonic)
+    estimates: Dict[ChordKey, Tuple[float, float]] = field(init=False, default_factory=dict)
+    pruned_at: float = field(init=False, repr=False, default=0.0)
+    mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+
+    def observe(self, peer_id: ChordKey, rtt_secs: float):
+        now = self.clock()
+        with self.mutex:
+            estimate = self.estimates.get(peer_id)
+            if estimate is not None:
+                rtt_secs = (1 - self.alpha) * estimate[0] + self.alpha * rtt_secs
+            self.estimates[peer_id] = (rtt_secs, now)
+            if now - self.pruned_at > self.max_age_secs:
+                self.estimates = { peer_id: estimate for peer_id, estimate
+                                   in self.estimates.items()
+                                   if now - estimate[1] <= self.max_age_secs }
+                self.pruned_at = now
+
+    def estimate(self, peer_id: ChordKey) -> Optional[float]:
+        estimate = self.estimates.get(peer_id)
+        if estimate is None or self.clock() - estimate[1] > self.max_age_secs:
+            return None
+        return estimate[0]
+
+    def mean_rtt(self) -> Optional[float]:
+        rtts = [rtt for rtt, _ in list(self.estimates.values())]
+        return sum(rtts) / len(rtts) if rtts else None
+
+
+@dataclass
+class RttProber:
+    """Pings peers of unknown RTT on a background thread, so finger
+    maintenance never waits for a probe, not even for a dead peer's
+    timeout. The sender times the ping, so the RTT is known next time."""
+    max_pending: int = 64
+    pending: Set[ChordKey] = field(init=False, default_factory=set)
+    executor: Optional[ThreadPoolExecutor] = field(init=False, default=None, repr=False)
+    mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+
+    def probe(self, endpoint: Pingable):
+        with self.mutex:
+            if endpoint.node_id in self.pending or len(self.pending) >= self.max_pending:
+                return
+            self.pending.add(endpoint.node_id)
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(1)
+            self.executor.submit(self.ping, endpoint)
+
+    def ping(self, endpoint: Pingable):
+        # a failed ping counts towards the peer's suspicion in the sender
+        try:
+            endpoint.ping()
+        finally:
+            with self.mutex:
+                self.pending.discard(endpoint.node_id)
+
+    def drain(self):
+        """Wait for the probes submitted so far."""
+        with self.mutex:
+            executor = self.executor
+        if executor is not None:
+            wait([executor.submit(lambda: None)])
+
+    def close(self):
+        with self.mutex:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+from threading import Lock
+
+from chordlite.key import ChordKey
+from chordlite.latency import RttTracker
+from chordlite.failure import FailureDetector
+
+
+# label values of a sample, in the order of the metric's label names
+Labels = Tuple[str, ...]
+Sample = Tuple[Labels, float]
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HOP_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 12, 16, 24, 32)
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_labels(names: Tuple[str, ...], values: Labels) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+               for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+@dataclass
+class Counter:
+    name: str
+    help: str
+    label_names: Tuple[str, ...] = ()
+    values: Dict[Labels, float] = field(init=False, repr=False, default_factory=dict)
+    mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+
+    def inc(self, *labels: str, amount: float=1.0):
+        with self.mutex:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self.mutex:
+            samples = list(self.values.items())
+        return [f"{self.name}{format_labels(self.label_names, labels)} {format_value(value)}"
+                for labels, value in samples]
+
+
+@dataclass
+class Histogram:
+    """Counts observations into buckets of values up to the bucket's bound."""
+    name: str
+    help: str
+    label_names: Tuple[str, ...] = ()
+    buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    counts: Dict[Labels, List[int]] = field(init=False, repr=False, default_factory=dict)
+    sums: Dict[Labels, float] = field(init=False, repr=False, default_factory=dict)
+    mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+
+    def observe(self, value: float, *labels: str):
+        pos = bisect_left(self.buckets, value)
+        with self.mutex:
+            counts = self.counts.get(labels)
+            if counts is None:
+                counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            counts[pos] += 1
+            self.sums[labels] = self.sums.get(labels, 0.0) + value
+
+    def count(self, *labels: str) -> int:
+        return sum(self.counts.get(labels, []))
+
+    def render(self) -> List[str]:
+        with self.mutex:
+            samples = [(labels, list(counts), self.sums[labels])
+                       for labels, counts in self.counts.items()]
+        lines = []
+        bucket_names = self.label_names + ("le",)
+        for labels, counts, total in samples:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket_labels = format_labels(bucket_names, labels + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_str = format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_str} {format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+@dataclass
+class Gauge:
+    """A value read from its collectors when the metrics get scraped,
+    so keeping it up to date costs nothing on the hot path. Samples of
+    the same labels get merged by the combine function."""
+    name: str
+    help: str
+    label_names: Tuple[str, ...] = ()
+    combine: Callable[[List[float]], float] = field(default=sum, repr=False)
+    collectors: List[Callable[[], Iterable[Sample]]] = \
+        field(init=False, repr=False, default_factory=list)
+
+    def collect_from(self, collector: Callable[[], Iterable[Sample]]):
+        self.collectors.append(collector)
+
+    def render(self) -> List[str]:
+        samples: Dict[Labels, List[float]] = {}
+        for collector in list(self.collectors):
+            for labels, value in collector():
+                samples.setdefault(labels, []).append(value)
+        return [f"{self.name}{format_labels(self.label_names, labels)} "
+                f"{format_value(self.combine(values))}"
+                for labels, values in samples.items()]
+
+
+Metric = Union[Counter, Histogram, Gauge]
+METRIC_TYPES = { Counter: "counter", Histogram: "histogram", Gauge: "gauge" }
+
+
+@dataclass
+class MetricsRegistry:
+    """Metrics of a process, rendered in the Prometheus text format.
+
+    Metrics are created on first use and shared afterwards, so all nodes
+    of a process given the same registry report into the same metrics."""
+    metrics: Dict[str, Metric] = field(init=False, default_factory=dict)
+    mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...]=()) -> Counter:
+        return self.get_or_create(Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...]=(),
+                  buckets: Tuple[float, ...]=LATENCY_BUCKETS) -> Histogram:
+        return self.get_or_create(Histogram(name, help_text, label_names, buckets))
+
+    def gauge(self, name: str, help_text: str, label_names: Tuple[str, ...]=(),
+              combine: Callable[[List[float]], float]=sum) -> Gauge:
+        return self.get_or_create(Gauge(name, help_text, label_names, combine))
+
+    def get_or_create(self, metric: Metric) -> Metric:
+        with self.mutex:
+            existing = self.metrics.setdefault(metric.name, metric)
+        if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+            raise ValueError(f"Metric {metric.name} is already registered differently!")
+        return existing
+
+    def render(self) -> str:
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {METRIC_TYPES[type(metric)]}")
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class ChordMetrics:
+    """The metrics of the chord layer. Nodes without metrics skip all of
+    the instrumentation, so disabled metrics don't slow down routing."""
+    registry: MetricsRegistry
+    messages: Counter = field(init=False)
+    message_failures: Counter = field(init=False)
+    message_secs: Histogram = field(init=False)
+    lookup_hops: Histogram = field(init=False)
+    lookup_secs: Histogram = field(init=False)
+    finger_changes: Counter = field(init=False)
+    ring_changes: Counter = field(init=False)
+    join_lock_wait_secs: Histogram = field(init=False)
+    join_rejections: Counter = field(init=False)
+    peer_rtt_secs: Gauge = field(init=False)
+    suspected_peers: Gauge = field(init=False)
+
+    def __post_init__(self):
+        registry = self.registry
+        self.messages = registry.counter(
+            "chord_messages_total", "Chord requests sent, by request type.", ("type",))
+        self.message_failures = registry.counter(
+            "chord_message_failures_total",
+            "Chord requests that got no answer or found no route, by request type.", ("type",))
+        self.message_secs = registry.histogram(
+            "chord_message_seconds", "Time until a chord request was answered.", ("type",))
+        self.lookup_hops = registry.histogram(
+            "chord_lookup_hops", "Hops of the lookups started by this process.",
+            buckets=HOP_BUCKETS)
+        self.lookup_secs = registry.histogram(
+            "chord_lookup_seconds", "Time to resolve the owner of a key missing in the cache.")
+        self.finger_changes = registry.counter(
+            "chord_finger_changes_total", "Fingers replaced by another node.")
+        self.ring_changes = registry.counter(
+            "chord_ring_changes_total", "Changes of a node's successor or predecessor.")
+        self.join_lock_wait_secs = registry.histogram(
+            "chord_join_lock_wait_seconds", "Time joins waited for the join lock.")
+        self.join_rejections = registry.counter(
+            "chord_join_rejections_total", "Joins turned away by the admission control.")
+        # one series per peer host instead of per pair of vnodes, so the number
+        # of series is bounded by the hosts of the cluster
+        self.peer_rtt_secs = registry.gauge(
+            "chord_peer_rtt_seconds", "Mean smoothed round trip time to a peer host.",
+            ("peer",), combine=lambda values: sum(values) / len(values))
+        self.suspected_peers = registry.gauge(
+            "chord_suspected_peers", "Peers a node suspects to have failed.", ("node",))
+
+    def watch_node(self, node_id: ChordKey, rtt: RttTracker, detector: FailureDetector):
+        """Report the RTT estimates and suspects of a node when scraped."""
+        self.peer_rtt_secs.collect_from(lambda: [
+            ((peer_id.address,), rtt_secs)
+            for peer_id, (rtt_secs, _) in list(rtt.estimates.items())])
+        self.suspected_peers.collect_from(lambda: [((str(node_id),), len(detector.suspects))])
@@ -1,30 +1,112 @@
-from typing import Dict, Callable
+import asyncio
+from functools import partial
+from typing import Dict, Callable, List, Optional
 from dataclasses import dataclass, field
-from random import randint
-from time import sleep
 from chordlite.node import ChordKey
+from chordlite.endpoint import IPEndpointId
 from chordlite.transport import \
-    ChordRequest, ChordResponse, NetworkedChordNode
+    ChordRequest, ChordResponse, ChordRemoteEndpoint, NetworkedChordNode, RequestSender
+from chordlite.async_transport import AsyncNetworkedChordNode
+from chordlite.vnodes import VirtualNodeHost
 
 
 def log_message(message: ChordRequest):
     print(f"{message.request_type}: {message.requester_id} -> {message.forward_id}")
 
 
+@dataclass
+class VirtualClock:
+    """Simulated time advanced by the messages of a virtual network, so
+    latencies can be measured without actually waiting for them."""
+    now: float = 0.0
+
+    def advance(self, secs: float):
+        self.now += secs
+
+    def __call__(self) -> float:
+        return self.now
+
+
 @dataclass
 class VirtualNetwork:
+    """Delivers messages between nodes of the same process. The latency
+    function tells the one-way delay between a sender and a receiver, which
+    is added to the virtual clock for both the request and the response.
+    Messages the drop function rejects, messages to unknown nodes and
+    messages slower than the timeout fail with a TimeoutError once the
+    timeout passed, like they would on a real network."""
     nodes: Dict[ChordKey, NetworkedChordNode] = field(default_factory=dict)
     logger: Callable[[ChordRequest], None] = field(default=lambda m: None)
+    latency: Callable[[Optional[ChordKey], ChordKey], float] = \
+        field(default=lambda sender, receiver: 0.0, repr=False)
+    drop: Callable[[Optional[ChordKey], ChordKey], bool] = \
+        field(default=lambda sender, receiver: False, repr=False)
+    timeout_secs: float = 1.0
+    clock: VirtualClock = field(default_factory=VirtualClock)
 
     def register_node(self, node: NetworkedChordNode):
         self.nodes[node.node_id] = node
 
-    def __call__(self, message: ChordRequest) -> ChordResponse:
+    def unregister_node(self, node_id: ChordKey):
+        self.nodes.pop(node_id, None)
+
+    def register_host(self, host: VirtualNodeHost):
+        for vnode in host.vnodes:
+            self.register_node(vnode)
+
+    def link(self, sender_id: ChordKey) -> RequestSender:
+        """A request sender for the given node, so the latency of its
+        messages can depend on where they come from."""
+        return partial(self, sender_id=sender_id)
+
+    def __call__(self, message: ChordRequest,
+                 sender_id: Optional[ChordKey]=None) -> ChordResponse:
         self.logger(message)
-        # TODO: add random latency to harden the protocol
-        # TODO: add message loss to harden the protocol
-        # latency = randint(1, 10) / 1000
-        # sleep(latency)
-        receiver = self.nodes[message.forward_id]
+        receiver = self.nodes.get(message.forward_id)
+        delay = self.latency(sender_id, message.forward_id)
+        if receiver is None or self.drop(sender_id, message.forward_id) \
+                or 2 * delay > self.timeout_secs:
+            self.clock.advance(self.timeout_secs)
+            raise TimeoutError(f"{message.forward_id} didn't answer in time")
+        self.clock.advance(delay)
         response = receiver.process_message(message)
+        self.clock.advance(delay)
+        return response
+
+
+def create_ring(network: VirtualNetwork, node_ids: List[IPEndpointId],
+                stabilize_rounds: int=3, **node_options) -> List[NetworkedChordNode]:
+    """Joins nodes of the given ids through the smallest one into a ring on
+    the network and stabilizes it. The nodes join in the given order, as
+    joining them by id would make lookups walk the ring node by node until
+    the fingers got fixed. The nodes are returned ordered by id."""
+    nodes = [NetworkedChordNode(node_id, network.link(node_id), **node_options)
+             for node_id in node_ids]
+    for node in nodes:
+        network.register_node(node)
+    bootstrap_id = min(node_ids)
+    for node in nodes:
+        node.node.initiate_join(ChordRemoteEndpoint(node.node_id, bootstrap_id, node.sender))
+    for node in nodes:
+        node.node.update_finger_table()
+    for _ in range(stabilize_rounds):
+        for node in nodes:
+            node.node.stabilize()
+    return sorted(nodes, key=lambda node: node.node_id)
+
+
+@dataclass
+class AsyncVirtualNetwork:
+    nodes: Dict[ChordKey, AsyncNetworkedChordNode] = field(default_factory=dict)
+    logger: Callable[[ChordRequest], None] = field(default=lambda m: None)
+
+    def register_node(self, node: AsyncNetworkedChordNode):
+        self.nodes[node.node_id] = node
+
+    async def __call__(self, message: ChordRequest) -> ChordResponse:
+        self.logger(message)
+        # yield to the event loop like a real network round trip would
+        await asyncio.sleep(0)
+        receiver = self.nodes[message.forward_id]
+        response = await receiver.process_message(message)
         return response
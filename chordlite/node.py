@@ -1,16 +1,73 @@
 from __future__ import annotations
 from enum import IntEnum
-from typing import List, Tuple, Optional, Protocol
+from typing import List, Tuple, Optional, Protocol, Callable, TypeVar, Set, Iterator
 from dataclasses import dataclass, field
+from contextlib import contextmanager
+from contextvars import ContextVar
 from math import log2, ceil
+from bisect import bisect_left
 from threading import Lock
-from chordlite.key import ChordKey
+from time import perf_counter, sleep
+from random import random
+from chordlite.key import ChordKey, ring_distance, in_interval
+from chordlite.metrics import ChordMetrics
+from chordlite.admission import JoinAdmission
+
+T = TypeVar("T")
 
 
 class ChordStatus(IntEnum):
     SUCCESS = 0
     FAILURE = 1
     TIMEOUT = 2
+    BUSY = 3
+
+
+class RoutingFailure(Exception):
+    """A request couldn't be routed to the node responsible for it."""
+
+
+class PeerUnreachable(RoutingFailure):
+    """A peer didn't answer in time or couldn't be reached at all."""
+
+    def __init__(self, peer_id: ChordKey):
+        super().__init__(f"{peer_id} is unreachable")
+        self.peer_id = peer_id
+
+
+class PeerBusy(RoutingFailure):
+    """A peer turned a request away because it's overloaded, so another
+    hop or a later attempt may succeed although the peer is alive."""
+
+    def __init__(self, peer_id: ChordKey):
+        super().__init__(f"{peer_id} is busy")
+        self.peer_id = peer_id
+
+
+class ServerBusy(OSError):
+    """Raised by senders when the receiver answered that it's too busy to
+    take the request, e.g. with HTTP 503, so it's alive but overloaded."""
+
+
+# hops of the recursive lookup this thread works on, so the node starting
+# the lookup learns how often it got forwarded in total
+current_hops: ContextVar[Optional[List[int]]] = ContextVar("current_hops", default=None)
+
+
+@contextmanager
+def counted_hops() -> Iterator[List[int]]:
+    hops = [0]
+    token = current_hops.set(hops)
+    try:
+        yield hops
+    finally:
+        current_hops.reset(token)
+
+
+def count_hops(num_hops: int=1):
+    hops = current_hops.get()
+    if hops is not None:
+        hops[0] += num_hops
 
 
 class ChordEndpoint(Protocol):
@@ -23,18 +80,79 @@ class ChordEndpoint(Protocol):
     def successor(self) -> ChordEndpoint:
         raise NotImplementedError()
 
+    @property
+    def predecessor(self) -> Optional[ChordEndpoint]:
+        raise NotImplementedError()
+
+    @property
+    def successor_list(self) -> List[ChordEndpoint]:
+        raise NotImplementedError()
+
     def find_successor(self, key: ChordKey) -> ChordEndpoint:
         raise NotImplementedError()
 
+    def find_successors(self, keys: List[ChordKey]) -> List[ChordEndpoint]:
+        raise NotImplementedError()
+
     def find_predecessor(self, key: ChordKey) -> ChordEndpoint:
         raise NotImplementedError()
 
+    def next_hop(self, key: ChordKey) -> ChordEndpoint:
+        raise NotImplementedError()
+
     def challenge_join(self, joining_node: ChordEndpoint) -> Tuple[ChordStatus, ChordEndpoint]:
         raise NotImplementedError()
 
     def notify(self, new_successor: ChordEndpoint) -> ChordStatus:
         raise NotImplementedError()
 
+    def notify_predecessor(self, new_predecessor: ChordEndpoint) -> ChordStatus:
+        raise NotImplementedError()
+
+    def replace_neighbor(self, leaving_node: ChordEndpoint,
+                         replacement: ChordEndpoint) -> ChordStatus:
+        raise NotImplementedError()
+
+    def ping(self) -> ChordStatus:
+        raise NotImplementedError()
+
+
+@dataclass
+class FingerIndex:
+    """Distinct fingers of a node, sorted by their ring distance from the node.
+
+    The finger table of a large keyspace mostly consists of duplicates,
+    so routing decisions are made on this compact index instead. The
+    index is immutable and gets swapped as a whole on finger updates,
+    so concurrent readers always see a consistent snapshot."""
+    distances: List[int]
+    endpoints: List[ChordEndpoint]
+
+    @staticmethod
+    def build(origin: ChordKey, fingers: List[ChordEndpoint]) -> FingerIndex:
+        origin_value, keyspace = origin.value, origin.keyspace
+        distinct = {}
+        for finger in fingers:
+            dist = ring_distance(origin_value, finger.node_id.value, keyspace)
+            if dist not in distinct:
+                distinct[dist] = finger
+        distances = sorted(distinct)
+        return FingerIndex(distances, [distinct[d] for d in distances])
+
+    def closest_preceding(self, key_dist: int) -> ChordEndpoint:
+        # the finger with the largest distance below the key's distance
+        # precedes the key; if there's none, wrap around to the farthest one
+        pos = bisect_left(self.distances, key_dist)
+        return self.endpoints[pos - 1] if pos > 0 else self.endpoints[-1]
+
+    def preceding(self, key_dist: int, count: int) -> List[Tuple[int, ChordEndpoint]]:
+        """Up to count fingers preceding the key, closest to the key first,
+        as pairs of distance and finger. The node itself is never included."""
+        pos = bisect_left(self.distances, key_dist)
+        first = max(pos - count, 0)
+        return [(self.distances[i], self.endpoints[i])
+                for i in range(pos - 1, first - 1, -1) if self.distances[i] > 0]
+
 
 @dataclass
 class ChordNode:
@@ -42,75 +160,517 @@ class ChordNode:
     predecessor: Optional[ChordEndpoint] = field(init=False)
     fingers: List[ChordEndpoint] = field(init=False)
     finger_starts: List[ChordKey] = field(init=False)
+    finger_index: FingerIndex = field(init=False, repr=False, compare=False)
     chall_join_mutex: Lock = field(default_factory=Lock)
+    iterative_lookup: bool = False
+    max_join_attempts: int = 16
+    successor_list_size: int = 4
+    successor_list: List[ChordEndpoint] = field(init=False, repr=False, compare=False)
+    on_ring_change: Callable[[ChordEndpoint], None] = \
+        field(default=lambda e: None, repr=False, compare=False)
+    proximity: Callable[[ChordEndpoint], Optional[float]] = \
+        field(default=lambda e: None, repr=False, compare=False)
+    probe: Callable[[ChordEndpoint], None] = \
+        field(default=lambda e: None, repr=False, compare=False)
+    pns_candidates: int = 0
+    proximity_hops: int = 1
+    is_suspected: Callable[[ChordEndpoint], bool] = \
+        field(default=lambda e: False, repr=False, compare=False)
+    max_route_attempts: int = 3
+    metrics: Optional[ChordMetrics] = field(default=None, repr=False, compare=False)
+    admission: Optional[JoinAdmission] = field(default=None, repr=False, compare=False)
+    join_backoff_secs: float = 0.01
+    max_join_backoff_secs: float = 1.0
+    sleep: Callable[[float], None] = field(default=sleep, repr=False, compare=False)
+    next_finger: int = field(init=False, default=0, repr=False, compare=False)
 
     def __post_init__(self):
         num_fingers = int(ceil(log2(self.node_id.keyspace)))
         self.fingers = [self for _ in range(num_fingers)]
         self.finger_starts = [self.node_id + 2**i for i in range(num_fingers)]
         self.predecessor = None
+        self.successor_list = [self]
+        self.finger_index = FingerIndex.build(self.node_id, self.fingers)
 
     @property
     def successor(self) -> ChordEndpoint:
         return self.fingers[0]
 
+    @property
+    def live_successor(self) -> ChordEndpoint:
+        """The successor, or the first successor not suspected to have failed."""
+        for succ in self.successor_list:
+            if not self.is_suspected(succ):
+                return succ
+        return self.successor
+
     @property
     def is_uninitialized(self) -> bool:
         return self.successor.node_id == self.node_id
 
     def find_successor(self, key: ChordKey) -> ChordEndpoint:
         pred = self.find_predecessor(key)
-        return pred.successor
+        return self.live_successor if pred.node_id == self.node_id else pred.successor
 
-    def find_predecessor(self, key: ChordKey) -> ChordEndpoint:
+    def find_successors(self, keys: List[ChordKey]) -> List[ChordEndpoint]:
         if self.is_uninitialized:
+            return [self for _ in keys]
+
+        # walking the keys in ring order makes the keys routed via the same
+        # finger a contiguous run, which gets forwarded as a single batch
+        node_value, keyspace = self.node_id.value, self.node_id.keyspace
+        key_dists = [ring_distance(node_value, k.value, keyspace) for k in keys]
+        succ = self.successor
+        succ_dist = ring_distance(node_value, succ.node_id.value, keyspace)
+        successors: List[Optional[ChordEndpoint]] = [None for _ in keys]
+        forward, batch = None, []
+
+        def resolve_batch():
+            if batch:
+                batch_keys = [keys[i] for i in batch]
+                try:
+                    resolved = forward.find_successors(batch_keys)
+                except RoutingFailure as failure:
+                    resolved = self.resolve_via_fallbacks(
+                        batch_keys[0], forward, lambda hop: hop.find_successors(batch_keys),
+                        failure)
+                if len(resolved) != len(batch_keys):
+                    # a malformed answer mustn't leave keys unresolved, so look them up one by one
+                    resolved = [forward.find_successor(key) for key in batch_keys]
+                for i, endpoint in zip(batch, resolved):
+                    successors[i] = endpoint
+
+        for i in sorted(range(len(keys)), key=lambda i: key_dists[i]):
+            if key_dists[i] <= succ_dist:
+                successors[i] = succ
+                continue
+            finger = self.finger_index.closest_preceding(key_dists[i])
+            if self.is_suspected(finger):
+                finger = self.closest_preceding_finger(keys[i])
+            if forward is None or finger.node_id != forward.node_id:
+                resolve_batch()
+                forward, batch = finger, []
+            batch.append(i)
+        resolve_batch()
+        return successors
+
+    def find_predecessor(self, key: ChordKey) -> ChordEndpoint:
+        if self.iterative_lookup:
+            return self.find_predecessor_iteratively(key)
+        elif self.metrics is not None and current_hops.get() is None:
+            return self.find_predecessor_counted(key)
+        elif self.is_uninitialized:
             return self
-        elif key - self.node_id <= self.successor.node_id - self.node_id:
+        elif self.precedes(key):
             return self
         else:
             forward = self.closest_preceding_finger(key)
-            return forward.find_predecessor(key)
+            try:
+                count_hops()
+                return forward.find_predecessor(key)
+            except RoutingFailure as failure:
+                try:
+                    return self.resolve_via_fallbacks(
+                        key, forward, lambda hop: hop.find_predecessor(key), failure)
+                except RoutingFailure:
+                    # all nodes up to the key failed, so this is the closest live one
+                    if self.is_suspected(self.successor):
+                        return self
+                    raise
+
+    def resolve_via_fallbacks(self, key: ChordKey, failed_hop: ChordEndpoint,
+                              request: Callable[[ChordEndpoint], T],
+                              failure: RoutingFailure) -> T:
+        for hop in self.fallback_hops(key, failed_hop):
+            try:
+                count_hops()
+                return request(hop)
+            except RoutingFailure as next_failure:
+                failure = next_failure
+        raise failure
+
+    def find_predecessor_counted(self, key: ChordKey) -> ChordEndpoint:
+        # the lookup starts here, the nodes it gets forwarded to report
+        # their hops with their answers
+        with counted_hops() as hops:
+            pred = self.find_predecessor(key)
+        self.metrics.lookup_hops.observe(hops[0])
+        return pred
+
+    def find_predecessor_iteratively(self, key: ChordKey) -> ChordEndpoint:
+        # each hop only tells the next hop, so this node drives the walk
+        # instead of tying up the intermediate nodes until the lookup is done
+        hop: ChordEndpoint = self
+        next_hop = self.next_hop(key)
+        failed_ids, num_hops = set(), 0
+        while next_hop.node_id != hop.node_id:
+            if next_hop.node_id not in failed_ids:
+                try:
+                    hop, next_hop = next_hop, next_hop.next_hop(key)
+                    num_hops += 1
+                    continue
+                except RoutingFailure:
+                    failed_ids.add(next_hop.node_id)
+            if len(failed_ids) >= self.max_route_attempts:
+                raise RoutingFailure(f"{self.node_id} found no route to {key}")
+            next_hop = self.skip_failed_hops(hop, key, failed_ids)
+        if self.metrics is not None:
+            self.metrics.lookup_hops.observe(num_hops)
+        return hop
+
+    def skip_failed_hops(self, hop: ChordEndpoint, key: ChordKey,
+                         failed_ids: Set[ChordKey]) -> ChordEndpoint:
+        # the last hop that answered may keep pointing to a failed node,
+        # so continue with the closest of its successors preceding the key
+        if hop.node_id == self.node_id:
+            preceding = self.fallback_hops(key, self) + [self.successor]
+        else:
+            hop_value, keyspace = hop.node_id.value, hop.node_id.keyspace
+            key_dist = ring_distance(hop_value, key.value, keyspace)
+            preceding = [
+                succ for succ in reversed(hop.successor_list)
+                if 0 < ring_distance(hop_value, succ.node_id.value, keyspace) < key_dist]
+        for succ in preceding:
+            if succ.node_id not in failed_ids:
+                return succ
+        # once all nodes up to the key are known to have failed, the hop is the
+        # closest live one, but a single lost message doesn't prove that yet
+        if all(self.is_suspected(succ) for succ in preceding):
+            return hop
+        raise RoutingFailure(f"{self.node_id} found no route to {key}")
+
+    def next_hop(self, key: ChordKey) -> ChordEndpoint:
+        if self.is_uninitialized or self.precedes(key):
+            return self
+        else:
+            return self.closest_preceding_finger(key)
+
+    def is_responsible(self, key: ChordKey) -> bool:
+        pred = self.predecessor
+        if pred is None:
+            return True
+        node_id = self.node_id
+        return in_interval(key.value, pred.node_id.value, node_id.value,
+                           node_id.keyspace, inclusive=True)
+
+    def precedes(self, key: ChordKey) -> bool:
+        node_id = self.node_id
+        node_value, keyspace = node_id.value, node_id.keyspace
+        return ring_distance(node_value, key.value, keyspace) \
+            <= ring_distance(node_value, self.successor.node_id.value, keyspace)
 
     def closest_preceding_finger(self, key: ChordKey) -> ChordEndpoint:
-        return max(self.fingers, key=lambda f: f.node_id - key)
+        node_id = self.node_id
+        key_dist = ring_distance(node_id.value, key.value, node_id.keyspace)
+        finger = None
+        if self.proximity_hops > 1:
+            candidates = self.finger_index.preceding(key_dist, self.proximity_hops)
+            if len(candidates) > 1:
+                finger = self.select_hop(key_dist, candidates)
+        if finger is None:
+            finger = self.finger_index.closest_preceding(key_dist)
+        if self.is_suspected(finger):
+            fallbacks = self.fallback_hops(key, finger)
+            finger = fallbacks[0] if fallbacks else finger
+        return finger
+
+    def fallback_hops(self, key: ChordKey, failed_hop: ChordEndpoint) -> List[ChordEndpoint]:
+        """Other fingers and successors preceding the key that aren't suspected
+        to have failed, closest to the key first."""
+        node_value, keyspace = self.node_id.value, self.node_id.keyspace
+        key_dist = ring_distance(node_value, key.value, keyspace)
+        num_fingers = len(self.finger_index.distances)
+        hops_by_dist = dict(self.finger_index.preceding(key_dist, num_fingers))
+        for succ in self.successor_list:
+            dist = ring_distance(node_value, succ.node_id.value, keyspace)
+            if 0 < dist < key_dist:
+                hops_by_dist.setdefault(dist, succ)
+        hops = [hops_by_dist[dist] for dist in sorted(hops_by_dist, reverse=True)]
+        return [hop for hop in hops if hop.node_id != failed_hop.node_id
+                and not self.is_suspected(hop)][:self.max_route_attempts]
+
+    def select_hop(self, key_dist: int,
+                   candidates: List[Tuple[int, ChordEndpoint]]) -> ChordEndpoint:
+        # trade the latency to a finger against the extra hops it likely costs,
+        # each hop roughly halving the distance that's left to the key
+        rtts = [self.proximity(finger) for _, finger in candidates]
+        known_rtts = [rtt for rtt in rtts if rtt is not None]
+        if not known_rtts:
+            return candidates[0][1]
+        mean_rtt = sum(known_rtts) / len(known_rtts)
+        closest_remaining = key_dist - candidates[0][0]
+
+        def cost(i: int) -> float:
+            rtt = rtts[i] if rtts[i] is not None else mean_rtt
+            extra_hops = log2((key_dist - candidates[i][0]) / closest_remaining)
+            return rtt + mean_rtt * extra_hops
+
+        return candidates[min(range(len(candidates)), key=cost)][1]
+
+    def reindex_fingers(self):
+        old_index, self.finger_index = \
+            self.finger_index, FingerIndex.build(self.node_id, self.fingers)
+        if self.metrics is not None:
+            old_ids = {finger.node_id for finger in old_index.endpoints}
+            self.metrics.finger_changes.inc(amount=sum(
+                1 for finger in self.finger_index.endpoints if finger.node_id not in old_ids))
+
+    def set_all_fingers(self, endpoint: ChordEndpoint):
+        for i in range(len(self.fingers)):
+            self.fingers[i] = endpoint
+        self.successor_list = [endpoint]
+        self.reindex_fingers()
+        self.on_ring_change(endpoint)
+
+    def set_successor(self, endpoint: ChordEndpoint):
+        self.fingers[0] = endpoint
+        self.update_successor_list(self.successor_list)
+        self.reindex_fingers()
+        self.on_ring_change(endpoint)
+
+    def update_successor_list(self, successors: List[ChordEndpoint]):
+        # the list ends once it wraps around to this node, so small rings
+        # still list every other node (and this node) exactly once
+        successor_list = [self.successor]
+        seen = {self.successor.node_id}
+        for endpoint in successors:
+            if len(successor_list) >= self.successor_list_size \
+                    or successor_list[-1].node_id == self.node_id:
+                break
+            if endpoint.node_id not in seen:
+                seen.add(endpoint.node_id)
+                successor_list.append(endpoint)
+        self.successor_list = successor_list
 
     def update_finger_table(self, bootstrap: Optional[ChordEndpoint]=None):
         forward = bootstrap if bootstrap else self
-        for i, key in enumerate(self.finger_starts):
-            self.fingers[i] = forward.find_successor(key)
+        self.fingers = forward.find_successors(self.finger_starts)
+        self.reindex_fingers()
+
+    def fix_fingers(self, count: int=1):
+        for _ in range(count):
+            try:
+                self.next_finger = self.resolve_finger(self.next_finger, self) % len(self.fingers)
+            except RoutingFailure:
+                # keep the old finger for now, the next round tries again
+                self.next_finger = (self.next_finger + 1) % len(self.fingers)
+        self.reindex_fingers()
+
+    def resolve_finger(self, i: int, forward: ChordEndpoint) -> int:
+        succ = forward.find_successor(self.finger_starts[i])
+        if i > 0 and self.pns_candidates > 0:
+            succ = self.nearest_in_finger_range(i, succ)
+        return self.assign_finger(i, succ)
+
+    def nearest_in_finger_range(self, i: int, succ: ChordEndpoint) -> ChordEndpoint:
+        # any node in [start_i, start_i+1) serves as i-th finger without
+        # costing extra hops, so pick the one with the lowest latency
+        node_value, keyspace = self.node_id.value, self.node_id.keyspace
+        end_dist = ring_distance(node_value, self.finger_starts[i + 1].value, keyspace) \
+            if i + 1 < len(self.finger_starts) else keyspace
+        succ_dist = ring_distance(node_value, succ.node_id.value, keyspace)
+        if succ_dist == 0 or succ_dist >= end_dist:
+            return succ
+
+        candidates = [succ] + [
+            e for e in succ.successor_list[:self.pns_candidates]
+            if 0 < ring_distance(node_value, e.node_id.value, keyspace) < end_dist]
+
+        def cached_rtt(endpoint: ChordEndpoint) -> float:
+            rtt = self.proximity(endpoint)
+            if rtt is None:
+                # measured in the background, so the next update of the finger knows it
+                self.probe(endpoint)
+                return float("inf")
+            return rtt
+
+        return min(candidates, key=cached_rtt)
+
+    def assign_finger(self, i: int, succ: ChordEndpoint) -> int:
+        # all following fingers starting before the resolved successor
+        # point to the same node, so they can be assigned without a lookup
+        node_value, keyspace = self.node_id.value, self.node_id.keyspace
+        succ_dist = ring_distance(node_value, succ.node_id.value, keyspace)
+        self.fingers[i] = succ
+        i += 1
+        while i < len(self.fingers) and \
+                ring_distance(node_value, self.finger_starts[i].value, keyspace) <= succ_dist:
+            self.fingers[i] = succ
+            i += 1
+        return i
+
+    def stabilize(self):
+        self.check_predecessor()
+        if self.is_uninitialized:
+            return
+        try:
+            candidate = self.successor.predecessor
+            if candidate is not None and self.is_suspected(candidate):
+                candidate = None
+            successor = self.consider_successor(candidate)
+            successor.notify_predecessor(self)
+            self.update_successor_list(successor.successor_list)
+        except RoutingFailure:
+            if self.is_suspected(self.successor):
+                self.drop_successor()
+
+    def check_predecessor(self):
+        # forget a failed predecessor, so the next node notifying this one takes over
+        pred = self.predecessor
+        if pred is None or pred.node_id == self.node_id:
+            return
+        try:
+            pred.ping()
+        except RoutingFailure:
+            if self.is_suspected(pred):
+                self.predecessor = None
+                self.on_ring_change(pred)
+
+    def drop_successor(self):
+        # the next live node of the successor list takes over the failed successor
+        failed = self.successor
+        replacements = [s for s in self.successor_list[1:]
+                        if s.node_id != failed.node_id and not self.is_suspected(s)]
+        self.replace_neighbor(failed, replacements[0] if replacements else self)
+
+    def consider_successor(self, candidate: Optional[ChordEndpoint]) -> ChordEndpoint:
+        successor = self.successor
+        node_id = self.node_id
+        if candidate is not None and in_interval(
+                candidate.node_id.value, node_id.value,
+                successor.node_id.value, node_id.keyspace):
+            self.set_successor(candidate)
+            successor = candidate
+        return successor
 
     def initiate_join(self, bootstrap: ChordEndpoint):
-        if bootstrap.node_id != self.node_id:
+        # a node others joined through already is part of the ring, and joining
+        # once more would leave it as its own successor and predecessor
+        if bootstrap.node_id != self.node_id and self.is_uninitialized:
             self.predecessor = self
-            new_successor = bootstrap.find_successor(self.node_id)
-            status, new_predecessor = new_successor.challenge_join(self)
-            # TODO: add error handling
+            status = ChordStatus.FAILURE
+            for attempt in range(self.max_join_attempts):
+                try:
+                    new_successor = bootstrap.find_successor(self.node_id)
+                    status, new_predecessor = new_successor.challenge_join(self)
+                except RoutingFailure:
+                    status = ChordStatus.FAILURE
+                    continue
+                if status == ChordStatus.SUCCESS:
+                    break
+                if status == ChordStatus.BUSY:
+                    self.sleep(self.join_backoff(attempt))
+            if status != ChordStatus.SUCCESS:
+                raise RuntimeError(f"Node {self.node_id} failed to join the network!")
 
-            for i in range(len(self.fingers)):
-                self.fingers[i] = new_successor
-            self.update_finger_table(new_successor)
+            # the fingers get repaired by the background maintenance
+            self.set_all_fingers(new_successor)
 
             self.predecessor = new_predecessor
             if self.predecessor.node_id != self.successor.node_id:
-                status = self.predecessor.notify(self)
-                # TODO: add error handling
+                try:
+                    self.predecessor.notify(self)
+                except RoutingFailure:
+                    # stabilizing the predecessor finds this node later on
+                    pass
+            try:
+                # tells the successor the join is done, so it takes on further joins
+                new_successor.notify_predecessor(self)
+            except RoutingFailure:
+                # the successor's admission lets the join expire instead
+                pass
+
+    def join_backoff(self, attempt: int) -> float:
+        # jittered, so joiners turned away together don't come back together
+        backoff = min(self.join_backoff_secs * 2**attempt, self.max_join_backoff_secs)
+        return backoff * (0.5 + random())
 
     def challenge_join(self, joining_node: ChordEndpoint) -> Tuple[ChordStatus, ChordEndpoint]:
+        if self.admission is None:
+            return self.admit_join(joining_node)
+        # joins beyond the limits are turned away before queueing for the lock,
+        # and admitted ones count until the joiner confirmed them
+        if not self.admission.try_admit(joining_node.node_id):
+            if self.metrics is not None:
+                self.metrics.join_rejections.inc()
+            return ChordStatus.BUSY, self
+        status, predecessor = self.admit_join(joining_node)
+        if status != ChordStatus.SUCCESS:
+            self.admission.release(joining_node.node_id)
+        return status, predecessor
+
+    def admit_join(self, joining_node: ChordEndpoint) -> Tuple[ChordStatus, ChordEndpoint]:
+        # only swap pointers while holding the lock, so concurrent joins
+        # at the same successor don't serialize behind remote lookups
+        wait_start = perf_counter() if self.metrics is not None else 0.0
         with self.chall_join_mutex:
-            old_predecessor = self if self.is_uninitialized else self.predecessor
-            self.predecessor = joining_node
+            if self.metrics is not None:
+                self.metrics.join_lock_wait_secs.observe(perf_counter() - wait_start)
             if self.is_uninitialized:
-                for i in range(len(self.fingers)):
-                    self.fingers[i] = joining_node
-            else:
-                self.update_finger_table()
-            if self.node_id != old_predecessor.node_id:
-                self.predecessor.notify(joining_node)
-            return ChordStatus.SUCCESS, old_predecessor
+                self.predecessor = joining_node
+                self.set_all_fingers(joining_node)
+                return ChordStatus.SUCCESS, self
+
+            old_predecessor = self.predecessor
+            node_id = self.node_id
+            if old_predecessor is not None and old_predecessor.node_id != node_id \
+                    and not in_interval(joining_node.node_id.value, old_predecessor.node_id.value,
+                                        node_id.value, node_id.keyspace):
+                # another node joined in between, so the joining node has to retry
+                return ChordStatus.FAILURE, old_predecessor
+
+            self.predecessor = joining_node
+            self.on_ring_change(joining_node)
+            return ChordStatus.SUCCESS, old_predecessor if old_predecessor else self
 
     def notify(self, new_successor: ChordEndpoint) -> ChordStatus:
         old_successor = self.fingers[0]
-        if new_successor.node_id - self.node_id < old_successor.node_id - self.node_id:
-            self.fingers[0] = new_successor
-            self.update_finger_table()
+        node_value, keyspace = self.node_id.value, self.node_id.keyspace
+        if ring_distance(node_value, new_successor.node_id.value, keyspace) \
+                < ring_distance(node_value, old_successor.node_id.value, keyspace):
+            self.set_successor(new_successor)
+        return ChordStatus.SUCCESS
+
+    def notify_predecessor(self, new_predecessor: ChordEndpoint) -> ChordStatus:
+        if self.admission is not None:
+            self.admission.release(new_predecessor.node_id)
+        old_predecessor = self.predecessor
+        node_id = self.node_id
+        if old_predecessor is None or old_predecessor.node_id == node_id or in_interval(
+                new_predecessor.node_id.value, old_predecessor.node_id.value,
+                node_id.value, node_id.keyspace):
+            if old_predecessor is None or old_predecessor.node_id != new_predecessor.node_id:
+                self.on_ring_change(new_predecessor)
+            self.predecessor = new_predecessor
+        return ChordStatus.SUCCESS
+
+    def ping(self) -> ChordStatus:
+        return ChordStatus.SUCCESS
+
+    def leave(self):
+        successor, predecessor = self.successor, self.predecessor
+        if self.is_uninitialized or predecessor is None:
+            return
+        # splice this node out by pointing both neighbors at each other
+        successor.replace_neighbor(self, predecessor)
+        if predecessor.node_id != successor.node_id:
+            predecessor.replace_neighbor(self, successor)
+        self.predecessor = None
+        self.set_all_fingers(self)
+
+    def replace_neighbor(self, leaving_node: ChordEndpoint,
+                         replacement: ChordEndpoint) -> ChordStatus:
+        leaving_id = leaving_node.node_id
+        if self.predecessor is not None and self.predecessor.node_id == leaving_id:
+            self.predecessor = replacement if replacement.node_id != self.node_id else None
+            self.on_ring_change(leaving_node)
+        if self.successor.node_id == leaving_id:
+            # the fingers pointing to the leaving node fall through to its successor
+            for i, finger in enumerate(self.fingers):
+                if finger.node_id == leaving_id:
+                    self.fingers[i] = replacement
+            successors = [s for s in self.successor_list if s.node_id != leaving_id]
+            self.update_successor_list(successors)
+            self.reindex_fingers()
+            self.on_ring_change(leaving_node)
         return ChordStatus.SUCCESS
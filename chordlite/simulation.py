@@ -0,0 +1,323 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from bisect import bisect_left
+from collections import Counter
+from heapq import heappush, heappop
+from math import inf
+from random import Random
+
+from chordlite.key import ChordKey, ResourceKey
+from chordlite.endpoint import IPEndpointId
+from chordlite.transport import \
+    ChordRequest, ChordRequestType, ChordRemoteEndpoint, NetworkedChordNode
+from chordlite.network import VirtualNetwork, VirtualClock
+
+
+LatencyModel = Callable[[Optional[ChordKey], ChordKey], float]
+HOP_REQUESTS = { ChordRequestType.FIND_PRED, ChordRequestType.NEXT_HOP }
+
+
+def constant_latency(secs: float) -> LatencyModel:
+    return lambda sender, receiver: secs
+
+
+def uniform_latency(min_secs: float, max_secs: float, seed: int=42) -> LatencyModel:
+    rng = Random(seed)
+    return lambda sender, receiver: rng.uniform(min_secs, max_secs)
+
+
+def region_latency(num_regions: int, local_secs: float, remote_secs: float) -> LatencyModel:
+    """Hosts are spread over regions by their key; messages between
+    regions take remote_secs, messages within a region local_secs."""
+    def latency(sender: Optional[ChordKey], receiver: ChordKey) -> float:
+        if sender is None or sender.value % num_regions == receiver.value % num_regions:
+            return local_secs
+        return remote_secs
+    return latency
+
+
+@dataclass
+class PartitionModel:
+    """Splits the hosts by their key into groups that can't reach
+    each other between start_secs and end_secs of simulated time."""
+    num_groups: int = 2
+    start_secs: float = 0.0
+    end_secs: float = inf
+
+    def separates(self, sender: Optional[ChordKey], receiver: ChordKey, now: float) -> bool:
+        if sender is None or not self.start_secs <= now < self.end_secs:
+            return False
+        return sender.value % self.num_groups != receiver.value % self.num_groups
+
+
+@dataclass
+class ChurnEvent:
+    at_secs: float
+    joins: int = 0
+    leaves: int = 0
+    crashes: int = 0
+
+
+def percentile(values: List[float], share: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(share * len(ordered)), len(ordered) - 1)]
+
+
+@dataclass
+class SimulationReport:
+    num_nodes: int
+    lookups: int
+    failed_lookups: int
+    wrong_lookups: int
+    hop_counts: Dict[int, int]
+    lookup_latencies: List[float] = field(repr=False)
+    messages: Dict[str, int]
+    dropped_messages: int
+    failed_maintenance: int
+    convergence_secs: Optional[float]
+
+    @property
+    def mean_hops(self) -> float:
+        total = sum(self.hop_counts.values())
+        return sum(h * c for h, c in self.hop_counts.items()) / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "num_nodes": self.num_nodes,
+            "lookups": self.lookups,
+            "failed_lookups": self.failed_lookups,
+            "wrong_lookups": self.wrong_lookups,
+            "hop_counts": dict(sorted(self.hop_counts.items())),
+            "mean_hops": self.mean_hops,
+            "lookup_latency_p50_secs": percentile(self.lookup_latencies, 0.5),
+            "lookup_latency_p99_secs": percentile(self.lookup_latencies, 0.99),
+            "messages": self.messages,
+            "dropped_messages": self.dropped_messages,
+            "failed_maintenance": self.failed_maintenance,
+            "convergence_secs": self.convergence_secs
+        }
+
+
+@dataclass
+class RingSimulation:
+    """Discrete-event simulation of a Chord ring running in one process.
+
+    Joins, leaves, crashes, maintenance rounds and lookups are events on
+    a simulated timeline, so nothing ever sleeps. The network and the nodes
+    share one clock that moves to the time of each event, and the messages
+    an event sends advance it from there, so a lookup takes as long as its
+    messages while timeouts and TTLs of the nodes follow the timeline. Message
+    loss and partitions make the affected messages fail like on a real
+    network, and the report tells how the protocol coped with them."""
+    num_nodes: int
+    keyspace: int = 1 << 32
+    latency: LatencyModel = field(default=constant_latency(0.0), repr=False)
+    loss_rate: float = 0.0
+    partition: Optional[PartitionModel] = None
+    maintenance_interval_secs: float = 1.0
+    fingers_per_update: int = 4
+    successor_list_size: int = 4
+    iterative_lookup: bool = True
+    seed: int = 42
+    node_options: Dict[str, Any] = field(default_factory=dict)
+    clock: VirtualClock = field(init=False, default_factory=VirtualClock)
+    network: VirtualNetwork = field(init=False)
+    nodes: Dict[IPEndpointId, NetworkedChordNode] = field(init=False, default_factory=dict)
+    live_ids: List[IPEndpointId] = field(init=False, default_factory=list, repr=False)
+    events: List[Tuple[float, int, Callable[[], None]]] = \
+        field(init=False, default_factory=list, repr=False)
+    rng: Random = field(init=False, repr=False)
+    next_host: int = field(init=False, default=0, repr=False)
+    num_events: int = field(init=False, default=0, repr=False)
+    messages: Counter = field(init=False, default_factory=Counter, repr=False)
+    hops: int = field(init=False, default=0, repr=False)
+    dropped_messages: int = field(init=False, default=0, repr=False)
+    lookups: int = field(init=False, default=0, repr=False)
+    failed_lookups: int = field(init=False, default=0, repr=False)
+    wrong_lookups: int = field(init=False, default=0, repr=False)
+    hop_counts: Counter = field(init=False, default_factory=Counter, repr=False)
+    lookup_latencies: List[float] = field(init=False, default_factory=list, repr=False)
+    failed_maintenance: int = field(init=False, default=0, repr=False)
+    last_churn_at: float = field(init=False, default=0.0, repr=False)
+    converged_at: Optional[float] = field(init=False, default=None, repr=False)
+
+    def __post_init__(self):
+        self.rng = Random(self.seed)
+        self.network = VirtualNetwork(
+            logger=self.count_message, latency=self.latency, drop=self.drops,
+            clock=self.clock)
+
+    def count_message(self, message: ChordRequest):
+        self.messages[message.request_type.name] += 1
+        if message.request_type in HOP_REQUESTS:
+            self.hops += 1
+
+    def drops(self, sender: Optional[ChordKey], receiver: ChordKey) -> bool:
+        is_dropped = (self.loss_rate > 0 and self.rng.random() < self.loss_rate) or \
+            (self.partition is not None and
+             self.partition.separates(sender, receiver, self.clock()))
+        self.dropped_messages += is_dropped
+        return is_dropped
+
+    def schedule(self, at_secs: float, action: Callable[[], None]):
+        self.num_events += 1
+        heappush(self.events, (at_secs, self.num_events, action))
+
+    def run(self, until_secs: float) -> SimulationReport:
+        while self.events and self.events[0][0] <= until_secs:
+            at_secs, _, action = heappop(self.events)
+            # events overlap in simulated time, so the latencies of one
+            # event must not delay the ones that are due while it runs
+            self.clock.now = at_secs
+            action()
+        self.clock.now = until_secs
+        return self.report()
+
+    def report(self) -> SimulationReport:
+        convergence_secs = self.converged_at - self.last_churn_at \
+            if self.converged_at is not None else None
+        return SimulationReport(
+            len(self.live_ids), self.lookups, self.failed_lookups, self.wrong_lookups,
+            dict(self.hop_counts), self.lookup_latencies, dict(self.messages),
+            self.dropped_messages, self.failed_maintenance, convergence_secs)
+
+    def create_node(self) -> NetworkedChordNode:
+        while True:
+            host = self.next_host
+            self.next_host += 1
+            node_id = IPEndpointId(
+                f"10.{(host >> 16) & 255}.{(host >> 8) & 255}.{host & 255}",
+                str(5555 + (host >> 24)), self.keyspace)
+            if node_id not in self.nodes:
+                break
+        options = {
+            "iterative_lookup": self.iterative_lookup,
+            "successor_list_size": self.successor_list_size,
+            "fingers_per_update": self.fingers_per_update,
+            "location_cache_size": 0,
+            **self.node_options
+        }
+        node = NetworkedChordNode(
+            node_id, self.network.link(node_id), clock=self.clock, **options)
+        self.nodes[node_id] = node
+        self.network.register_node(node)
+        return node
+
+    def build_ring(self):
+        """Wire up num_nodes nodes as a fully stabilized ring without
+        sending any messages, which is what joining them would converge to."""
+        new_nodes = [self.create_node() for _ in range(self.num_nodes)]
+        self.live_ids = sorted(self.nodes)
+        values = [node_id.value for node_id in self.live_ids]
+        for node in new_nodes:
+            endpoints = {}
+
+            def endpoint_at(pos: int) -> ChordRemoteEndpoint:
+                remote_id = self.live_ids[pos % len(self.live_ids)]
+                if remote_id not in endpoints:
+                    endpoints[remote_id] = ChordRemoteEndpoint(
+                        node.node_id, remote_id, node.sender)
+                return endpoints[remote_id]
+
+            pos = bisect_left(values, node.node_id.value)
+            chord_node = node.node
+            chord_node.predecessor = endpoint_at(pos - 1)
+            chord_node.fingers = [endpoint_at(bisect_left(values, start.value))
+                                  for start in chord_node.finger_starts]
+            chord_node.update_successor_list(
+                [endpoint_at(pos + i) for i in range(2, chord_node.successor_list_size + 1)])
+            chord_node.reindex_fingers()
+        for node in new_nodes:
+            self.schedule_maintenance(node)
+        self.schedule_convergence_check()
+
+    def schedule_maintenance(self, node: NetworkedChordNode):
+        def maintain():
+            if node.node_id not in self.nodes:
+                return
+            # rounds start at a fixed rate, however long the last one took
+            self.schedule(self.clock() + self.maintenance_interval_secs, maintain)
+            try:
+                node.scheduler.tick()
+            except Exception: # pylint: disable=broad-except
+                self.failed_maintenance += 1
+        self.schedule(self.clock() + self.rng.uniform(0, self.maintenance_interval_secs), maintain)
+
+    def schedule_convergence_check(self):
+        def check():
+            if self.converged_at is None and self.is_converged():
+                self.converged_at = self.clock()
+            self.schedule(self.clock() + self.maintenance_interval_secs, check)
+        self.schedule(self.clock(), check)
+
+    def is_converged(self) -> bool:
+        num_live = len(self.live_ids)
+        for i, node_id in enumerate(self.live_ids):
+            chord_node = self.nodes[node_id].node
+            pred = chord_node.predecessor
+            if chord_node.successor.node_id != self.live_ids[(i + 1) % num_live] \
+                    or pred is None or pred.node_id != self.live_ids[i - 1]:
+                return False
+        return True
+
+    def schedule_churn(self, script: List[ChurnEvent]):
+        for event in script:
+            self.schedule(event.at_secs, lambda e=event: self.apply_churn(e))
+
+    def apply_churn(self, event: ChurnEvent):
+        self.last_churn_at, self.converged_at = self.clock(), None
+        for _ in range(event.crashes):
+            self.remove_node(self.rng.choice(self.live_ids))
+        for _ in range(event.leaves):
+            node_id = self.rng.choice(self.live_ids)
+            try:
+                self.nodes[node_id].node.leave()
+            except Exception: # pylint: disable=broad-except
+                self.failed_maintenance += 1
+            self.remove_node(node_id)
+        for _ in range(event.joins):
+            self.join_node()
+
+    def join_node(self):
+        bootstrap_id = self.rng.choice(self.live_ids)
+        node = self.create_node()
+        bootstrap = ChordRemoteEndpoint(node.node_id, bootstrap_id, node.sender)
+        try:
+            node.node.initiate_join(bootstrap)
+            node.node.update_finger_table(bootstrap)
+        except Exception: # pylint: disable=broad-except
+            self.failed_maintenance += 1
+            self.nodes.pop(node.node_id)
+            self.network.unregister_node(node.node_id)
+            return
+        self.live_ids.insert(bisect_left(self.live_ids, node.node_id), node.node_id)
+        self.schedule_maintenance(node)
+
+    def remove_node(self, node_id: IPEndpointId):
+        self.nodes.pop(node_id)
+        self.network.unregister_node(node_id)
+        self.live_ids.remove(node_id)
+
+    def schedule_lookups(self, rate_per_sec: float, from_secs: float, until_secs: float):
+        num_lookups = int((until_secs - from_secs) * rate_per_sec)
+        for i in range(num_lookups):
+            self.schedule(from_secs + i / rate_per_sec, self.random_lookup)
+
+    def random_lookup(self):
+        node = self.nodes[self.rng.choice(self.live_ids)]
+        key = ResourceKey(self.rng.randrange(self.keyspace), self.keyspace)
+        self.lookups += 1
+        self.hops = 0
+        start = self.clock()
+        try:
+            owner_id = node.lookup(key)
+        except Exception: # pylint: disable=broad-except
+            self.failed_lookups += 1
+            return
+        self.lookup_latencies.append(self.clock() - start)
+        self.hop_counts[self.hops] += 1
+        pos = bisect_left(self.live_ids, key)
+        if owner_id != self.live_ids[pos % len(self.live_ids)]:
+            self.wrong_lookups += 1
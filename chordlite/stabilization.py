@@ -0,0 +1,93 @@
+import asyncio
+from typing import Optional
+from dataclasses import dataclass, field
+from threading import Thread, Event
+from random import uniform
+
+from chordlite.node import ChordNode
+from chordlite.async_node import AsyncChordNode
+
+
+@dataclass
+class StabilizationScheduler:
+    """Periodically runs the Chord maintenance rounds of a node in the background.
+
+    Each tick stabilizes the successor pointer, notifies the successor
+    and refreshes only a few fingers, so maintenance traffic is spread
+    evenly over time instead of rebuilding the whole finger table at once.
+    The jitter keeps the ticks of different nodes from synchronizing."""
+    node: ChordNode
+    interval_secs: float = 1.0
+    jitter_secs: float = 0.5
+    fingers_per_tick: int = 4
+    stop_event: Event = field(init=False, default_factory=Event)
+    thread: Optional[Thread] = field(init=False, default=None)
+
+    @property
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        self.stop_event.clear()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def tick(self):
+        self.node.stabilize()
+        self.node.fix_fingers(self.fingers_per_tick)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval_secs + uniform(0, self.jitter_secs)):
+            try:
+                self.tick()
+            except Exception: # pylint: disable=broad-except
+                # a failed round gets repaired by one of the next rounds
+                pass
+
+
+@dataclass
+class AsyncStabilizationScheduler:
+    """The asyncio counterpart of StabilizationScheduler, running as a task."""
+    node: AsyncChordNode
+    interval_secs: float = 1.0
+    jitter_secs: float = 0.5
+    fingers_per_tick: int = 4
+    task: Optional[asyncio.Task] = field(init=False, default=None)
+
+    @property
+    def is_running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self):
+        if not self.is_running:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def tick(self):
+        await self.node.stabilize()
+        await self.node.fix_fingers(self.fingers_per_tick)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval_secs + uniform(0, self.jitter_secs))
+            try:
+                await self.tick()
+            except Exception: # pylint: disable=broad-except
+                # a failed round gets repaired by one of the next rounds
+                pass
@@ -0,0 +1,173 @@
+"""Distributed tracing of requests across the nodes of the ring.
+
+Sampled requests carry a trace context from hop to hop, and every node
+records a span for its part of the work into a local sink. Merging the
+sinks of all nodes shows where a slow request spent its time:
+
+    python -m chordlite.tracing data/*.jsonl
+"""
+from __future__ import annotations
+import sys
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from json import dumps, loads
+from random import Random
+from threading import Lock
+from time import time
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+
+@dataclass(frozen=True)
+class TraceContext:
+    trace_id: int
+    span_id: int
+
+
+# the span currently worked on by this thread, so requests sent meanwhile
+# get propagated as its children
+current_trace: ContextVar[Optional[TraceContext]] = ContextVar("current_trace", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    node: str
+    trace_id: int
+    span_id: int
+    parent_id: Optional[int]
+    start_secs: float
+    end_secs: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    token: Optional[Token] = field(default=None, repr=False, compare=False)
+
+    @property
+    def context(self) -> TraceContext:
+        return TraceContext(self.trace_id, self.span_id)
+
+    @property
+    def duration_secs(self) -> float:
+        return (self.end_secs or self.start_secs) - self.start_secs
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "node": self.node,
+            "trace_id": f"{self.trace_id:016x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_id": f"{self.parent_id:016x}" if self.parent_id is not None else None,
+            "start_secs": self.start_secs,
+            "end_secs": self.end_secs,
+            "attributes": self.attributes
+        }
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> Span:
+        parent_id = data["parent_id"]
+        return Span(
+            data["name"], data["node"], int(data["trace_id"], 16), int(data["span_id"], 16),
+            int(parent_id, 16) if parent_id is not None else None,
+            data["start_secs"], data["end_secs"], data["attributes"])
+
+
+@dataclass
+class JsonlSpanSink:
+    """Appends finished spans to a file, one JSON object per line."""
+    path: str
+    file: TextIO = field(init=False, repr=False)
+    mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+
+    def __post_init__(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def __call__(self, span: Span):
+        line = dumps(span.to_dict()) + "\n"
+        with self.mutex:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.mutex:
+            self.file.close()
+
+
+@dataclass
+class Tracer:
+    """Starts a trace for a share of the requests entering the system and
+    records the spans of traced requests reaching this process. Requests
+    of unsampled traces carry no context, so they aren't slowed down."""
+    sink: Callable[[Span], None]
+    sample_rate: float = 0.01
+    clock: Callable[[], float] = field(default=time, repr=False)
+    rng: Random = field(default_factory=Random, repr=False)
+
+    def start_trace(self, name: str, node: str, **attributes: Any) -> Optional[Span]:
+        """A span starting a new trace, or a child span if this request
+        is part of a trace already; None if the request isn't sampled."""
+        parent = current_trace.get()
+        if parent is None:
+            if self.rng.random() >= self.sample_rate:
+                return None
+            parent = TraceContext(self.rng.getrandbits(64), 0)
+        return self.start_span(name, node, parent, **attributes)
+
+    def start_span(self, name: str, node: str, parent: TraceContext,
+                   **attributes: Any) -> Span:
+        span = Span(name, node, parent.trace_id, self.rng.getrandbits(64),
+                    parent.span_id or None, self.clock(), attributes=attributes)
+        span.token = current_trace.set(span.context)
+        return span
+
+    def finish(self, span: Span):
+        span.end_secs = self.clock()
+        current_trace.reset(span.token)
+        self.sink(span)
+
+
+def read_spans(paths: List[str]) -> List[Span]:
+    spans = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as file:
+            spans += [Span.from_dict(loads(line)) for line in file if line.strip()]
+    return spans
+
+
+def format_trace(spans: List[Span]) -> List[str]:
+    """The spans of a trace as a tree of hops, with the time each took."""
+    children: Dict[Optional[int], List[Span]] = {}
+    span_ids = {span.span_id for span in spans}
+    for span in sorted(spans, key=lambda s: s.start_secs):
+        # spans whose parent got lost, e.g. with a node's sink, become roots
+        parent_id = span.parent_id if span.parent_id in span_ids else None
+        children.setdefault(parent_id, []).append(span)
+
+    lines = []
+    def append_tree(span: Span, depth: int):
+        lines.append(f"{'  ' * depth}{span.name} @ {span.node}: "
+                     f"{span.duration_secs * 1000:.3f} ms {span.attributes or ''}".rstrip())
+        for child in children.get(span.span_id, []):
+            append_tree(child, depth + 1)
+    for root in children.get(None, []):
+        append_tree(root, 0)
+    return lines
+
+
+def main() -> int:
+    if len(sys.argv) < 2:
+        print("usage: python -m chordlite.tracing <spans.jsonl> ...")
+        return 1
+    traces: Dict[int, List[Span]] = {}
+    for span in read_spans(sys.argv[1:]):
+        traces.setdefault(span.trace_id, []).append(span)
+
+    # the slowest traces first, i.e. the ones worth looking into
+    def trace_secs(spans: List[Span]) -> float:
+        return max(s.end_secs or s.start_secs for s in spans) - min(s.start_secs for s in spans)
+    for trace_id, spans in sorted(traces.items(), key=lambda t: -trace_secs(t[1]))[:10]:
+        print(f"trace {trace_id:016x}: {trace_secs(spans) * 1000:.3f} ms")
+        for line in format_trace(spans):
+            print(f"  {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
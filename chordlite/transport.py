@@ -1,12 +1,21 @@
 from __future__ import annotations
 from enum import IntEnum
-from typing import Tuple, Callable
+from typing import Tuple, Callable, Optional, List
+from time import monotonic
 from dataclasses import dataclass, field
-from time import sleep
 
 from chordlite.key import ChordKey
 from chordlite.endpoint import IPEndpointId
-from chordlite.node import ChordNode, ChordStatus, ChordEndpoint
+from chordlite.node import \
+    ChordNode, ChordStatus, ChordEndpoint, RoutingFailure, PeerUnreachable, PeerBusy, \
+    ServerBusy, counted_hops, count_hops
+from chordlite.stabilization import StabilizationScheduler
+from chordlite.cache import LocationCache
+from chordlite.latency import RttTracker, RttProber
+from chordlite.failure import FailureDetector
+from chordlite.metrics import MetricsRegistry, ChordMetrics
+from chordlite.tracing import Tracer, TraceContext, current_trace
+from chordlite.admission import JoinAdmission
 
 
 class ChordRequestType(IntEnum):
@@ -15,6 +24,13 @@ class ChordRequestType(IntEnum):
     JOIN = 2
     NOTIFY = 3
     SUCC_LOOKUP = 4
+    NEXT_HOP = 5
+    PRED_LOOKUP = 6
+    NOTIFY_PRED = 7
+    SUCC_LIST = 8
+    FIND_SUCC_BATCH = 9
+    LEAVE = 10
+    PING = 11
 
 
 @dataclass
@@ -26,6 +42,8 @@ class ChordRequest:
     requested_resource_id: ChordKey
     new_successor_id: IPEndpointId = field(default=None)
     new_predecessor_id: IPEndpointId = field(default=None)
+    requested_resource_ids: List[ChordKey] = field(default_factory=list)
+    trace: Optional[TraceContext] = field(default=None)
 
 
 @dataclass
@@ -34,9 +52,82 @@ class ChordResponse:
     successor_id: IPEndpointId = field(default=None)
     predecessor_id: IPEndpointId = field(default=None)
     status: ChordStatus = field(default=ChordStatus.SUCCESS)
+    successor_ids: List[IPEndpointId] = field(default_factory=list)
+    # how often the responder forwarded a lookup to resolve it
+    num_hops: int = 0
 
 
 RequestSender = Callable[[ChordRequest], ChordResponse]
+KeyRange = Tuple[Optional[IPEndpointId], int, int]
+
+
+# requests answered by the receiver itself, so their duration is a round trip
+SINGLE_HOP_REQUESTS = {
+    ChordRequestType.SUCC_LOOKUP, ChordRequestType.PRED_LOOKUP,
+    ChordRequestType.NEXT_HOP, ChordRequestType.NOTIFY,
+    ChordRequestType.NOTIFY_PRED, ChordRequestType.SUCC_LIST,
+    ChordRequestType.PING
+}
+
+
+def monitored_sender(network: RequestSender, tracker: Optional[RttTracker],
+                     detector: FailureDetector,
+                     clock: Callable[[], float]=monotonic,
+                     metrics: Optional[ChordMetrics]=None,
+                     tracer: Optional[Tracer]=None) -> RequestSender:
+    """Wraps a sender to sample the RTT of peers and report the peers failing
+    to answer. Only timeouts and connection errors count as failures, busy
+    peers are just skipped. Network errors and lookups stuck behind failed
+    peers are raised as RoutingFailure, so routing can try another way.
+    Requests sent while working on a traced request carry its trace context.
+    Without a tracker and metrics, requests don't get timed at all."""
+    is_timed = tracker is not None or metrics is not None
+
+    def count_failure(request: ChordRequest):
+        if metrics is not None:
+            metrics.messages.inc(request.request_type.name)
+            metrics.message_failures.inc(request.request_type.name)
+
+    def send_monitored(request: ChordRequest) -> ChordResponse:
+        if tracer is not None:
+            request.trace = current_trace.get()
+        start = clock() if is_timed else 0.0
+        try:
+            response = network(request)
+        except ServerBusy as error:
+            count_failure(request)
+            raise PeerBusy(request.forward_id) from error
+        except (TimeoutError, ConnectionError) as error:
+            detector.report_failure(request.forward_id)
+            count_failure(request)
+            raise PeerUnreachable(request.forward_id) from error
+        except OSError as error:
+            # the peer answered, so it's alive, just unable to serve the request
+            count_failure(request)
+            raise RoutingFailure(f"{request.forward_id} failed the request") from error
+        detector.report_success(request.forward_id)
+        rtt_secs = clock() - start if is_timed else 0.0
+        if tracker is not None and request.request_type in SINGLE_HOP_REQUESTS:
+            tracker.observe(request.forward_id, rtt_secs)
+        if metrics is not None:
+            metrics.messages.inc(request.request_type.name)
+            metrics.message_secs.observe(rtt_secs, request.request_type.name)
+            if response.status == ChordStatus.TIMEOUT:
+                metrics.message_failures.inc(request.request_type.name)
+        if response.status == ChordStatus.TIMEOUT:
+            raise RoutingFailure(f"{request.forward_id} found no route for the request")
+        return response
+    return send_monitored
+
+
+def distinct_hosts(endpoint_ids: List[IPEndpointId], count: int) -> List[IPEndpointId]:
+    # vnodes of the same host mustn't count as separate replicas
+    hosts, distinct = set(), []
+    for endpoint_id in endpoint_ids:
+        if endpoint_id.address not in hosts and len(distinct) < count:
+            hosts.add(endpoint_id.address)
+            distinct.append(endpoint_id)
+    return distinct
 
 
 @dataclass
@@ -64,6 +155,41 @@ class ChordRemoteEndpoint:
         )
         return endpoint
 
+    @property
+    def predecessor(self) -> Optional[ChordEndpoint]:
+        request = ChordRequest(
+            ChordRequestType.PRED_LOOKUP,
+            self.remote_id,
+            self.local_id,
+            self.remote_id,
+            self.remote_id
+        )
+        response = self.network(request)
+        if response.predecessor_id is None:
+            return None
+        endpoint = ChordRemoteEndpoint(
+            self.local_id, response.predecessor_id, self.network
+        )
+        return endpoint
+
+    @property
+    def successor_list(self) -> List[ChordEndpoint]:
+        return self.successor_list_for(self.remote_id)
+
+    def successor_list_for(self, key: ChordKey) -> List[ChordEndpoint]:
+        request = ChordRequest(
+            ChordRequestType.SUCC_LIST,
+            self.remote_id,
+            self.local_id,
+            self.remote_id,
+            key
+        )
+        response = self.network(request)
+        if response.status != ChordStatus.SUCCESS:
+            raise LookupError(f"{self.remote_id} is not responsible for key {key}!")
+        return [ChordRemoteEndpoint(self.local_id, succ_id, self.network)
+                for succ_id in response.successor_ids]
+
     def find_successor(self, key: ChordKey) -> ChordEndpoint:
         request = ChordRequest(
             ChordRequestType.FIND_SUCC,
@@ -73,11 +199,29 @@ class ChordRemoteEndpoint:
             key
         )
         response = self.network(request)
+        # the hops the remote node took add to the lookup this node works on
+        if response.num_hops:
+            count_hops(response.num_hops)
         endpoint = ChordRemoteEndpoint(
             self.local_id, response.successor_id, self.network
         )
         return endpoint
 
+    def find_successors(self, keys: List[ChordKey]) -> List[ChordEndpoint]:
+        if not keys:
+            return []
+        request = ChordRequest(
+            ChordRequestType.FIND_SUCC_BATCH,
+            self.remote_id,
+            self.local_id,
+            self.local_id,
+            keys[0],
+            requested_resource_ids=keys
+        )
+        response = self.network(request)
+        return [ChordRemoteEndpoint(self.local_id, succ_id, self.network)
+                for succ_id in response.successor_ids]
+
     def find_predecessor(self, key: ChordKey) -> ChordEndpoint:
         request = ChordRequest(
             ChordRequestType.FIND_PRED,
@@ -87,6 +231,22 @@ class ChordRemoteEndpoint:
             key
         )
         response = self.network(request)
+        if response.num_hops:
+            count_hops(response.num_hops)
+        endpoint = ChordRemoteEndpoint(
+            self.local_id, response.predecessor_id, self.network
+        )
+        return endpoint
+
+    def next_hop(self, key: ChordKey) -> ChordEndpoint:
+        request = ChordRequest(
+            ChordRequestType.NEXT_HOP,
+            self.remote_id,
+            self.local_id,
+            self.local_id,
+            key
+        )
+        response = self.network(request)
         endpoint = ChordRemoteEndpoint(
             self.local_id, response.predecessor_id, self.network
         )
@@ -117,11 +277,47 @@ class ChordRemoteEndpoint:
         response = self.network(request)
         return response.status
 
+    def notify_predecessor(self, new_predecessor: ChordEndpoint) -> ChordStatus:
+        request = ChordRequest(
+            ChordRequestType.NOTIFY_PRED,
+            self.remote_id,
+            self.remote_id,
+            new_predecessor.node_id,
+            new_predecessor.node_id
+        )
+        response = self.network(request)
+        return response.status
+
+    def ping(self) -> ChordStatus:
+        request = ChordRequest(
+            ChordRequestType.PING,
+            self.remote_id,
+            self.local_id,
+            self.local_id,
+            self.remote_id
+        )
+        response = self.network(request)
+        return response.status
+
+    def replace_neighbor(self, leaving_node: ChordEndpoint,
+                         replacement: ChordEndpoint) -> ChordStatus:
+        request = ChordRequest(
+            ChordRequestType.LEAVE,
+            self.remote_id,
+            self.remote_id,
+            leaving_node.node_id,
+            leaving_node.node_id,
+            new_successor_id=replacement.node_id
+        )
+        response = self.network(request)
+        return response.status
+
 
 @dataclass
 class ChordServer:
     network: RequestSender
     local: ChordNode
+    tracer: Optional[Tracer] = None
 
     @property
     def node_id(self) -> ChordKey:
@@ -129,55 +325,272 @@ class ChordServer:
 
     def process_message(self, message: ChordRequest) -> ChordResponse:
         local_id: IPEndpointId = self.local.node_id
-        if message.request_type == ChordRequestType.SUCC_LOOKUP:
-            response = ChordResponse(local_id, successor_id=self.local.successor.node_id)
-            return response
-        elif message.request_type == ChordRequestType.FIND_PRED:
-            pred = self.local.find_predecessor(message.requested_resource_id)
-            response = ChordResponse(local_id, predecessor_id=pred.node_id)
-            return response
-        elif message.request_type == ChordRequestType.FIND_SUCC:
-            succ = self.local.find_successor(message.requested_resource_id)
-            response = ChordResponse(local_id, successor_id=succ.node_id)
-            return response
-        elif message.request_type == ChordRequestType.JOIN:
-            joining_node = ChordRemoteEndpoint(local_id, message.requester_id, self.network)
-            status, pred = self.local.challenge_join(joining_node)
-            response = ChordResponse(local_id, predecessor_id=pred.node_id, status=status)
-            return response
-        elif message.request_type == ChordRequestType.NOTIFY:
-            joining_node = ChordRemoteEndpoint(local_id, message.requester_id, self.network)
-            status = self.local.notify(joining_node)
-            response = ChordResponse(local_id, status=status)
-            return response
-        else:
-            raise RuntimeError("Unsupported request type!")
+        # the span is kept inline, so deep recursive lookups don't need more stack
+        span = None
+        if message.trace is not None and self.tracer is not None:
+            span = self.tracer.start_span(
+                f"chord/{message.request_type.name}", str(local_id), message.trace,
+                key=message.requested_resource_id.value)
+        try:
+            if message.request_type == ChordRequestType.SUCC_LOOKUP:
+                response = ChordResponse(local_id, successor_id=self.local.live_successor.node_id)
+                return response
+            elif message.request_type == ChordRequestType.PRED_LOOKUP:
+                pred = self.local.predecessor
+                pred_id = pred.node_id if pred is not None else None
+                response = ChordResponse(local_id, predecessor_id=pred_id)
+                return response
+            elif message.request_type == ChordRequestType.SUCC_LIST:
+                if not self.local.is_responsible(message.requested_resource_id):
+                    return ChordResponse(local_id, status=ChordStatus.FAILURE)
+                succ_ids = [succ.node_id for succ in self.local.successor_list]
+                response = ChordResponse(local_id, successor_ids=succ_ids)
+                return response
+            elif message.request_type == ChordRequestType.FIND_PRED:
+                with counted_hops() as hops:
+                    pred = self.local.find_predecessor(message.requested_resource_id)
+                response = ChordResponse(local_id, predecessor_id=pred.node_id, num_hops=hops[0])
+                return response
+            elif message.request_type == ChordRequestType.FIND_SUCC:
+                with counted_hops() as hops:
+                    succ = self.local.find_successor(message.requested_resource_id)
+                response = ChordResponse(local_id, successor_id=succ.node_id, num_hops=hops[0])
+                return response
+            elif message.request_type == ChordRequestType.FIND_SUCC_BATCH:
+                succs = self.local.find_successors(message.requested_resource_ids)
+                response = ChordResponse(local_id, successor_ids=[s.node_id for s in succs])
+                return response
+            elif message.request_type == ChordRequestType.NEXT_HOP:
+                hop = self.local.next_hop(message.requested_resource_id)
+                response = ChordResponse(local_id, predecessor_id=hop.node_id)
+                return response
+            elif message.request_type == ChordRequestType.JOIN:
+                joining_node = ChordRemoteEndpoint(local_id, message.requester_id, self.network)
+                status, pred = self.local.challenge_join(joining_node)
+                response = ChordResponse(local_id, predecessor_id=pred.node_id, status=status)
+                return response
+            elif message.request_type == ChordRequestType.NOTIFY:
+                joining_node = ChordRemoteEndpoint(local_id, message.requester_id, self.network)
+                status = self.local.notify(joining_node)
+                response = ChordResponse(local_id, status=status)
+                return response
+            elif message.request_type == ChordRequestType.NOTIFY_PRED:
+                joining_node = ChordRemoteEndpoint(local_id, message.requester_id, self.network)
+                status = self.local.notify_predecessor(joining_node)
+                response = ChordResponse(local_id, status=status)
+                return response
+            elif message.request_type == ChordRequestType.PING:
+                response = ChordResponse(local_id, status=self.local.ping())
+                return response
+            elif message.request_type == ChordRequestType.LEAVE:
+                leaving_node = ChordRemoteEndpoint(local_id, message.requester_id, self.network)
+                replacement = self.local if message.new_successor_id == local_id \
+                    else ChordRemoteEndpoint(local_id, message.new_successor_id, self.network)
+                status = self.local.replace_neighbor(leaving_node, replacement)
+                response = ChordResponse(local_id, status=status)
+                return response
+            else:
+                raise RuntimeError("Unsupported request type!")
+        except RoutingFailure:
+            # the requester can still route around the failed peers behind this node
+            if span is not None:
+                span.attributes["status"] = ChordStatus.TIMEOUT.name
+            return ChordResponse(local_id, status=ChordStatus.TIMEOUT)
+        finally:
+            if span is not None:
+                self.tracer.finish(span)
 
 
 @dataclass
 class NetworkedChordNode:
     node_id: IPEndpointId
     network: RequestSender
-    finger_update_interval_secs: float = 5.0
+    finger_update_interval_secs: float = 1.0
+    finger_update_jitter_secs: float = 0.5
+    fingers_per_update: int = 4
+    iterative_lookup: bool = False
+    successor_list_size: int = 4
+    location_cache_size: int = 1024
+    location_cache_ttl_secs: float = 30.0
+    pns_candidates: int = 0
+    proximity_hops: int = 1
+    rtt_max_age_secs: float = 60.0
+    suspicion_secs: float = 10.0
+    max_pending_joins: int = 0
+    join_rate_limit: float = 0.0
+    clock: Callable[[], float] = field(default=monotonic, repr=False)
+    metrics: Optional[MetricsRegistry] = field(default=None, repr=False)
+    tracer: Optional[Tracer] = field(default=None, repr=False)
     node: ChordNode = field(init=False)
     server: ChordServer = field(init=False)
+    scheduler: StabilizationScheduler = field(init=False)
+    cache: LocationCache = field(init=False)
+    rtt: RttTracker = field(init=False)
+    prober: RttProber = field(init=False, repr=False)
+    detector: FailureDetector = field(init=False)
+    sender: RequestSender = field(init=False, repr=False)
+    chord_metrics: Optional[ChordMetrics] = field(init=False, repr=False)
 
     def __post_init__(self):
-        self.node = ChordNode(self.node_id)
-        self.server = ChordServer(self.network, self.node)
+        self.cache = LocationCache(
+            self.node_id.keyspace, self.location_cache_size, self.location_cache_ttl_secs)
+        self.rtt = RttTracker(max_age_secs=self.rtt_max_age_secs, clock=self.clock)
+        self.prober = RttProber()
+        self.detector = FailureDetector(suspicion_secs=self.suspicion_secs, clock=self.clock)
+        self.chord_metrics = None
+        if self.metrics is not None:
+            self.chord_metrics = ChordMetrics(self.metrics)
+            self.chord_metrics.watch_node(self.node_id, self.rtt, self.detector)
+        admission = JoinAdmission(self.max_pending_joins, self.join_rate_limit, clock=self.clock) \
+            if self.max_pending_joins > 0 or self.join_rate_limit > 0 else None
+        # RTTs are only sampled if routing or the metrics make use of them
+        uses_rtt = self.pns_candidates > 0 or self.proximity_hops > 1 or self.metrics is not None
+        self.sender = monitored_sender(
+            self.network, self.rtt if uses_rtt else None, self.detector, self.clock,
+            self.chord_metrics, self.tracer)
+        self.node = ChordNode(
+            self.node_id, iterative_lookup=self.iterative_lookup,
+            successor_list_size=self.successor_list_size,
+            on_ring_change=self.on_ring_change,
+            proximity=lambda e: self.rtt.estimate(e.node_id),
+            probe=self.prober.probe,
+            pns_candidates=self.pns_candidates,
+            proximity_hops=self.proximity_hops,
+            is_suspected=lambda e: self.detector.is_suspected(e.node_id),
+            metrics=self.chord_metrics,
+            admission=admission)
+        self.server = ChordServer(self.sender, self.node, self.tracer)
+        self.scheduler = StabilizationScheduler(
+            self.node, self.finger_update_interval_secs,
+            self.finger_update_jitter_secs, self.fingers_per_update)
 
     def join_network(self, bootstrap_id: IPEndpointId):
-        bootstrap = ChordRemoteEndpoint(self.node_id, bootstrap_id, self.network)
+        bootstrap = ChordRemoteEndpoint(self.node_id, bootstrap_id, self.sender)
         self.node.initiate_join(bootstrap)
+        self.scheduler.start()
+
+    def leave_network(self):
+        self.scheduler.stop()
+        self.prober.close()
+        self.node.leave()
+        self.cache.clear()
 
-        # TODO: periodically update finger table in background task
-        sleep(self.finger_update_interval_secs)
-        self.node.update_finger_table()
+    def shutdown(self):
+        self.scheduler.stop()
+        self.prober.close()
+
+    def on_ring_change(self, endpoint: ChordEndpoint):
+        self.cache.invalidate(endpoint.node_id.value)
+        if self.chord_metrics is not None:
+            self.chord_metrics.ring_changes.inc()
 
     def lookup(self, key: ChordKey) -> IPEndpointId:
-        endpoint = self.node.find_successor(key)
-        endpoint_id: IPEndpointId = endpoint.node_id
-        return endpoint_id
+        owner_id = self.cache.get(key)
+        if owner_id is None:
+            start = self.clock() if self.chord_metrics is not None else 0.0
+            parent = current_trace.get() if self.tracer is not None else None
+            span = None if parent is None else self.tracer.start_span(
+                "chord/lookup", str(self.node_id), parent, key=key.value)
+            try:
+                pred = self.node.find_predecessor(key)
+                owner = self.node.live_successor if pred.node_id == self.node_id \
+                    else pred.successor
+            finally:
+                if span is not None:
+                    self.tracer.finish(span)
+            owner_id = owner.node_id
+            self.cache.put(pred.node_id.value, owner_id)
+            if self.chord_metrics is not None:
+                self.chord_metrics.lookup_secs.observe(self.clock() - start)
+        return owner_id
+
+    def lookup_many(self, keys: List[ChordKey]) -> List[IPEndpointId]:
+        owner_ids = [self.cache.get(key) for key in keys]
+        misses = [i for i, owner_id in enumerate(owner_ids) if owner_id is None]
+        resolved = self.node.find_successors([keys[i] for i in misses])
+        for i, endpoint in zip(misses, resolved):
+            owner_ids[i] = endpoint.node_id
+            # the keys between a resolved key and its owner have the same owner
+            self.cache.put((keys[i] - 1).value, endpoint.node_id)
+        return owner_ids
+
+    def owner_replicas(self, owner_id: IPEndpointId, count: int,
+                       key: Optional[ChordKey]=None) -> List[IPEndpointId]:
+        """Ask the owner for its replicas. Owners reject keys they don't own
+        (anymore) with a LookupError, so stale cached owners get detected."""
+        if owner_id == self.node_id:
+            if key is not None and not self.node.is_responsible(key):
+                raise LookupError(f"{owner_id} is not responsible for key {key}!")
+            succs = self.node.successor_list
+        else:
+            owner = ChordRemoteEndpoint(self.node_id, owner_id, self.sender)
+            succs = owner.successor_list_for(key if key is not None else owner_id)
+        return distinct_hosts([owner_id] + [succ.node_id for succ in succs], count)
+
+    def invalidate_location(self, key: ChordKey):
+        self.cache.invalidate(key.value)
+
+    def lookup_replicas(self, key: ChordKey, count: int) -> List[IPEndpointId]:
+        # the key's predecessor knows the owner and the nodes following it,
+        # so a single extra round trip yields the whole replica set
+        pred = self.node.find_predecessor(key)
+        return distinct_hosts([succ.node_id for succ in pred.successor_list], count)
+
+    def replicated_owners(self, count: int) -> Tuple[int, List[IPEndpointId]]:
+        """The nodes whose arcs this node replicates, from the farthest
+        predecessor up to the node itself, and where the first arc starts."""
+        # an arc gets replicated on the first count hosts following it, like
+        # distinct_hosts places them; arcs farther back than another vnode of
+        # this host are replicated by that vnode, so the walk stops there
+        owner_ids = [self.node_id]
+        pred = self.node.predecessor
+        while pred is not None and pred.node_id.address != self.node_id.address \
+                and pred.node_id not in owner_ids:
+            if self.node_id not in distinct_hosts([pred.node_id] + owner_ids, count):
+                break
+            owner_ids.insert(0, pred.node_id)
+            pred = pred.predecessor
+        return (self.node_id if pred is None else pred.node_id).value, owner_ids
+
+    def replicated_ranges(self, count: int) -> List[KeyRange]:
+        """The key range this node owns or replicates with the replication factor,
+        together with its first successor on another host, which held the keys
+        before this node joined; None if there's no other host."""
+        if self.node.is_uninitialized:
+            return []
+        start, _ = self.replicated_owners(count)
+        source_ids = self.transfer_targets(1)
+        return [(source_ids[0] if source_ids else None, start, self.node_id.value)]
+
+    def handover_ranges(self, count: int) -> List[KeyRange]:
+        """The arcs this node replicates, each with the host replicating
+        it in place of this node's host once the host left the ring."""
+        if self.node.is_uninitialized:
+            return []
+        start, owner_ids = self.replicated_owners(count)
+        succ_ids = self.transfer_targets(count)
+        ranges: List[KeyRange] = []
+        for i, owner_id in enumerate(owner_ids):
+            # the arc's replicas are the hosts of the owners up to this node,
+            # this node's host and the next hosts following it
+            replicas = {r.address for r in distinct_hosts(owner_ids[i:] + succ_ids, count)}
+            targets = [r for r in distinct_hosts(owner_ids[i:-1] + succ_ids, count)
+                       if r.address not in replicas]
+            arc_start = owner_ids[i - 1].value if i > 0 else start
+            if not targets:
+                continue
+            if ranges and ranges[-1][0] == targets[0] and ranges[-1][2] == arc_start:
+                ranges[-1] = (targets[0], ranges[-1][1], owner_id.value)
+            else:
+                ranges.append((targets[0], arc_start, owner_id.value))
+        return ranges
+
+    def transfer_targets(self, count: int) -> List[IPEndpointId]:
+        """The first count hosts following this node's host, which held
+        the keys of its ranges before it joined or take them over."""
+        succ_ids = [succ.node_id for succ in self.node.successor_list
+                    if succ.node_id.address != self.node_id.address]
+        return distinct_hosts(succ_ids, count)
 
     def process_message(self, message: ChordRequest) -> ChordResponse:
         return self.server.process_message(message)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, List, Any
+
+from chordlite.key import ChordKey, SHA256_KEYSPACE
+from chordlite.endpoint import IPEndpointId, intern_endpoint
+from chordlite.transport import \
+    ChordRequest, ChordResponse, NetworkedChordNode, RequestSender, \
+    KeyRange, distinct_hosts
+
+
+@dataclass
+class VirtualNodeHost:
+    """Runs several virtual nodes of one physical host on the ring.
+
+    Every vnode takes its own ring position, so a host owns many small
+    arcs instead of one large one, which evens out the key distribution.
+    All vnodes share the host's server and request sender; incoming
+    messages are dispatched to the vnode they are addressed to."""
+    ip_address: str
+    port: str
+    network: RequestSender
+    num_vnodes: int = 8
+    keyspace: int = SHA256_KEYSPACE
+    node_options: Dict[str, Any] = field(default_factory=lambda: {"successor_list_size": 8})
+    vnodes: List[NetworkedChordNode] = field(init=False)
+    vnodes_by_id: Dict[IPEndpointId, NetworkedChordNode] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.vnodes = [
+            NetworkedChordNode(
+                intern_endpoint(self.ip_address, self.port, self.keyspace, vnode),
+                self.network, **self.node_options)
+            for vnode in range(self.num_vnodes)]
+        self.vnodes_by_id = { vnode.node_id: vnode for vnode in self.vnodes }
+
+    @staticmethod
+    def weighted(ip_address: str, port: str, network: RequestSender,
+                 weight: float, vnodes_per_weight: int=8, **kwargs) -> VirtualNodeHost:
+        """A host taking a share of the keyspace proportional to its weight,
+        e.g. a host with weight 2 runs twice as many vnodes."""
+        num_vnodes = max(1, round(weight * vnodes_per_weight))
+        return VirtualNodeHost(ip_address, port, network, num_vnodes, **kwargs)
+
+    @property
+    def node_id(self) -> IPEndpointId:
+        return self.vnodes[0].node_id
+
+    def join_network(self, bootstrap_id: IPEndpointId):
+        for vnode in self.vnodes:
+            vnode.join_network(bootstrap_id)
+
+    def leave_network(self):
+        for vnode in self.vnodes:
+            vnode.leave_network()
+
+    def shutdown(self):
+        for vnode in self.vnodes:
+            vnode.shutdown()
+
+    def lookup(self, key: ChordKey) -> IPEndpointId:
+        return self.vnodes[0].lookup(key)
+
+    def lookup_many(self, keys: List[ChordKey]) -> List[IPEndpointId]:
+        return self.vnodes[0].lookup_many(keys)
+
+    def owner_replicas(self, owner_id: IPEndpointId, count: int,
+                       key: ChordKey=None) -> List[IPEndpointId]:
+        return self.vnodes[0].owner_replicas(owner_id, count, key)
+
+    def lookup_replicas(self, key: ChordKey, count: int) -> List[IPEndpointId]:
+        return self.vnodes[0].lookup_replicas(key, count)
+
+    def invalidate_location(self, key: ChordKey):
+        for vnode in self.vnodes:
+            vnode.invalidate_location(key)
+
+    def replicated_ranges(self, count: int) -> List[KeyRange]:
+        return [key_range for vnode in self.vnodes
+                for key_range in vnode.replicated_ranges(count)]
+
+    def handover_ranges(self, count: int) -> List[KeyRange]:
+        return [key_range for vnode in self.vnodes
+                for key_range in vnode.handover_ranges(count)]
+
+    def transfer_targets(self, count: int) -> List[IPEndpointId]:
+        targets = [target for vnode in self.vnodes for target in vnode.transfer_targets(count)]
+        return distinct_hosts(targets, len(targets))
+
+    def process_message(self, message: ChordRequest) -> ChordResponse:
+        return self.vnodes_by_id[message.forward_id].process_message(message)
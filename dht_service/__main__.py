@@ -1,59 +1,150 @@
 import os
-from time import sleep
+import signal
 from threading import Thread
 
-from requests import post as send_request
 from flask import Flask, request as flask_request, Response as HttpResponse
 
 from chordlite import \
-    NetworkedChordNode, local_endpoint, NetworkBootstrapper, \
-    send_chord_request, receive_chord_request
+    NetworkedChordNode, VirtualNodeHost, IPEndpointId, local_endpoint, \
+    NetworkBootstrapper, SeedBootstrapper, \
+    send_chord_request, receive_chord_request, \
+    JSON_CODEC, BINARY_CODEC, codec_for, MetricsRegistry, PROMETHEUS_CONTENT_TYPE, \
+    Tracer, JsonlSpanSink
+from chordlite.http_msg import deserialize_endpoint
 from dht_service.dht import DHTService
+from dht_service.storage import DictStorage, LogStructuredStorage
+from dht_service.http_client import PooledHttpSender
+from dht_service.server import PooledWSGIServer
 
 
 chord_port = os.environ["CHORD_PORT"]
-broadcast_port = os.environ["BROADCAST_PORT"]
+broadcast_port = os.environ.get("BROADCAST_PORT", "5556")
+seed_nodes = [s.strip() for s in os.environ.get("SEED_NODES", "").split(",") if s.strip()]
+chord_codec = BINARY_CODEC if os.environ.get("CHORD_CODEC", "binary") == "binary" else JSON_CODEC
+replication_factor = int(os.environ.get("REPLICATION_FACTOR", "3"))
+vnodes_per_weight = int(os.environ.get("VNODES", "16"))
+host_weight = float(os.environ.get("VNODE_WEIGHT", "1.0"))
+routing_options = {
+    # proximity routing is opt-in, e.g. PNS_CANDIDATES=8 and PROXIMITY_HOPS=3
+    "pns_candidates": int(os.environ.get("PNS_CANDIDATES", "0")),
+    "proximity_hops": int(os.environ.get("PROXIMITY_HOPS", "1")),
+    # joins beyond these limits get turned away and retried with backoff,
+    # counting the joins in flight until their joiners confirmed them
+    "max_pending_joins": int(os.environ.get("JOIN_MAX_PENDING", "8")),
+    "join_rate_limit": float(os.environ.get("JOIN_RATE_LIMIT", "0"))
+}
+# nodes and routes given no registry skip the instrumentation altogether
+metrics = MetricsRegistry() if os.environ.get("METRICS_ENABLED", "1") == "1" else None
+trace_sample_rate = float(os.environ.get("TRACE_SAMPLE_RATE", "0"))
 
 
 endpoint = local_endpoint(chord_port)
-post_http = lambda url, data: send_request(url, data).raw
+span_sink = JsonlSpanSink(
+    os.environ.get("TRACE_FILE", f"traces_{endpoint.ip_address}_{chord_port}.jsonl")) \
+    if trace_sample_rate > 0 else None
+tracer = Tracer(span_sink, trace_sample_rate) if span_sink is not None else None
+post_http = PooledHttpSender(
+    pool_size=int(os.environ.get("HTTP_POOL_SIZE", "16")),
+    connect_timeout_secs=float(os.environ.get("HTTP_CONNECT_TIMEOUT_SECS", "1.0")),
+    read_timeout_secs=float(os.environ.get("HTTP_READ_TIMEOUT_SECS", "5.0")),
+    retries=int(os.environ.get("HTTP_RETRIES", "2")))
 make_response = lambda body, status: HttpResponse(body, status)
-node = NetworkedChordNode(endpoint, lambda r: send_chord_request(post_http, endpoint.keyspace, r))
-dht = DHTService(node, post_http, make_response, dht_port=int(chord_port))
-bootstrapper = NetworkBootstrapper(endpoint, broadcast_port=int(broadcast_port))
-
-sleep(10)
-boostrap_id = bootstrapper.find_bootstrap()
-print("bootstrap is", str(boostrap_id))
-sleep(10)
+storage = DictStorage() if os.environ.get("STORAGE_BACKEND", "log") == "dict" \
+    else LogStructuredStorage(
+        os.environ.get("DATA_DIR", f"data/{endpoint.ip_address}_{chord_port}"),
+        sync_writes=os.environ.get("STORAGE_SYNC_WRITES", "1") == "1")
+send_chord = lambda r: send_chord_request(post_http, endpoint.keyspace, r, chord_codec)
+if vnodes_per_weight > 1:
+    # neighboring vnodes may share a host, so keep enough successors to find r hosts
+    node = VirtualNodeHost.weighted(
+        endpoint.ip_address, endpoint.port, send_chord, host_weight, vnodes_per_weight,
+        node_options={"successor_list_size": max(8, 3 * replication_factor),
+                      "metrics": metrics, "tracer": tracer, **routing_options})
+else:
+    node = NetworkedChordNode(
+        endpoint, send_chord, successor_list_size=max(4, replication_factor),
+        metrics=metrics, tracer=tracer, **routing_options)
+dht = DHTService(
+    node, post_http, make_response, dht_port=int(chord_port), local_data=storage,
+    replication_factor=replication_factor,
+    write_quorum=int(os.environ.get("WRITE_QUORUM", "2")),
+    read_quorum=int(os.environ.get("READ_QUORUM", "2")),
+    metrics=metrics, tracer=tracer)
+probe_http = PooledHttpSender(
+    pool_size=1, connect_timeout_secs=0.5, read_timeout_secs=1.0, retries=0)
+
+
+def is_ready(node_id: IPEndpointId) -> bool:
+    try:
+        probe_http(f"http://{node_id.address}/ready", b"{}")
+        return True
+    except OSError:
+        return False
+
+
+if seed_nodes:
+    bootstrapper = SeedBootstrapper(
+        endpoint, [deserialize_endpoint(s, endpoint.keyspace) for s in seed_nodes], is_ready)
+else:
+    bootstrapper = NetworkBootstrapper(
+        endpoint, int(broadcast_port), is_member=lambda: dht.is_active,
+        settle_secs=float(os.environ.get("BOOTSTRAP_SETTLE_SECS", "2.0")),
+        spread_secs=float(os.environ.get("BOOTSTRAP_SPREAD_SECS", "2.0")))
 
 app = Flask(f"{__name__}/chord")
 
 @app.route(rule="/chord", methods=["POST"])
 def chord_msg():
-    return receive_chord_request(
-        node.process_message, node.node_id.keyspace, flask_request.data)
-
-@app.route(rule="/lookup", methods=["POST"])
-def lookup():
-    return dht.lookup(flask_request.data)
+    content_type = codec_for(flask_request.content_type).content_type
+    body = receive_chord_request(
+        node.process_message, node.node_id.keyspace,
+        flask_request.data, content_type)
+    return HttpResponse(body, 200, content_type=content_type)
 
-@app.route(rule="/insert", methods=["POST"])
-def insert():
-    return dht.insert(flask_request.data)
+for rule, handler in dht.routes.items():
+    app.add_url_rule(
+        rule, rule, methods=["POST"],
+        view_func=lambda handler=handler: handler(flask_request.data))
 
-@app.route(rule="/delete", methods=["POST"])
-def delete():
-    return dht.delete(flask_request.data)
+if metrics is not None:
+    @app.route(rule="/metrics", methods=["GET"])
+    def metrics_page():
+        return HttpResponse(metrics.render(), 200, content_type=PROMETHEUS_CONTENT_TYPE)
 
 
 def init_chord():
-    sleep(10)
-    node.join_network(boostrap_id)
-    sleep(10)
+    # the server accepts connections already, so other nodes
+    # can join through this one as soon as they found it
+    bootstrap_id = bootstrapper.find_bootstrap()
+    print("bootstrap is", str(bootstrap_id))
+    # the founder may hear of nodes that joined through it while settling,
+    # but joining through them leaves it in place as it's linked already
+    node.join_network(bootstrap_id)
     dht.activate()
+    dht.migrate_in()
+
+
+def leave_and_shutdown():
+    # hand the keys over while the server still answers requests
+    if dht.is_active:
+        dht.leave()
+    server.shutdown()
+
 
+server = PooledWSGIServer(
+    "0.0.0.0", int(chord_port), app,
+    num_workers=int(os.environ.get("SERVER_WORKERS", "32")),
+    max_queue_size=int(os.environ.get("SERVER_QUEUE_SIZE", "128")),
+    keep_alive_timeout_secs=float(os.environ.get("SERVER_KEEP_ALIVE_SECS", "5.0")))
+signal.signal(signal.SIGTERM, lambda *_: Thread(target=leave_and_shutdown).start())
 
-init_task = Thread(target=init_chord)
+init_task = Thread(target=init_chord, daemon=True)
 init_task.start()
-app.run(debug=True, port=int(chord_port))
+server.serve_forever()
+bootstrapper.close()
+node.shutdown()
+dht.close()
+post_http.close()
+probe_http.close()
+if span_sink is not None:
+    span_sink.close()
@@ -1,41 +1,222 @@
 from dataclasses import dataclass, field
-from typing import Dict, Callable, Any
+from typing import Callable, Any, Dict, List, Tuple, Optional, Iterator, Deque, ContextManager
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import copy_context
 from json import loads, dumps
-from chordlite import NetworkedChordNode, ResourceKey
+from random import shuffle
+from threading import Lock
+from time import time_ns, monotonic, perf_counter, sleep
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from chordlite import \
+    NetworkedChordNode, ResourceKey, IPEndpointId, MetricsRegistry, ring_distance, \
+    Tracer, TraceContext, Span, current_trace
+from dht_service.storage import StorageBackend, DictStorage
+
+
+# (version, is_deleted, value) of a key, deletes are stored as tombstones
+# so replicas that missed a delete can't resurrect the old value
+Record = Tuple[int, bool, Any]
+MISSING_RECORD: Record = (0, True, None)
+ReplicaGroups = Dict[Tuple[IPEndpointId, ...], List[ResourceKey]]
+RangeSnapshot = Tuple[List[int], List[int]]
+# routes serving clients rather than other nodes, where traces get started
+CLIENT_ROUTES = ["/lookup", "/insert", "/delete", "/mget", "/mput", "/mdelete"]
+
+
+def with_trace(data_dict: Dict[str, Any], span: Optional[Span]) -> Dict[str, Any]:
+    # replicas continue the trace of the forwarded request
+    if span is not None:
+        data_dict["trace"] = [span.trace_id, span.span_id]
+    return data_dict
+
+
+@dataclass
+class TransferProgress:
+    direction: str
+    peer_id: IPEndpointId
+    num_keys: int = 0
+    num_bytes: int = 0
+    num_chunks: int = 0
+    started_at: float = field(default_factory=monotonic)
+    finished_at: Optional[float] = None
+
+    @property
+    def is_done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def keys_per_sec(self) -> float:
+        elapsed = (self.finished_at or monotonic()) - self.started_at
+        return self.num_keys / elapsed if elapsed > 0 else 0.0
+
+    def add_chunk(self, num_keys: int, num_bytes: int):
+        self.num_keys += num_keys
+        self.num_bytes += num_bytes
+        self.num_chunks += 1
+
+    def finish(self):
+        self.finished_at = monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "direction": self.direction,
+            "peer_id": str(self.peer_id),
+            "num_keys": self.num_keys,
+            "num_bytes": self.num_bytes,
+            "num_chunks": self.num_chunks,
+            "keys_per_sec": self.keys_per_sec,
+            "is_done": self.is_done
+        }
 
 
 @dataclass
 class DHTService:
-    # TODO: store data to file
     node: NetworkedChordNode
     send_request: Callable[[str, bytes], bytes]
     make_response: Callable[[bytes, int], Any]
     dht_port: int = 5556
-    local_data: Dict[int, str] = field(default_factory=dict)
+    local_data: StorageBackend = field(default_factory=DictStorage)
+    replication_factor: int = 3
+    write_quorum: int = 2
+    read_quorum: int = 2
+    max_parallel_requests: int = 16
+    transfer_chunk_size: int = 1000
+    transfer_pause_secs: float = 0.0
+    metrics: Optional[MetricsRegistry] = field(default=None, repr=False)
+    tracer: Optional[Tracer] = field(default=None, repr=False)
     is_active: bool = field(init=False, default=False)
+    executor: ThreadPoolExecutor = field(init=False, repr=False)
+    batch_executor: ThreadPoolExecutor = field(init=False, repr=False)
+    num_key_mutexes: int = field(init=False, repr=False, default=64)
+    key_mutexes: List[Lock] = field(init=False, repr=False)
+    version_mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+    last_version: int = field(init=False, repr=False, default=0)
+    max_transfers: int = field(init=False, repr=False, default=64)
+    transfers: Deque[TransferProgress] = field(init=False, repr=False)
+    max_transfer_snapshots: int = field(init=False, repr=False, default=8)
+    transfer_snapshots: Dict[Tuple[int, int], RangeSnapshot] = \
+        field(init=False, repr=False, default_factory=dict)
+    transfer_mutex: Lock = field(init=False, repr=False, default_factory=Lock)
+    routes: Dict[str, Callable[[bytes], Any]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if not 0 < self.write_quorum <= self.replication_factor \
+                or not 0 < self.read_quorum <= self.replication_factor:
+            raise ValueError("Quorums need to be within 1 and the replication factor!")
+        # replica requests and the batches waiting for them get separate pools,
+        # so batches can't starve the requests they're waiting for
+        self.executor = ThreadPoolExecutor(self.max_parallel_requests)
+        self.batch_executor = ThreadPoolExecutor(self.max_parallel_requests)
+        # only the latest transfers are reported, so the history can't grow forever
+        self.transfers = deque(maxlen=self.max_transfers)
+        # writes only need to be ordered per key, so writes of other keys
+        # can share the storage's group commit instead of waiting in line
+        self.key_mutexes = [Lock() for _ in range(self.num_key_mutexes)]
+        # the instrumented handlers get wrapped once, not on every request
+        self.routes = self.build_routes()
+
+    def build_routes(self) -> Dict[str, Callable[[bytes], Any]]:
+        routes = {
+            "/lookup": self.lookup,
+            "/insert": self.insert,
+            "/delete": self.delete,
+            "/mget": self.multi_lookup,
+            "/mput": self.multi_insert,
+            "/mdelete": self.multi_delete,
+            "/replica/mget": self.replica_get,
+            "/replica/mput": self.replica_put,
+            "/transfer/pull": self.transfer_pull,
+            "/transfer/push": self.transfer_push,
+            "/transfer/cleanup": self.transfer_cleanup,
+            "/transfer/progress": self.transfer_progress,
+            "/ready": self.ready
+        }
+        if self.tracer is not None:
+            routes.update({ rule: self.traced_route(rule, routes[rule])
+                            for rule in CLIENT_ROUTES })
+        if self.metrics is None:
+            return routes
+        return { rule: self.timed_route(rule, handler) for rule, handler in routes.items() }
+
+    def timed_route(self, rule: str, handler: Callable[[bytes], Any]) -> Callable[[bytes], Any]:
+        requests = self.metrics.counter(
+            "dht_requests_total", "DHT requests served, by route.", ("route",))
+        request_secs = self.metrics.histogram(
+            "dht_request_seconds", "Time to serve a DHT request, by route.", ("route",))
+
+        def handle(body: bytes) -> Any:
+            start = perf_counter()
+            try:
+                return handler(body)
+            finally:
+                requests.inc(rule)
+                request_secs.observe(perf_counter() - start, rule)
+        return handle
+
+    def traced_route(self, rule: str, handler: Callable[[bytes], Any]) -> Callable[[bytes], Any]:
+        def handle(body: bytes) -> Any:
+            span = self.tracer.start_trace(f"dht{rule}", str(self.node.node_id))
+            try:
+                return handler(body)
+            finally:
+                if span is not None:
+                    self.tracer.finish(span)
+        return handle
+
+    def traced(self, name: str, parent: Optional[List[int]]=None,
+               **attributes: Any) -> ContextManager[Optional[Span]]:
+        """A span of the forwarded trace context or the current trace,
+        if the request being served is traced."""
+        if self.tracer is None:
+            return nullcontext()
+        return self.trace_span(name, parent, **attributes)
+
+    @contextmanager
+    def trace_span(self, name: str, parent: Optional[List[int]],
+                   **attributes: Any) -> Iterator[Optional[Span]]:
+        span = None
+        context = TraceContext(*parent) if parent else current_trace.get()
+        if context is not None:
+            span = self.tracer.start_span(name, str(self.node.node_id), context, **attributes)
+        try:
+            yield span
+        finally:
+            if span is not None:
+                self.tracer.finish(span)
+
+    def submit(self, executor: ThreadPoolExecutor,
+               func: Callable[..., Any], *args: Any) -> Future:
+        # the pool's threads only need the caller's context to carry its trace
+        if self.tracer is None:
+            return executor.submit(func, *args)
+        return executor.submit(copy_context().run, func, *args)
 
     def activate(self):
         self.is_active = True
 
+    def close(self):
+        self.is_active = False
+        self.batch_executor.shutdown()
+        self.executor.shutdown()
+        self.local_data.close()
+
     def lookup(self, request: bytes):
         if not self.is_active:
             return self.make_response("Bad request!".encode("utf-8"), 400)
 
         data_dict = loads(request)
         key = ResourceKey(data_dict["resource_id"])
-        endpoint_id = self.node.lookup(key)
+        replicas = self.resolve_replicas(key)
+        records = self.read_records(tuple(replicas), [key])
+        if records is None:
+            return self.make_response("Read quorum not reached!".encode("utf-8"), 503)
 
-        response: bytes
-        if endpoint_id != self.node.node_id:
-            response = self.send_request(
-                f"http://{endpoint_id.ip_address}:{self.dht_port}/lookup",
-                request)
-        else:
-            response = dumps({
-                "resource_id": key,
-                "value": self.local_data[key.value]
-            }).encode("utf-8")
-        return response
+        _, is_deleted, value = records[0]
+        if is_deleted:
+            return self.make_response("Not found!".encode("utf-8"), 404)
+        return dumps({"resource_id": key.value, "value": value}).encode("utf-8")
 
     def insert(self, request: bytes):
         if not self.is_active:
@@ -43,17 +224,11 @@ class DHTService:
 
         data_dict = loads(request)
         key = ResourceKey(data_dict["resource_id"])
-        endpoint_id = self.node.lookup(key)
-
-        response: bytes
-        if endpoint_id != self.node.node_id:
-            response = self.send_request(
-                f"http://{endpoint_id.ip_address}:{self.dht_port}/insert",
-                request)
-        else:
-            response = request
-            self.local_data[data_dict["resource_id"]] = data_dict["value"]
-        return response
+        replicas = self.resolve_replicas(key)
+        record = (self.next_version(), False, data_dict["value"])
+        if not self.write_records(tuple(replicas), [key], [record]):
+            return self.make_response("Write quorum not reached!".encode("utf-8"), 503)
+        return request
 
     def delete(self, request: bytes):
         if not self.is_active:
@@ -61,14 +236,366 @@ class DHTService:
 
         data_dict = loads(request)
         key = ResourceKey(data_dict["resource_id"])
-        endpoint_id = self.node.lookup(key)
+        replicas = self.resolve_replicas(key)
+        record = (self.next_version(), True, None)
+        if not self.write_records(tuple(replicas), [key], [record]):
+            return self.make_response("Write quorum not reached!".encode("utf-8"), 503)
+        return request
+
+    def multi_lookup(self, request: bytes):
+        if not self.is_active:
+            return self.make_response("Bad request!".encode("utf-8"), 400)
+
+        keys = [ResourceKey(k) for k in loads(request)["resource_ids"]]
+        groups = self.group_by_replicas(keys)
+        futures = { self.submit(self.batch_executor, self.read_records, replicas, group_keys):
+                        group_keys
+                    for replicas, group_keys in groups.items() }
 
-        response: bytes
-        if endpoint_id != self.node.node_id:
+        resources, failed_ids = [], []
+        for future, group_keys in futures.items():
+            records = future.result()
+            if records is None:
+                failed_ids.extend(k.value for k in group_keys)
+                continue
+            resources.extend({"resource_id": k.value, "value": value}
+                             for k, (_, is_deleted, value) in zip(group_keys, records)
+                             if not is_deleted)
+        return self.batch_response({"resources": resources}, failed_ids)
+
+    def multi_insert(self, request: bytes):
+        if not self.is_active:
+            return self.make_response("Bad request!".encode("utf-8"), 400)
+
+        values = { ResourceKey(r["resource_id"]): r["value"]
+                   for r in loads(request)["resources"] }
+        return self.write_batch(values, False)
+
+    def multi_delete(self, request: bytes):
+        if not self.is_active:
+            return self.make_response("Bad request!".encode("utf-8"), 400)
+
+        values = { ResourceKey(k): None for k in loads(request)["resource_ids"] }
+        return self.write_batch(values, True)
+
+    def write_batch(self, values: Dict[ResourceKey, Any], is_deleted: bool):
+        groups = self.group_by_replicas(list(values))
+        futures = {}
+        for replicas, group_keys in groups.items():
+            records = [(self.next_version(), is_deleted, values[k]) for k in group_keys]
+            future = self.submit(
+                self.batch_executor, self.write_records, replicas, group_keys, records)
+            futures[future] = group_keys
+
+        failed_ids = [k.value for future, group_keys in futures.items()
+                      if not future.result() for k in group_keys]
+        return self.batch_response({}, failed_ids)
+
+    def batch_response(self, response: Dict[str, Any], failed_ids: List[int]):
+        # keys of unreachable replica sets are reported, so clients can retry just those
+        response["failed_ids"] = failed_ids
+        body = dumps(response).encode("utf-8")
+        return self.make_response(body, 503) if failed_ids else body
+
+    def replica_get(self, request: bytes):
+        if not self.is_active:
+            return self.make_response("Bad request!".encode("utf-8"), 400)
+        data_dict = loads(request)
+        with self.traced("dht/replica/mget", data_dict.get("trace")):
+            return dumps([self.load_record(k) for k in data_dict["resource_ids"]]).encode("utf-8")
+
+    def replica_put(self, request: bytes):
+        if not self.is_active:
+            return self.make_response("Bad request!".encode("utf-8"), 400)
+        data_dict = loads(request)
+        with self.traced("dht/replica/mput", data_dict.get("trace")):
+            for key, record in zip(data_dict["resource_ids"], data_dict["records"]):
+                self.store_record(key, tuple(record))
+        return b"{}"
+
+    def migrate_in(self) -> List[TransferProgress]:
+        """Pull the keys this node owns or replicates after joining from the
+        hosts that held them so far, then let those hosts drop the keys they
+        don't replicate anymore. The node already serves requests meanwhile;
+        versions keep newer writes from being overwritten."""
+        progress = [
+            self.receive_range(source_id, start, end)
+            for source_id, start, end in self.node.replicated_ranges(self.replication_factor)
+            if source_id is not None]
+        for target_id in self.node.transfer_targets(self.replication_factor):
+            try:
+                self.send_request(
+                    f"http://{target_id.ip_address}:{self.dht_port}/transfer/cleanup", b"{}")
+            except Exception: # pylint: disable=broad-except
+                # the host keeps the keys until the next join cleans up
+                pass
+        return progress
+
+    def leave(self):
+        """Hand each range this node replicates over to the host becoming
+        its replica in place of this one, then leave the ring."""
+        for target_id, start, end in self.node.handover_ranges(self.replication_factor):
+            self.send_range(target_id, start, end)
+        self.node.leave_network()
+        self.is_active = False
+
+    def drop_foreign_keys(self) -> int:
+        """Delete the keys outside of the ranges this node replicates, e.g.
+        the ones a joining node took over, and return how many got deleted."""
+        ranges = [(start, end) for _, start, end
+                  in self.node.replicated_ranges(self.replication_factor)]
+        if not ranges:
+            return 0
+        end_positions = [(start, self.range_position(start, end)) for start, end in ranges]
+        foreign_keys = [k for k in list(self.local_data)
+                        if all(self.range_position(start, k) > end_pos
+                               for start, end_pos in end_positions)]
+        for key in foreign_keys:
+            with self.key_mutex(key):
+                self.local_data.pop(key, None)
+        return len(foreign_keys)
+
+    def is_local(self, endpoint_id: IPEndpointId) -> bool:
+        return endpoint_id.ip_address == self.node.node_id.ip_address
+
+    def receive_range(self, source_id: IPEndpointId, start: int, end: int) -> TransferProgress:
+        # pull based, so the receiver only asks for the next chunk
+        # once it stored the previous one
+        progress = self.track_transfer("in", source_id)
+        after = None
+        while True:
+            request = dumps({
+                "start": start, "end": end, "after": after,
+                "limit": self.transfer_chunk_size
+            }).encode("utf-8")
             response = self.send_request(
-                f"http://{endpoint_id.ip_address}:{self.dht_port}/delete",
-                request)
-        else:
-            response = request
-            self.local_data.pop(data_dict["resource_id"], None)
-        return response
+                f"http://{source_id.ip_address}:{self.dht_port}/transfer/pull", request)
+            chunk = loads(response)
+            for key, version, is_deleted, value in chunk["records"]:
+                self.store_record(key, (version, is_deleted, value))
+            progress.add_chunk(len(chunk["records"]), len(response))
+            after = chunk["next"]
+            if after is None:
+                break
+            sleep(self.transfer_pause_secs)
+        progress.finish()
+        return progress
+
+    def send_range(self, target_id: IPEndpointId, start: int, end: int) -> TransferProgress:
+        progress = self.track_transfer("out", target_id)
+        _, keys = self.range_keys(start, end)
+        for i in range(0, len(keys), self.transfer_chunk_size):
+            records = [[k, *self.load_record(k)] for k in keys[i:i+self.transfer_chunk_size]]
+            request = dumps({"records": records}).encode("utf-8")
+            self.send_request(
+                f"http://{target_id.ip_address}:{self.dht_port}/transfer/push", request)
+            progress.add_chunk(len(records), len(request))
+            sleep(self.transfer_pause_secs)
+        progress.finish()
+        return progress
+
+    def track_transfer(self, direction: str, peer_id: IPEndpointId) -> TransferProgress:
+        progress = TransferProgress(direction, peer_id)
+        with self.transfer_mutex:
+            self.transfers.append(progress)
+        return progress
+
+    def transfer_pull(self, request: bytes):
+        if not self.is_active:
+            return self.make_response("Bad request!".encode("utf-8"), 400)
+
+        data_dict = loads(request)
+        start, end, after = data_dict["start"], data_dict["end"], data_dict["after"]
+        limit = data_dict["limit"]
+        positions, keys = self.range_snapshot(start, end, after is None)
+        after_pos = self.range_position(start, after) if after is not None else 0
+
+        first = bisect_right(positions, after_pos)
+        chunk_keys = keys[first:first+limit]
+        records = [[k, *self.load_record(k)] for k in chunk_keys]
+        is_last = first + limit >= len(keys)
+        if is_last:
+            with self.transfer_mutex:
+                self.transfer_snapshots.pop((start, end), None)
+        next_key = None if is_last else chunk_keys[-1]
+        return dumps({"records": records, "next": next_key}).encode("utf-8")
+
+    def range_position(self, start: int, key: int) -> int:
+        # positions within (start, end] count from 1 up to the end, so a
+        # range with start == end covers the whole ring
+        return (key - start - 1) % self.node.node_id.keyspace + 1
+
+    def range_snapshot(self, start: int, end: int, is_first: bool) -> RangeSnapshot:
+        # the keys of a range get sorted once per transfer, so each chunk
+        # is a bisect instead of a scan over all keys
+        with self.transfer_mutex:
+            snapshot = self.transfer_snapshots.get((start, end))
+        if is_first or snapshot is None:
+            snapshot = self.range_keys(start, end)
+            with self.transfer_mutex:
+                self.transfer_snapshots[(start, end)] = snapshot
+                while len(self.transfer_snapshots) > self.max_transfer_snapshots:
+                    self.transfer_snapshots.pop(next(iter(self.transfer_snapshots)))
+        return snapshot
+
+    def range_keys(self, start: int, end: int) -> RangeSnapshot:
+        end_pos = self.range_position(start, end)
+        entries = sorted((self.range_position(start, k), k) for k in list(self.local_data))
+        entries = entries[:bisect_right(entries, (end_pos, float("inf")))]
+        return [pos for pos, _ in entries], [k for _, k in entries]
+
+    def transfer_push(self, request: bytes):
+        if not self.is_active:
+            return self.make_response("Bad request!".encode("utf-8"), 400)
+        for key, version, is_deleted, value in loads(request)["records"]:
+            self.store_record(key, (version, is_deleted, value))
+        return b"{}"
+
+    def transfer_cleanup(self, _: bytes):
+        if not self.is_active:
+            return self.make_response("Bad request!".encode("utf-8"), 400)
+        return dumps({"num_keys": self.drop_foreign_keys()}).encode("utf-8")
+
+    def transfer_progress(self, _: bytes):
+        with self.transfer_mutex:
+            transfers = list(self.transfers)
+        return dumps([p.to_dict() for p in transfers]).encode("utf-8")
+
+    def ready(self, _: bytes):
+        # joining nodes only bootstrap through nodes that serve the DHT already
+        if not self.is_active:
+            return self.make_response("Not ready!".encode("utf-8"), 503)
+        return b"{}"
+
+    def resolve_replicas(self, key: ResourceKey) -> List[IPEndpointId]:
+        # the owner confirms the key, so a stale cached owner costs one extra lookup
+        owner_id = self.node.lookup(key)
+        try:
+            return self.node.owner_replicas(owner_id, self.replication_factor, key)
+        except Exception: # pylint: disable=broad-except
+            self.node.invalidate_location(key)
+            return self.node.lookup_replicas(key, self.replication_factor)
+
+    def group_by_replicas(self, keys: List[ResourceKey]) -> ReplicaGroups:
+        # resolve all owners in one batched lookup, then ask each owner once
+        # for its successors; the key farthest from its owner is the first
+        # to move to a new node, so the owner only needs to confirm that one
+        owners: Dict[IPEndpointId, List[ResourceKey]] = {}
+        for key, owner_id in zip(keys, self.node.lookup_many(keys)):
+            owners.setdefault(owner_id, []).append(key)
+
+        groups: ReplicaGroups = {}
+        for owner_id, owner_keys in owners.items():
+            farthest_key = max(owner_keys, key=lambda k: ring_distance(
+                k.value, owner_id.value, owner_id.keyspace))
+            try:
+                replicas = tuple(self.node.owner_replicas(
+                    owner_id, self.replication_factor, farthest_key))
+                groups.setdefault(replicas, []).extend(owner_keys)
+            except Exception: # pylint: disable=broad-except
+                # the owner is gone or doesn't own all keys anymore
+                for key in owner_keys:
+                    self.node.invalidate_location(key)
+                    replicas = tuple(self.node.lookup_replicas(key, self.replication_factor))
+                    groups.setdefault(replicas, []).append(key)
+        return groups
+
+    def next_version(self) -> int:
+        with self.version_mutex:
+            self.last_version = max(time_ns(), self.last_version + 1)
+            return self.last_version
+
+    def load_record(self, key: int) -> Record:
+        data = self.local_data.get(key)
+        return tuple(loads(data)) if data is not None else MISSING_RECORD
+
+    def key_mutex(self, key: int) -> Lock:
+        return self.key_mutexes[key % self.num_key_mutexes]
+
+    def store_record(self, key: int, record: Record):
+        # last writer wins, so replayed or reordered writes can't roll back a key
+        with self.key_mutex(key):
+            if record[0] > self.load_record(key)[0]:
+                self.local_data[key] = dumps(record)
+
+    def read_records(self, replicas: Tuple[IPEndpointId, ...],
+                     keys: List[ResourceKey]) -> Optional[List[Record]]:
+        # ask the replicas in random order to spread the read load
+        replicas = list(replicas)
+        shuffle(replicas)
+        replies = self.gather_quorum(
+            replicas, self.read_quorum, lambda r: self.get_replica(r, keys))
+        if len(replies) < self.read_quorum:
+            return None
+
+        newest = [max(records, key=lambda r: r[0])
+                  for records in zip(*(records for _, records in replies))]
+        self.repair_replicas(keys, newest, replies)
+        return newest
+
+    def write_records(self, replicas: Tuple[IPEndpointId, ...],
+                      keys: List[ResourceKey], records: List[Record]) -> bool:
+        acks = self.gather_quorum(
+            list(replicas), self.write_quorum,
+            lambda r: self.put_replica(r, keys, records),
+            num_initial=len(replicas))
+        return len(acks) >= self.write_quorum
+
+    def repair_replicas(self, keys: List[ResourceKey], newest: List[Record],
+                        replies: List[Tuple[IPEndpointId, List[Record]]]):
+        for replica, records in replies:
+            stale = [i for i, record in enumerate(records) if record[0] < newest[i][0]]
+            if stale:
+                self.submit(
+                    self.executor, self.put_replica, replica,
+                    [keys[i] for i in stale], [newest[i] for i in stale])
+
+    def get_replica(self, replica: IPEndpointId, keys: List[ResourceKey]) -> List[Record]:
+        if self.is_local(replica):
+            return [self.load_record(k.value) for k in keys]
+        with self.traced("dht/forward/mget", peer=str(replica), num_keys=len(keys)) as span:
+            request = dumps(with_trace(
+                {"resource_ids": [k.value for k in keys]}, span)).encode("utf-8")
+            response = self.send_request(
+                f"http://{replica.ip_address}:{self.dht_port}/replica/mget", request)
+        return [tuple(record) for record in loads(response)]
+
+    def put_replica(self, replica: IPEndpointId, keys: List[ResourceKey],
+                    records: List[Record]):
+        if self.is_local(replica):
+            for key, record in zip(keys, records):
+                self.store_record(key.value, record)
+            return
+        with self.traced("dht/forward/mput", peer=str(replica), num_keys=len(keys)) as span:
+            request = dumps(with_trace({
+                "resource_ids": [k.value for k in keys],
+                "records": records
+            }, span)).encode("utf-8")
+            self.send_request(
+                f"http://{replica.ip_address}:{self.dht_port}/replica/mput", request)
+
+    def gather_quorum(self, replicas: List[IPEndpointId], quorum: int,
+                      send: Callable[[IPEndpointId], Any],
+                      num_initial: int=None) -> List[Tuple[IPEndpointId, Any]]:
+        # start with just enough requests for a quorum and only ask another
+        # replica for each one that fails; the rest keeps running in the background
+        candidates = iter(replicas)
+        pending: Dict[Future, IPEndpointId] = {}
+        results = []
+
+        def submit_next():
+            replica = next(candidates, None)
+            if replica is not None:
+                pending[self.submit(self.executor, send, replica)] = replica
+
+        for _ in range(quorum if num_initial is None else num_initial):
+            submit_next()
+        while pending and len(results) < quorum:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                replica = pending.pop(future)
+                if future.exception() is None:
+                    results.append((replica, future.result()))
+                else:
+                    submit_next()
+        return results
@@ -0,0 +1,53 @@
+from dataclasses import dataclass, field
+
+from requests import Session, Timeout, ConnectionError as RequestConnectionError
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from chordlite import ServerBusy
+
+
+@dataclass
+class PooledHttpSender:
+    """Sends HTTP POST requests over pooled keep-alive connections.
+
+    Connections are pooled per peer, so multi-hop chord lookups and DHT
+    forwards stop paying for a TCP handshake on every hop. Only failed
+    connection attempts get retried because the requests aren't idempotent.
+    Timeouts and connection errors are raised as the built-in TimeoutError
+    and ConnectionError, and peers answering 503 raise ServerBusy."""
+    pool_size: int = 16
+    max_peers: int = 64
+    connect_timeout_secs: float = 1.0
+    read_timeout_secs: float = 5.0
+    retries: int = 2
+    retry_backoff_secs: float = 0.05
+    session: Session = field(init=False)
+
+    def __post_init__(self):
+        retry = Retry(
+            total=self.retries, connect=self.retries, read=False,
+            status=False, backoff_factor=self.retry_backoff_secs)
+        adapter = HTTPAdapter(
+            pool_connections=self.max_peers, pool_maxsize=self.pool_size,
+            max_retries=retry)
+        self.session = Session()
+        self.session.mount("http://", adapter)
+
+    def __call__(self, url: str, data: bytes,
+                 content_type: str="application/json") -> bytes:
+        try:
+            response = self.session.post(
+                url, data=data, headers={"Content-Type": content_type},
+                timeout=(self.connect_timeout_secs, self.read_timeout_secs))
+        except Timeout as error:
+            raise TimeoutError(f"{url} didn't answer in time") from error
+        except RequestConnectionError as error:
+            raise ConnectionError(f"{url} is unreachable") from error
+        if response.status_code == 503:
+            raise ServerBusy(f"{url} is busy")
+        response.raise_for_status()
+        return response.content
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,93 @@
+import socket
+from queue import Queue, Full
+from threading import Thread
+from typing import Optional, Tuple, Any, List
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+
+REJECT_RESPONSE = b"HTTP/1.1 503 Service Unavailable\r\n" \
+    b"Content-Length: 0\r\nRetry-After: 1\r\nConnection: close\r\n\r\n"
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """A WSGI server dispatching connections to a fixed pool of worker threads.
+
+    Accepted connections wait in a bounded queue. Once the queue is full,
+    new connections are answered with 503 right away instead of piling up,
+    so overloaded nodes push back on their peers. On shutdown, the server
+    stops accepting and lets the workers finish all queued connections.
+    Keep-alive connections hold on to their worker until they idle out."""
+    multithread = True
+
+    def __init__(self, host: str, port: int, app: Any,
+                 num_workers: int=16, max_queue_size: int=64,
+                 keep_alive_timeout_secs: float=5.0):
+        handler = type("Handler", (PooledRequestHandler,),
+                       { "timeout": keep_alive_timeout_secs })
+        super().__init__(host, port, app, handler=handler)
+        self.pending: Queue = Queue(maxsize=max_queue_size)
+        self.rejected: Queue = Queue(maxsize=max_queue_size)
+        self.reject_timeout_secs = 0.5
+        self.num_rejected = 0
+        self.workers: List[Thread] = [
+            Thread(target=self.work, daemon=True) for _ in range(num_workers)]
+        self.rejector = Thread(target=self.reject, daemon=True)
+        for worker in self.workers + [self.rejector]:
+            worker.start()
+
+    def process_request(self, request: socket.socket, client_address: Tuple[str, int]):
+        try:
+            self.pending.put_nowait((request, client_address))
+        except Full:
+            self.num_rejected += 1
+            try:
+                self.rejected.put_nowait(request)
+            except Full:
+                self.shutdown_request(request)
+
+    def reject(self):
+        # read the request before answering, so closing the connection
+        # doesn't reset it while the client is still sending
+        while True:
+            request: Optional[socket.socket] = self.rejected.get()
+            if request is None:
+                break
+            try:
+                request.settimeout(self.reject_timeout_secs)
+                data = b""
+                while b"\r\n\r\n" not in data:
+                    chunk = request.recv(65536)
+                    if not chunk:
+                        break
+                    data += chunk
+                request.sendall(REJECT_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def work(self):
+        while True:
+            item: Optional[Tuple[socket.socket, Tuple[str, int]]] = self.pending.get()
+            if item is None:
+                break
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception: # pylint: disable=broad-except
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        for _ in self.workers:
+            self.pending.put(None)
+        self.rejected.put(None)
+        for worker in self.workers + [self.rejector]:
+            worker.join()
+        self.workers = []
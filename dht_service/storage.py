@@ -0,0 +1,389 @@
+import os
+import mmap
+import struct
+from zlib import crc32
+from threading import Thread, Lock, Condition, Event
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional, Protocol, Tuple
+
+
+class StorageBackend(Protocol):
+    def __getitem__(self, key: int) -> str:
+        raise NotImplementedError()
+
+    def __setitem__(self, key: int, value: str):
+        raise NotImplementedError()
+
+    def __delitem__(self, key: int):
+        raise NotImplementedError()
+
+    def __contains__(self, key: int) -> bool:
+        raise NotImplementedError()
+
+    def __iter__(self) -> Iterator[int]:
+        raise NotImplementedError()
+
+    def __len__(self) -> int:
+        raise NotImplementedError()
+
+    def pop(self, key: int, default: Optional[str]=None) -> Optional[str]:
+        raise NotImplementedError()
+
+    def close(self):
+        raise NotImplementedError()
+
+
+class DictStorage(dict):
+    """Keeps all data in memory, so it's lost on restart."""
+
+    def close(self):
+        pass
+
+
+PUT_RECORD, DELETE_RECORD = 0, 1
+RECORD_HEADER = struct.Struct(">IB32sI")
+INDEX_MAGIC = b"CHRDIDX1"
+INDEX_HEADER = struct.Struct(">8sQQQ")
+INDEX_ENTRY = struct.Struct(">32sQI")
+
+Location = Tuple[int, int]
+
+
+def encode_key(key: int) -> bytes:
+    return key.to_bytes(32, "big")
+
+
+def decode_key(raw_key: bytes) -> int:
+    return int.from_bytes(raw_key, "big")
+
+
+def encode_record(flags: int, key: int, value: bytes) -> bytes:
+    body = RECORD_HEADER.pack(0, flags, encode_key(key), len(value))[4:] + value
+    return struct.pack(">I", crc32(body)) + body
+
+
+def fsync_directory(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class MappedIndex:
+    """A sorted array of fixed-size (key, offset, length) entries that is
+    memory-mapped from a snapshot file and searched by bisection."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+        self.data: Optional[mmap.mmap] = None
+        self.covered_log_size = 0
+        self.count = 0
+        self.live_bytes = 0
+        if os.path.exists(path):
+            self.load()
+
+    def load(self):
+        self.file = open(self.path, "rb")
+        if os.fstat(self.file.fileno()).st_size < INDEX_HEADER.size:
+            self.close()
+            return
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, covered, count, live_bytes = INDEX_HEADER.unpack_from(self.data)
+        if magic != INDEX_MAGIC or \
+                len(self.data) != INDEX_HEADER.size + count * INDEX_ENTRY.size:
+            self.close()
+            return
+        self.covered_log_size, self.count, self.live_bytes = covered, count, live_bytes
+
+    def entry(self, i: int) -> Tuple[bytes, int, int]:
+        return INDEX_ENTRY.unpack_from(self.data, INDEX_HEADER.size + i * INDEX_ENTRY.size)
+
+    def find(self, key: int) -> Optional[Location]:
+        raw_key = encode_key(key)
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.entry(mid)[0] < raw_key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.count:
+            entry_key, offset, length = self.entry(low)
+            if entry_key == raw_key:
+                return offset, length
+        return None
+
+    def entries(self) -> Iterator[Tuple[int, Location]]:
+        for i in range(self.count):
+            raw_key, offset, length = self.entry(i)
+            yield decode_key(raw_key), (offset, length)
+
+    @staticmethod
+    def write(path: str, entries: List[Tuple[int, Location]],
+              covered_log_size: int, live_bytes: int):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, covered_log_size, len(entries), live_bytes))
+            for key, (offset, length) in entries:
+                file.write(INDEX_ENTRY.pack(encode_key(key), offset, length))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+        fsync_directory(os.path.dirname(path))
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.covered_log_size, self.count, self.live_bytes = 0, 0, 0
+
+
+class LogStructuredStorage(MutableMapping):
+    """Persists all writes to an append-only log file.
+
+    Writers append their records and then wait for a committer thread
+    that fsyncs all pending records at once (group commit). The location
+    of each value is kept in a memory-mapped index snapshot plus an
+    in-memory table of the changes since the snapshot, so a restart only
+    replays the log tail that the snapshot doesn't cover. A background
+    thread snapshots the index once the change table grows too large
+    and compacts the log once too much of it is garbage."""
+
+    def __init__(self, directory: str, sync_writes: bool=True,
+                 group_commit_interval_secs: float=0.002,
+                 maintenance_interval_secs: float=1.0,
+                 index_flush_threshold: int=100_000,
+                 compaction_garbage_ratio: float=0.5,
+                 min_compaction_bytes: int=1 << 20):
+        self.directory = directory
+        self.log_path = os.path.join(directory, "data.log")
+        self.index_path = os.path.join(directory, "index.bin")
+        self.sync_writes = sync_writes
+        self.group_commit_interval_secs = group_commit_interval_secs
+        self.maintenance_interval_secs = maintenance_interval_secs
+        self.index_flush_threshold = index_flush_threshold
+        self.compaction_garbage_ratio = compaction_garbage_ratio
+        self.min_compaction_bytes = min_compaction_bytes
+
+        self.mutex = Lock()
+        self.commit_cond = Condition(self.mutex)
+        self.maintenance_mutex = Lock()
+        self.stop_event = Event()
+        self.write_seq = 0
+        self.durable_seq = 0
+        self.changes: Dict[int, Optional[Location]] = {}
+        self.retired_fds: List[int] = []
+
+        os.makedirs(directory, exist_ok=True)
+        self.index = MappedIndex(self.index_path)
+        self.fd = os.open(self.log_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.log_size = os.fstat(self.fd).st_size
+        if self.index.covered_log_size > self.log_size:
+            self.index.close()
+        self.num_keys = self.index.count
+        self.live_bytes = self.index.live_bytes
+        self.recover(self.index.covered_log_size)
+
+        self.committer = Thread(target=self.commit_writes, daemon=True)
+        self.maintainer = Thread(target=self.maintain, daemon=True)
+        self.committer.start()
+        self.maintainer.start()
+
+    @property
+    def garbage_bytes(self) -> int:
+        return self.log_size - self.live_bytes
+
+    def recover(self, offset: int):
+        end = self.replay(self.fd, offset, self.log_size, self.apply_record)
+        if end < self.log_size:
+            # drop the torn record of an interrupted write
+            os.ftruncate(self.fd, end)
+            self.log_size = end
+
+    @staticmethod
+    def replay(fd: int, offset: int, end: int, apply) -> int:
+        while offset + RECORD_HEADER.size <= end:
+            header = os.pread(fd, RECORD_HEADER.size, offset)
+            checksum, flags, raw_key, length = RECORD_HEADER.unpack(header)
+            record_size = RECORD_HEADER.size + length
+            if offset + record_size > end:
+                break
+            value = os.pread(fd, length, offset + RECORD_HEADER.size)
+            if crc32(header[4:] + value) != checksum:
+                break
+            apply(flags, decode_key(raw_key), offset, length)
+            offset += record_size
+        return offset
+
+    def apply_record(self, flags: int, key: int, offset: int, length: int):
+        old_location = self.locate(key)
+        if old_location is not None:
+            self.num_keys -= 1
+            self.live_bytes -= RECORD_HEADER.size + old_location[1]
+        if flags == DELETE_RECORD:
+            self.changes[key] = None
+        else:
+            self.changes[key] = (offset + RECORD_HEADER.size, length)
+            self.num_keys += 1
+            self.live_bytes += RECORD_HEADER.size + length
+
+    def locate(self, key: int) -> Optional[Location]:
+        if key in self.changes:
+            return self.changes[key]
+        return self.index.find(key)
+
+    def append(self, flags: int, key: int, value: bytes) -> int:
+        record = encode_record(flags, key, value)
+        os.pwrite(self.fd, record, self.log_size)
+        self.apply_record(flags, key, self.log_size, len(value))
+        self.log_size += len(record)
+        self.write_seq += 1
+        return self.write_seq
+
+    def wait_durable(self, seq: int):
+        if not self.sync_writes:
+            return
+        with self.commit_cond:
+            self.commit_cond.notify_all()
+            while self.durable_seq < seq and not self.stop_event.is_set():
+                self.commit_cond.wait()
+
+    def commit_writes(self):
+        while not self.stop_event.is_set():
+            with self.commit_cond:
+                while self.durable_seq == self.write_seq and not self.stop_event.is_set():
+                    self.commit_cond.wait()
+            # give concurrent writers the chance to join this commit
+            self.stop_event.wait(self.group_commit_interval_secs)
+            with self.commit_cond:
+                seq, fd = self.write_seq, self.fd
+            os.fsync(fd)
+            with self.commit_cond:
+                self.durable_seq = max(self.durable_seq, seq)
+                self.commit_cond.notify_all()
+                retired_fds, self.retired_fds = self.retired_fds, []
+            for retired_fd in retired_fds:
+                os.close(retired_fd)
+
+    def __getitem__(self, key: int) -> str:
+        with self.mutex:
+            location = self.locate(key)
+            if location is None:
+                raise KeyError(key)
+            offset, length = location
+            return os.pread(self.fd, length, offset).decode("utf-8")
+
+    def __setitem__(self, key: int, value: str):
+        with self.mutex:
+            seq = self.append(PUT_RECORD, key, value.encode("utf-8"))
+        self.wait_durable(seq)
+
+    def __delitem__(self, key: int):
+        with self.mutex:
+            if self.locate(key) is None:
+                raise KeyError(key)
+            seq = self.append(DELETE_RECORD, key, b"")
+        self.wait_durable(seq)
+
+    def __contains__(self, key: object) -> bool:
+        with self.mutex:
+            return isinstance(key, int) and self.locate(key) is not None
+
+    def __len__(self) -> int:
+        return self.num_keys
+
+    def __iter__(self) -> Iterator[int]:
+        return iter([key for key, _ in self.live_entries()])
+
+    def live_entries(self) -> List[Tuple[int, Location]]:
+        with self.mutex:
+            return self.merge_entries(self.changes)
+
+    def merge_entries(self, changes: Dict[int, Optional[Location]]) -> List[Tuple[int, Location]]:
+        entries = [(k, loc) for k, loc in self.index.entries() if k not in changes]
+        entries += [(k, loc) for k, loc in changes.items() if loc is not None]
+        return sorted(entries)
+
+    def maintain(self):
+        while not self.stop_event.wait(self.maintenance_interval_secs):
+            if self.garbage_bytes >= self.min_compaction_bytes and \
+                    self.garbage_bytes >= self.compaction_garbage_ratio * self.log_size:
+                self.compact()
+            elif len(self.changes) >= self.index_flush_threshold:
+                self.flush_index()
+
+    def flush_index(self):
+        with self.maintenance_mutex:
+            with self.mutex:
+                changes = dict(self.changes)
+                covered_log_size, live_bytes = self.log_size, self.live_bytes
+            entries = self.merge_entries(changes)
+            MappedIndex.write(self.index_path, entries, covered_log_size, live_bytes)
+
+            with self.mutex:
+                self.index.close()
+                self.index = MappedIndex(self.index_path)
+                self.changes = { k: loc for k, loc in self.changes.items()
+                                 if changes.get(k, False) is not loc }
+
+    def compact(self):
+        compact_path = self.log_path + ".compact"
+        with self.maintenance_mutex:
+            with self.mutex:
+                entries = self.merge_entries(self.changes)
+                old_fd, copied_log_size = self.fd, self.log_size
+
+            # copy the live records without blocking readers and writers
+            new_fd = os.open(compact_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            new_entries, new_size = [], 0
+            for key, (offset, length) in entries:
+                record = encode_record(PUT_RECORD, key, os.pread(old_fd, length, offset))
+                os.pwrite(new_fd, record, new_size)
+                new_entries.append((key, (new_size + RECORD_HEADER.size, length)))
+                new_size += len(record)
+            os.fsync(new_fd)
+            MappedIndex.write(self.index_path + ".compact", new_entries, new_size, new_size)
+
+            with self.mutex:
+                # move the writes that happened during the copy over as well
+                tail = os.pread(old_fd, self.log_size - copied_log_size, copied_log_size)
+                os.pwrite(new_fd, tail, new_size)
+                os.fsync(new_fd)
+                # without an index, a crash in between falls back to a full replay
+                if os.path.exists(self.index_path):
+                    os.unlink(self.index_path)
+                    fsync_directory(self.directory)
+                os.replace(compact_path, self.log_path)
+                fsync_directory(self.directory)
+                os.replace(self.index_path + ".compact", self.index_path)
+                fsync_directory(self.directory)
+
+                self.index.close()
+                self.index = MappedIndex(self.index_path)
+                self.fd, self.log_size = new_fd, new_size + len(tail)
+                self.changes = {}
+                self.num_keys, self.live_bytes = self.index.count, self.index.live_bytes
+                self.recover(new_size)
+                self.durable_seq = self.write_seq
+                self.commit_cond.notify_all()
+                # the committer might still be syncing the old log
+                self.retired_fds.append(old_fd)
+
+    def close(self):
+        self.flush_index()
+        self.stop_event.set()
+        with self.commit_cond:
+            self.commit_cond.notify_all()
+        self.committer.join()
+        self.maintainer.join()
+        with self.mutex:
+            os.fsync(self.fd)
+            for fd in [self.fd] + self.retired_fds:
+                os.close(fd)
+            self.retired_fds = []
+            self.index.close()
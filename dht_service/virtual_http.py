@@ -0,0 +1,28 @@
+from dataclasses import dataclass, field
+from typing import Dict, Callable, Any
+from urllib.parse import urlsplit
+
+
+@dataclass
+class VirtualHttpNetwork:
+    """Delivers DHT requests to in-process services instead of sending them
+    over sockets, so multi-node setups can be tested deterministically."""
+    services: Dict[str, Dict[str, Callable[[bytes], Any]]] = field(default_factory=dict)
+
+    def register_service(self, address: str, routes: Dict[str, Callable[[bytes], Any]]):
+        self.services[address] = routes
+
+    def unregister_service(self, address: str):
+        self.services.pop(address, None)
+
+    def __call__(self, url: str, data: bytes,
+                 content_type: str="application/json") -> bytes:
+        parsed_url = urlsplit(url)
+        routes = self.services.get(parsed_url.netloc)
+        if routes is None:
+            raise ConnectionError(f"{parsed_url.netloc} is unreachable!")
+        response = routes[parsed_url.path](data)
+        body, status = response if isinstance(response, tuple) else (response, 200)
+        if status >= 400:
+            raise RuntimeError(f"{url} failed with status {status}!")
+        return body
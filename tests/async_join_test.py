@@ -1,5 +1,4 @@
 from typing import List
-from time import sleep
 from threading import Thread
 from chordlite import ResourceKey, ChordNode
 
@@ -12,8 +11,9 @@ def test_can_init_network_in_parallel():
 
     def join_worker(node: ChordNode, bootstrap: ChordNode):
         node.initiate_join(bootstrap)
-        sleep(5)
-        node.update_finger_table()
+        for _ in range(3):
+            node.stabilize()
+            node.fix_fingers(4)
 
     bootstrap = min(nodes, key=lambda n: n.node_id)
     threads = [Thread(target=join_worker, args=(n, bootstrap)) for n in nodes]
@@ -21,6 +21,10 @@ def test_can_init_network_in_parallel():
         thread.start()
     for thread in threads:
         thread.join()
+    for _ in range(3):
+        for node in nodes:
+            node.stabilize()
+            node.fix_fingers(4)
 
     exp_succs = nodes[1:] + [nodes[0]]
     exp_preds = [nodes[-1]] + nodes[:-1]
@@ -0,0 +1,61 @@
+import asyncio
+from random import Random
+from chordlite import \
+    IPEndpointId, ResourceKey, AsyncVirtualNetwork, \
+    AsyncNetworkedChordNode, AsyncChordRemoteEndpoint
+
+
+def create_network(num_nodes: int, **kwargs):
+    network = AsyncVirtualNetwork()
+    nodes = [AsyncNetworkedChordNode(IPEndpointId(f"10.0.0.{key}", "5555", 1 << 14),
+                                     network, **kwargs)
+             for key in range(num_nodes)]
+    nodes = sorted(nodes, key=lambda n: n.node_id)
+    for node in nodes:
+        network.register_node(node)
+    return network, nodes
+
+
+def test_can_init_network_over_async_virtual_network():
+    network, nodes = create_network(64)
+
+    async def init_network():
+        bootstrap_id = min([n.node_id for n in nodes])
+        for node in nodes:
+            bootstrap = AsyncChordRemoteEndpoint(node.node_id, bootstrap_id, network)
+            await node.node.initiate_join(bootstrap)
+        for node in nodes:
+            await node.node.update_finger_table()
+
+    asyncio.run(init_network())
+
+    exp_succs = nodes[1:] + [nodes[0]]
+    exp_preds = [nodes[-1]] + nodes[:-1]
+    exp_fingers = [min(nodes, key=lambda f: f.node_id - s).node_id
+                   for n in nodes for s in n.node.node.finger_starts]
+    assert [n.node.node.successor.node_id for n in nodes] == [n.node_id for n in exp_succs]
+    assert [n.node.node.predecessor.node_id for n in nodes] == [n.node_id for n in exp_preds]
+    assert [f.node_id for n in nodes for f in n.node.node.fingers] == exp_fingers
+
+
+def test_can_keep_many_lookups_in_flight():
+    network, nodes = create_network(64, finger_update_interval_secs=0.01,
+                                    finger_update_jitter_secs=0.01)
+    rng = Random(42)
+    keys = [rng.randrange(1 << 14) for _ in range(2000)]
+
+    async def run_lookups():
+        bootstrap_id = nodes[0].node_id
+        await asyncio.gather(*[n.join_network(bootstrap_id) for n in nodes])
+        for _ in range(3):
+            for node in nodes:
+                await node.node.stabilize()
+                await node.node.update_finger_table()
+        owners = await asyncio.gather(*[
+            rng.choice(nodes).lookup(ResourceKey(k, 1 << 14)) for k in keys])
+        await asyncio.gather(*[n.shutdown() for n in nodes])
+        return owners
+
+    owners = asyncio.run(run_lookups())
+    exp_owners = [min(nodes, key=lambda n: n.node_id - k).node_id for k in keys]
+    assert owners == exp_owners
@@ -0,0 +1,92 @@
+from threading import Thread
+from time import monotonic
+import pytest
+from chordlite import IPEndpointId, NetworkBootstrapper, SeedBootstrapper, nearest_member
+
+
+def test_nodes_join_through_a_member_answering():
+    member = NetworkBootstrapper(
+        IPEndpointId("10.0.0.9", "5555"), 47123, is_member=lambda: True,
+        broadcast_address="127.255.255.255")
+    member.start()
+    joining = NetworkBootstrapper(
+        IPEndpointId("10.0.0.1", "5555"), 47123,
+        broadcast_address="127.255.255.255", settle_secs=10.0)
+    try:
+        assert joining.find_bootstrap() == member.endpoint_id
+        assert member.all_node_ids == {joining.endpoint_id}
+    finally:
+        joining.close()
+        member.close()
+    assert member.receiver is None and member.sock is None
+
+
+def test_starting_nodes_agree_on_the_smallest_one():
+    bootstrappers = [
+        NetworkBootstrapper(IPEndpointId(f"10.0.0.{i}", "5555"), 47124,
+                            broadcast_address="127.255.255.255",
+                            settle_secs=0.5, spread_secs=0.2)
+        for i in range(4)]
+    bootstrap_ids = [None for _ in bootstrappers]
+    def find(i: int):
+        bootstrap_ids[i] = bootstrappers[i].find_bootstrap()
+
+    for bootstrapper in bootstrappers:
+        bootstrapper.start()
+    threads = [Thread(target=find, args=(i,)) for i in range(len(bootstrappers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for bootstrapper in bootstrappers:
+        bootstrapper.close()
+
+    smallest = min((b.endpoint_id for b in bootstrappers), key=lambda n: n.key)
+    assert bootstrap_ids == [smallest for _ in bootstrappers]
+
+
+def test_starting_nodes_spread_their_joins_over_the_joined_ones():
+    founder_id, early_id, late_id = sorted(
+        (IPEndpointId(f"10.0.0.{i}", "5555") for i in range(3)), key=lambda n: n.key)
+    assert nearest_member(late_id, {founder_id, early_id}) == early_id
+    late = NetworkBootstrapper(late_id, 47125, broadcast_address="127.255.255.255",
+                               settle_secs=0.2, spread_secs=0.3)
+
+    # the founder joins once the settle time is over and the early node shortly
+    # after, while the late node waits for 2/3 of the spread time
+    start = monotonic()
+    joined_after = {founder_id: 0.2, early_id: 0.3}
+    def answer_announcement(msg: bytes, address):
+        for node_id, joined_at in joined_after.items():
+            late.handle(node_id, monotonic() - start >= joined_at)
+    late.send = answer_announcement
+    try:
+        assert late.find_bootstrap() == early_id
+    finally:
+        late.close()
+
+
+def test_seeds_bootstrap_through_a_member_or_the_first_seed():
+    seed_ids = [IPEndpointId(f"10.0.0.{i}", "5555") for i in range(3)]
+    members = set()
+    probes = []
+    def is_member(node_id: IPEndpointId) -> bool:
+        probes.append(node_id)
+        return node_id in members
+
+    first = SeedBootstrapper(seed_ids[0], seed_ids, is_member)
+    assert first.find_bootstrap() == seed_ids[0]
+
+    members.add(seed_ids[2])
+    assert first.find_bootstrap() == seed_ids[2]
+    other = SeedBootstrapper(IPEndpointId("10.0.0.7", "5555"), seed_ids, is_member)
+    assert other.find_bootstrap() == seed_ids[2]
+
+    # only the first seed may found the ring, the others wait for it
+    members.clear()
+    probes.clear()
+    waiting = SeedBootstrapper(seed_ids[1], seed_ids, is_member,
+                               retry_interval_secs=0.01, timeout_secs=0.1)
+    with pytest.raises(TimeoutError):
+        waiting.find_bootstrap()
+    assert probes and seed_ids[1] not in probes
@@ -1,9 +1,12 @@
 from chordlite import \
     IPEndpointId, ChordRequest, ChordResponse, \
-    ChordRequestType, ChordStatus, ResourceKey
+    ChordRequestType, ChordStatus, ResourceKey, TraceContext
+from chordlite.key import SHA256_KEYSPACE
 from chordlite.http_msg import \
     serialize_request, deserialize_request, \
-    serialize_response, deserialize_response
+    serialize_response, deserialize_response, \
+    JSON_CODEC, BINARY_CODEC, codec_for, \
+    send_chord_request, receive_chord_request
 
 
 def test_can_transmit_request():
@@ -34,3 +37,115 @@ def test_can_transmit_response():
     deser_response = deserialize_response(ser_response, endpoint.keyspace)
 
     assert orig_response == deser_response
+
+
+def test_can_transmit_binary_request():
+    orig_request = ChordRequest(
+        ChordRequestType.JOIN,
+        IPEndpointId("10.0.0.2", "5555", 1 << 14),
+        IPEndpointId("::1", "5555", 1 << 14),
+        IPEndpointId("dht-node", "80", 1 << 14),
+        ResourceKey(12345, 1 << 14),
+        new_successor_id=IPEndpointId("fe80::2", "65535", 1 << 14)
+    )
+
+    ser_request = BINARY_CODEC.serialize_request(orig_request)
+    deser_request = BINARY_CODEC.deserialize_request(ser_request, 1 << 14)
+
+    assert orig_request == deser_request
+    assert str(deser_request.receiver_id) == "::1:5555"
+    assert str(deser_request.requester_id) == "dht-node:80"
+    assert deser_request.new_predecessor_id is None
+
+
+def test_can_transmit_binary_response():
+    orig_response = ChordResponse(
+        IPEndpointId("10.0.0.2", "5555"),
+        IPEndpointId("10.0.0.3", "5555"),
+        IPEndpointId("10.0.0.4", "5555"),
+        status=ChordStatus.FAILURE
+    )
+
+    ser_response = BINARY_CODEC.serialize_response(orig_response)
+    deser_response = BINARY_CODEC.deserialize_response(ser_response, SHA256_KEYSPACE)
+
+    assert orig_response == deser_response
+    assert len(ser_response) < len(JSON_CODEC.serialize_response(orig_response))
+
+
+def test_can_transmit_successor_list():
+    orig_response = ChordResponse(
+        IPEndpointId("10.0.0.2", "5555"),
+        successor_ids=[IPEndpointId(f"10.0.0.{i}", "5555") for i in range(3, 7)]
+    )
+
+    for codec in [JSON_CODEC, BINARY_CODEC]:
+        ser_response = codec.serialize_response(orig_response)
+        deser_response = codec.deserialize_response(ser_response, SHA256_KEYSPACE)
+        assert orig_response == deser_response
+
+
+def test_can_transmit_batched_keys():
+    orig_request = ChordRequest(
+        ChordRequestType.FIND_SUCC_BATCH,
+        IPEndpointId("10.0.0.1", "5555"),
+        IPEndpointId("10.0.0.2", "5555"),
+        IPEndpointId("10.0.0.3", "5555"),
+        ResourceKey(42),
+        requested_resource_ids=[ResourceKey(k) for k in [42, 1 << 200, (1 << 256) - 1]]
+    )
+
+    for codec in [JSON_CODEC, BINARY_CODEC]:
+        ser_request = codec.serialize_request(orig_request)
+        deser_request = codec.deserialize_request(ser_request, SHA256_KEYSPACE)
+        assert orig_request == deser_request
+
+
+def test_can_transmit_trace_context():
+    orig_request = ChordRequest(
+        ChordRequestType.FIND_PRED,
+        IPEndpointId("10.0.0.1", "5555"),
+        IPEndpointId("10.0.0.2", "5555"),
+        IPEndpointId("10.0.0.3", "5555"),
+        ResourceKey(42),
+        trace=TraceContext((1 << 64) - 1, 7)
+    )
+
+    for codec in [JSON_CODEC, BINARY_CODEC]:
+        ser_request = codec.serialize_request(orig_request)
+        deser_request = codec.deserialize_request(ser_request, SHA256_KEYSPACE)
+        assert orig_request == deser_request
+
+
+def test_can_transmit_lookup_hops():
+    orig_response = ChordResponse(
+        IPEndpointId("10.0.0.2", "5555"),
+        predecessor_id=IPEndpointId("10.0.0.3", "5555"),
+        num_hops=5
+    )
+
+    for codec in [JSON_CODEC, BINARY_CODEC]:
+        ser_response = codec.serialize_response(orig_response)
+        deser_response = codec.deserialize_response(ser_response, SHA256_KEYSPACE)
+        assert orig_response == deser_response
+
+
+def test_can_negotiate_codec_by_content_type():
+    assert codec_for("application/x-chord") == BINARY_CODEC
+    assert codec_for("application/json; charset=utf-8") == JSON_CODEC
+    assert codec_for(None) == JSON_CODEC
+
+    request = ChordRequest(
+        ChordRequestType.SUCC_LOOKUP,
+        IPEndpointId("10.0.0.2", "5555"),
+        IPEndpointId("10.0.0.1", "5555"),
+        IPEndpointId("10.0.0.1", "5555"),
+        ResourceKey(1)
+    )
+    send_request = lambda url, data, content_type: receive_chord_request(
+        lambda r: ChordResponse(r.forward_id, successor_id=r.receiver_id),
+        SHA256_KEYSPACE, data, content_type)
+
+    for codec in [JSON_CODEC, BINARY_CODEC]:
+        response = send_chord_request(send_request, SHA256_KEYSPACE, request, codec)
+        assert response.successor_id == request.receiver_id
@@ -0,0 +1,39 @@
+from json import dumps, loads
+from chordlite import ChordRequestType
+from tests.dht_helpers import create_dht_network
+
+
+def test_can_batch_keys_per_replica_set():
+    network, _, services = create_dht_network(8)
+    keys = list(range(0, 2 ** 256, 2 ** 246))
+    request_types = []
+    network.logger = lambda m: request_types.append(m.request_type)
+
+    response = services[2].multi_insert(dumps({
+        "resources": [{"resource_id": k, "value": k % 7} for k in keys]
+    }).encode("utf-8"))
+    assert loads(response) == {"failed_ids": []}
+    # one successor list request per owner instead of one per key
+    assert request_types.count(ChordRequestType.SUCC_LIST) <= len(services) + 1
+    assert sum(len(s.local_data) for s in services) >= 2 * len(keys)
+
+    response = services[5].multi_lookup(dumps({"resource_ids": keys}).encode("utf-8"))
+    resources = loads(response)["resources"]
+    assert sorted((r["resource_id"], r["value"]) for r in resources) == \
+        [(k, k % 7) for k in keys]
+
+    services[0].multi_delete(dumps({"resource_ids": keys[::2]}).encode("utf-8"))
+    response = services[7].multi_lookup(dumps({"resource_ids": keys}).encode("utf-8"))
+    assert sorted(r["resource_id"] for r in loads(response)["resources"]) == keys[1::2]
+
+
+def test_can_report_keys_of_failed_replica_sets():
+    _, http, services = create_dht_network(4)
+    for victim in services[1:3]:
+        http.unregister_service(f"{victim.node.node_id.ip_address}:5555")
+
+    body, status = services[0].multi_insert(dumps({
+        "resources": [{"resource_id": k, "value": k} for k in range(0, 2 ** 256, 2 ** 252)]
+    }).encode("utf-8"))
+    assert status == 503
+    assert loads(body)["failed_ids"]
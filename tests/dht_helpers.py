@@ -0,0 +1,20 @@
+from typing import List
+from chordlite import IPEndpointId, VirtualNetwork, create_ring
+from dht_service.dht import DHTService
+from dht_service.virtual_http import VirtualHttpNetwork
+
+
+def create_dht_network(num_nodes: int):
+    network, http = VirtualNetwork(), VirtualHttpNetwork()
+    nodes = create_ring(network, [IPEndpointId(f"10.0.0.{i}", "5555") for i in range(num_nodes)])
+    services = [DHTService(n, http, lambda body, status: (body, status), dht_port=5555)
+                for n in nodes]
+    for service in services:
+        service.activate()
+        http.register_service(f"{service.node.node_id.ip_address}:5555", service.routes)
+    return network, http, services
+
+
+def exp_replicas(services: List[DHTService], key: int) -> List[DHTService]:
+    owner = min(range(len(services)), key=lambda i: services[i].node.node_id - key)
+    return [services[(owner + i) % len(services)] for i in range(3)]
@@ -0,0 +1,147 @@
+from json import dumps, loads
+from random import Random
+from time import time, sleep
+from typing import List
+from chordlite import \
+    IPEndpointId, NetworkedChordNode, ChordRemoteEndpoint, VirtualNetwork, VirtualNodeHost
+from dht_service.dht import DHTService
+from dht_service.virtual_http import VirtualHttpNetwork
+from tests.dht_helpers import create_dht_network, exp_replicas
+
+
+def stabilize(services):
+    for _ in range(3):
+        for service in services:
+            service.node.node.stabilize()
+    for service in services:
+        service.node.node.update_finger_table()
+        service.node.cache.clear()
+
+
+def insert_keys(services, keys):
+    services[0].multi_insert(dumps({
+        "resources": [{"resource_id": k, "value": str(k)} for k in keys]
+    }).encode("utf-8"))
+    # wait for the replica writes running after the quorum was reached
+    deadline = time() + 5
+    while sum(len(s.local_data) for s in services) < 3 * len(keys) and time() < deadline:
+        sleep(0.01)
+
+
+def test_can_move_keys_to_joining_node():
+    network, http, services = create_dht_network(8)
+    keys = list(range(0, 2 ** 256, 2 ** 248))
+    insert_keys(services, keys)
+
+    node = NetworkedChordNode(IPEndpointId("10.0.1.1", "5555"), network)
+    network.register_node(node)
+    newcomer = DHTService(node, http, lambda body, status: (body, status),
+                          dht_port=5555, transfer_chunk_size=16)
+    http.register_service("10.0.1.1:5555", newcomer.routes)
+    node.node.initiate_join(ChordRemoteEndpoint(node.node_id, services[0].node.node_id, network))
+    newcomer.activate()
+    services = sorted(services + [newcomer], key=lambda s: s.node.node_id)
+    stabilize(services)
+
+    progress, = newcomer.migrate_in()
+    exp_keys = [k for k in keys if newcomer in exp_replicas(services, k)]
+    assert progress.is_done and progress.num_keys == len(exp_keys)
+    assert progress.num_chunks == (len(exp_keys) + 15) // 16
+    # the hosts the newcomer took keys over from dropped them
+    for service in services:
+        assert sorted(service.local_data) == \
+            [k for k in keys if service in exp_replicas(services, k)]
+
+    progress = loads(newcomer.transfer_progress(b""))
+    assert progress[0]["num_keys"] == len(exp_keys) and progress[0]["is_done"]
+
+
+def test_can_hand_keys_over_on_leave():
+    network, http, services = create_dht_network(8)
+    keys = list(range(0, 2 ** 256, 2 ** 248))
+    insert_keys(services, keys)
+
+    leaving = services[3]
+    leaving.leave()
+    network.nodes.pop(leaving.node.node_id)
+    http.unregister_service(f"{leaving.node.node_id.ip_address}:5555")
+    services.remove(leaving)
+    stabilize(services)
+
+    assert all(s.node.node.predecessor.node_id != leaving.node.node_id for s in services)
+    for service in services:
+        assert sorted(service.local_data) == \
+            [k for k in keys if service in exp_replicas(services, k)]
+    response = loads(services[0].multi_lookup(dumps({"resource_ids": keys}).encode("utf-8")))
+    assert len(response["resources"]) == len(keys)
+
+
+def create_vnode_service(network: VirtualNetwork, http: VirtualHttpNetwork,
+                         ip_address: str, bootstrap_id: IPEndpointId=None) -> DHTService:
+    host = VirtualNodeHost(ip_address, "5555", network, num_vnodes=8,
+                           node_options={"successor_list_size": 9})
+    network.register_host(host)
+    service = DHTService(host, http, lambda body, status: (body, status), dht_port=5555)
+    http.register_service(f"{ip_address}:5555", service.routes)
+    for vnode in host.vnodes:
+        vnode.node.initiate_join(
+            ChordRemoteEndpoint(vnode.node_id, bootstrap_id or host.node_id, vnode.sender))
+    service.activate()
+    return service
+
+
+def stabilize_hosts(services: List[DHTService]):
+    vnodes = [v for s in services for v in s.node.vnodes]
+    # successor lists grow by one node per round
+    for _ in range(9):
+        for vnode in vnodes:
+            vnode.node.stabilize()
+    for vnode in vnodes:
+        vnode.node.update_finger_table()
+        vnode.cache.clear()
+
+
+def exp_hosts(services: List[DHTService], key: int) -> List[str]:
+    # the owning vnode and the vnodes following it until there are 3 hosts
+    vnodes = sorted(v.node_id for s in services for v in s.node.vnodes)
+    owner = min(range(len(vnodes)), key=lambda i: vnodes[i] - key)
+    hosts = []
+    for i in range(len(vnodes)):
+        host = vnodes[(owner + i) % len(vnodes)].address
+        if host not in hosts and len(hosts) < 3:
+            hosts.append(host)
+    return hosts
+
+
+def assert_hosts_hold_their_keys(services: List[DHTService], keys: List[int]):
+    for service in services:
+        address = service.node.node_id.address
+        held_keys = set(service.local_data)
+        exp_keys = {k for k in keys if address in exp_hosts(services, k)}
+        num_missing, num_foreign = len(exp_keys - held_keys), len(held_keys - exp_keys)
+        assert (address, num_missing, num_foreign) == (address, 0, 0)
+
+
+def test_can_move_keys_between_vnode_hosts():
+    network, http = VirtualNetwork(), VirtualHttpNetwork()
+    services = [create_vnode_service(network, http, "10.0.0.0")]
+    services += [create_vnode_service(network, http, f"10.0.0.{i}", services[0].node.node_id)
+                 for i in range(1, 4)]
+    stabilize_hosts(services)
+    rng = Random(42)
+    keys = sorted(rng.getrandbits(256) for _ in range(1000))
+    insert_keys(services, keys)
+
+    newcomer = create_vnode_service(network, http, "10.0.1.1", services[0].node.node_id)
+    services.append(newcomer)
+    stabilize_hosts(services)
+    newcomer.migrate_in()
+    assert_hosts_hold_their_keys(services, keys)
+
+    leaving = services.pop(1)
+    leaving.leave()
+    for vnode in leaving.node.vnodes:
+        network.unregister_node(vnode.node_id)
+    http.unregister_service("10.0.0.1:5555")
+    stabilize_hosts(services)
+    assert_hosts_hold_their_keys(services, keys)
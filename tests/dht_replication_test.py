@@ -0,0 +1,78 @@
+from json import dumps, loads
+from threading import Barrier, Thread
+from chordlite import IPEndpointId, VirtualNetwork, NetworkedChordNode
+from dht_service.dht import DHTService
+from dht_service.storage import DictStorage
+from tests.dht_helpers import create_dht_network, exp_replicas
+
+
+def request(resource_id: int, **kwargs) -> bytes:
+    return dumps({"resource_id": resource_id, **kwargs}).encode("utf-8")
+
+
+def test_can_replicate_to_successors():
+    _, _, services = create_dht_network(8)
+    assert all(len(s.node.node.successor_list) == 4 for s in services)
+
+    for key in range(0, 2 ** 256, 2 ** 251):
+        services[0].insert(request(key, value=[key]))
+        # the last replica may still be written in the background
+        holders = [s for s in services if key in s.local_data]
+        assert len(holders) >= 2
+        assert all(s in exp_replicas(services, key) for s in holders)
+        for service in services:
+            assert loads(service.lookup(request(key))) == {"resource_id": key, "value": [key]}
+
+    services[3].delete(request(0))
+    for service in services:
+        _, status = service.lookup(request(0))
+        assert status == 404
+
+
+def test_can_read_after_owner_failed():
+    network, http, services = create_dht_network(8)
+    keys = list(range(0, 2 ** 256, 2 ** 250))
+    for key in keys:
+        services[0].insert(request(key, value=str(key)))
+
+    victim = services[5]
+    network.nodes.pop(victim.node.node_id)
+    http.unregister_service(f"{victim.node.node_id.ip_address}:5555")
+    victim_keys = [k for k in keys if exp_replicas(services, k)[0] is victim]
+    assert victim_keys
+
+    coordinator = services[1]
+    for key in victim_keys:
+        response = loads(coordinator.lookup(request(key)))
+        assert response["value"] == str(key)
+    for key in victim_keys:
+        coordinator.insert(request(key, value="updated"))
+        assert loads(coordinator.lookup(request(key)))["value"] == "updated"
+
+
+class BarrierStorage(DictStorage):
+    """Storage whose writes only finish once two of them are in progress."""
+    def __init__(self):
+        super().__init__()
+        self.barrier = Barrier(2, timeout=5)
+
+    def __setitem__(self, key: int, value: str):
+        self.barrier.wait()
+        super().__setitem__(key, value)
+
+
+def test_writes_of_different_keys_dont_wait_for_each_other():
+    network = VirtualNetwork()
+    node = NetworkedChordNode(IPEndpointId("10.0.0.1", "5555"), network)
+    service = DHTService(node, lambda url, body: b"{}", lambda body, status: (body, status),
+                         local_data=BarrierStorage())
+
+    writers = [Thread(target=service.store_record, args=(key, (1, False, "x")))
+               for key in (1, 2)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert not service.local_data.barrier.broken
+    assert [service.load_record(key) for key in (1, 2)] == [(1, False, "x")] * 2
+    assert service.next_version() < service.next_version()
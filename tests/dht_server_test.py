@@ -0,0 +1,68 @@
+from http.client import HTTPConnection
+from threading import Thread, Event
+from time import sleep
+from dht_service.server import PooledWSGIServer
+
+
+def test_can_reject_requests_when_queue_is_full():
+    release = Event()
+
+    def app(environ, start_response):
+        release.wait(5)
+        start_response("200 OK", [("Content-Length", "2")])
+        return [b"ok"]
+
+    server = PooledWSGIServer("127.0.0.1", 0, app, num_workers=1, max_queue_size=1)
+    server_thread = Thread(target=server.serve_forever)
+    server_thread.start()
+
+    statuses = []
+    def send_request():
+        conn = HTTPConnection("127.0.0.1", server.port, timeout=10)
+        conn.request("POST", "/lookup", body=b"{}")
+        response = conn.getresponse()
+        response.read()
+        statuses.append(response.status)
+        conn.close()
+
+    clients = [Thread(target=send_request) for _ in range(4)]
+    for client in clients:
+        client.start()
+        sleep(0.1)
+    release.set()
+    for client in clients:
+        client.join()
+    server.shutdown()
+    server_thread.join()
+
+    assert sorted(statuses) == [200, 200, 503, 503]
+    assert server.num_rejected == 2
+
+
+def test_can_finish_queued_requests_on_shutdown():
+    def app(environ, start_response):
+        sleep(0.2)
+        start_response("200 OK", [("Content-Length", "2")])
+        return [b"ok"]
+
+    server = PooledWSGIServer("127.0.0.1", 0, app, num_workers=1, max_queue_size=4)
+    server_thread = Thread(target=server.serve_forever)
+    server_thread.start()
+
+    statuses = []
+    def send_request():
+        conn = HTTPConnection("127.0.0.1", server.port, timeout=10)
+        conn.request("POST", "/lookup", body=b"{}")
+        statuses.append(conn.getresponse().status)
+        conn.close()
+
+    clients = [Thread(target=send_request) for _ in range(3)]
+    for client in clients:
+        client.start()
+    sleep(0.1)
+    server.shutdown()
+    server_thread.join()
+    for client in clients:
+        client.join()
+
+    assert statuses == [200, 200, 200]
@@ -0,0 +1,58 @@
+import os
+from dht_service.storage import DictStorage, LogStructuredStorage
+
+
+def test_can_use_storage_backends_like_dicts(tmp_path):
+    for storage in [DictStorage(), LogStructuredStorage(str(tmp_path))]:
+        storage[1] = "foo"
+        storage[2 ** 255] = "bar"
+        storage[1] = "baz"
+        assert storage[1] == "baz" and storage[2 ** 255] == "bar"
+        assert storage.pop(1, None) == "baz"
+        assert storage.pop(1, None) is None
+        assert 1 not in storage and 2 ** 255 in storage
+        assert len(storage) == 1 and list(storage) == [2 ** 255]
+        storage.close()
+
+
+def test_can_recover_data_after_restart(tmp_path):
+    storage = LogStructuredStorage(str(tmp_path), index_flush_threshold=10)
+    for key in range(100):
+        storage[key] = f"value {key}"
+    storage.flush_index()
+    for key in range(0, 100, 2):
+        del storage[key]
+    storage[1] = "updated"
+    os.fsync(storage.fd)
+
+    # simulate a crash without closing and a torn record at the end of the log
+    with open(os.path.join(str(tmp_path), "data.log"), "ab") as file:
+        file.write(b"\x00\x01\x02")
+    recovered = LogStructuredStorage(str(tmp_path))
+
+    assert recovered.index.count == 100
+    assert len(recovered) == 50
+    assert recovered[1] == "updated" and recovered[99] == "value 99"
+    assert 2 not in recovered
+    recovered.close()
+    storage.stop_event.set()
+
+
+def test_can_compact_log(tmp_path):
+    storage = LogStructuredStorage(
+        str(tmp_path), min_compaction_bytes=0, maintenance_interval_secs=60)
+    for i in range(10):
+        for key in range(50):
+            storage[key] = f"value {key} {i}"
+    size_before = storage.log_size
+    storage.compact()
+
+    assert storage.log_size < size_before / 4
+    assert storage.garbage_bytes == 0
+    assert [storage[k] for k in range(50)] == [f"value {k} 9" for k in range(50)]
+    storage[50] = "new"
+    storage.close()
+
+    reopened = LogStructuredStorage(str(tmp_path))
+    assert len(reopened) == 51 and reopened[50] == "new" and reopened[0] == "value 0 9"
+    reopened.close()
@@ -0,0 +1,97 @@
+from random import Random
+import pytest
+from chordlite import \
+    IPEndpointId, ResourceKey, VirtualNetwork, VirtualClock, ChordRequest, ChordRequestType, \
+    ServerBusy, PeerBusy, PeerUnreachable, RttTracker, create_ring
+from chordlite.failure import FailureDetector
+from chordlite.transport import monitored_sender
+from chordlite.simulation import RingSimulation, ChurnEvent, constant_latency
+
+
+def test_failure_detector_suspects_repeatedly_failing_peers():
+    clock = VirtualClock()
+    detector = FailureDetector(max_failures=2, suspicion_secs=10, clock=clock)
+    peer = ResourceKey(1, 1024)
+
+    detector.report_failure(peer)
+    assert not detector.is_suspected(peer)
+    detector.report_failure(peer)
+    assert detector.is_suspected(peer)
+    assert detector.suspects == [peer]
+
+    clock.advance(11)
+    assert not detector.is_suspected(peer)
+    detector.report_failure(peer)
+    assert not detector.is_suspected(peer)
+    detector.report_failure(peer)
+    assert detector.is_suspected(peer)
+    detector.report_success(peer)
+    assert not detector.is_suspected(peer)
+
+
+def test_failure_detector_forgets_expired_failures():
+    clock = VirtualClock()
+    detector = FailureDetector(max_failures=3, suspicion_secs=10, clock=clock)
+    departed = [ResourceKey(i, 1024) for i in range(100)]
+    for peer in departed:
+        detector.report_failure(peer)
+
+    clock.advance(11)
+    detector.report_failure(ResourceKey(500, 1024))
+    assert list(detector.failures) == [ResourceKey(500, 1024)]
+
+
+def test_only_unreachable_peers_get_suspected():
+    peer = IPEndpointId("10.0.0.1", "5555")
+    request = ChordRequest(ChordRequestType.PING, peer, peer, peer, peer)
+    detector = FailureDetector(max_failures=1)
+
+    def answer_busy(request: ChordRequest):
+        raise ServerBusy(f"{request.forward_id} is busy")
+    with pytest.raises(PeerBusy):
+        monitored_sender(answer_busy, RttTracker(), detector)(request)
+    assert not detector.is_suspected(peer)
+
+    def time_out(request: ChordRequest):
+        raise TimeoutError(f"{request.forward_id} didn't answer in time")
+    with pytest.raises(PeerUnreachable):
+        monitored_sender(time_out, RttTracker(), detector)(request)
+    assert detector.is_suspected(peer)
+
+
+def test_lookups_route_around_crashed_nodes():
+    network = VirtualNetwork()
+    node_ids = [IPEndpointId(f"10.0.0.{i}", "5555", 1 << 16) for i in range(32)]
+    nodes = create_ring(network, node_ids, location_cache_size=0)
+
+    crashed = [nodes[5], nodes[6], nodes[20]]
+    for node in crashed:
+        network.unregister_node(node.node_id)
+    live = [n for n in nodes if n not in crashed]
+
+    # lookups complete right away, even if the owner isn't known yet
+    rng = Random(42)
+    for _ in range(100):
+        rng.choice(live).lookup(ResourceKey(rng.randrange(1 << 16), 1 << 16))
+
+    for _ in range(5):
+        for node in live:
+            node.node.stabilize()
+    live_ids = sorted(n.node_id for n in live)
+    assert [n.node.successor.node_id for n in live] == live_ids[1:] + live_ids[:1]
+    for _ in range(100):
+        key = ResourceKey(rng.randrange(1 << 16), 1 << 16)
+        assert rng.choice(live).lookup(key) == min(live_ids, key=lambda n: n - key)
+
+
+def test_lookups_keep_completing_under_crash_churn():
+    sim = RingSimulation(500, latency=constant_latency(0.01))
+    sim.build_ring()
+    sim.schedule_churn([ChurnEvent(2, crashes=25), ChurnEvent(6, crashes=25)])
+    sim.schedule_lookups(50, 0, 20)
+    report = sim.run(20)
+
+    assert report.failed_lookups <= 0.02 * report.lookups
+    # at worst one timeout per route attempt on top of the hops
+    assert max(report.lookup_latencies) <= 3 * sim.network.timeout_secs + 1.0
+    assert report.convergence_secs is not None
@@ -0,0 +1,29 @@
+from random import Random
+from chordlite import ResourceKey, ChordNode
+
+
+def test_finger_index_deduplicates_fingers():
+    nodes = [ChordNode(ResourceKey(k, 1024)) for k in range(0, 1024, 256)]
+    bootstrap = nodes[0]
+    for node in nodes:
+        node.initiate_join(bootstrap)
+    for node in nodes:
+        node.update_finger_table()
+
+    assert len(nodes[0].fingers) == 10
+    assert [e.node_id.value for e in nodes[0].finger_index.endpoints] == [256, 512]
+    assert nodes[0].finger_index.distances == [256, 512]
+
+
+def test_closest_preceding_finger_matches_linear_scan():
+    rng = Random(42)
+    node = ChordNode(ResourceKey(rng.randrange(1024), 1024))
+    others = [ChordNode(ResourceKey(rng.randrange(1024), 1024)) for _ in range(8)]
+
+    for _ in range(500):
+        for i in range(len(node.fingers)):
+            node.fingers[i] = rng.choice(others + [node])
+        node.reindex_fingers()
+        key = ResourceKey(rng.randrange(1024), 1024)
+        exp_finger = max(node.fingers, key=lambda f: f.node_id - key)
+        assert node.closest_preceding_finger(key).node_id == exp_finger.node_id
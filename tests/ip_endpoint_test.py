@@ -1,4 +1,4 @@
-from chordlite import IPEndpointId
+from chordlite import IPEndpointId, EndpointRegistry
 
 
 def test_can_create_endpoint():
@@ -10,3 +10,21 @@ def test_can_use_endpoint_for_key_arithmetics():
     key = IPEndpointId("10.0.0.1", "5555", 64)
     result = key + 24
     assert result.value == 1
+
+
+def test_can_intern_endpoints():
+    registry = EndpointRegistry(max_size=2)
+    endpoint = registry.intern("10.0.0.1", 5555)
+    assert registry.intern("10.0.0.1", "5555") is endpoint
+    assert endpoint == IPEndpointId("10.0.0.1", "5555")
+    assert registry.intern("10.0.0.1", "5555", 64) is not endpoint
+
+
+def test_can_evict_least_recently_used_endpoints():
+    registry = EndpointRegistry(max_size=2)
+    first = registry.intern("10.0.0.1", "5555")
+    registry.intern("10.0.0.2", "5555")
+    registry.intern("10.0.0.1", "5555")
+    registry.intern("10.0.0.3", "5555")
+    assert len(registry) == 2
+    assert registry.intern("10.0.0.1", "5555") is first
@@ -0,0 +1,73 @@
+from chordlite import \
+    ResourceKey, IPEndpointId, ChordNode, ChordStatus, JoinAdmission, nearest_member
+
+
+def test_admission_limits_joins_in_flight_and_rate():
+    now = [0.0]
+    joiners = [ResourceKey(i, 1024) for i in range(4)]
+    pending = JoinAdmission(max_pending=2, join_timeout_secs=5.0, clock=lambda: now[0])
+    assert pending.try_admit(joiners[0]) and pending.try_admit(joiners[1])
+    assert not pending.try_admit(joiners[2])
+    pending.release(joiners[0])
+    assert pending.try_admit(joiners[2])
+    assert pending.num_rejected == 1
+
+    # joiners that never confirmed their join stop counting after the timeout
+    now[0] += 5.0
+    assert pending.try_admit(joiners[3]) and pending.pending == 1
+
+    rate = JoinAdmission(rate_per_sec=2.0, burst=2, clock=lambda: now[0])
+    for joiner in joiners[:2]:
+        assert rate.try_admit(joiner)
+        rate.release(joiner)
+    assert not rate.try_admit(joiners[2])
+    now[0] += 0.5
+    assert rate.try_admit(joiners[2])
+    assert not rate.try_admit(joiners[3])
+    assert rate.num_rejected == 2
+
+
+def test_admitted_joins_count_until_the_joiner_confirmed_them():
+    admission = JoinAdmission(max_pending=1)
+    n1 = ChordNode(ResourceKey(0, 1024), admission=admission)
+    n2 = ChordNode(ResourceKey(100, 1024))
+    n1.initiate_join(n1)
+    n2.initiate_join(n1)
+    assert admission.pending == 0 and n2.successor.node_id == n1.node_id
+
+    # a joiner that didn't confirm its join yet keeps further joiners away
+    n3 = ChordNode(ResourceKey(200, 1024))
+    assert n1.challenge_join(n3)[0] == ChordStatus.SUCCESS and admission.pending == 1
+    assert n1.challenge_join(ChordNode(ResourceKey(300, 1024)))[0] == ChordStatus.BUSY
+    n1.notify_predecessor(n3)
+    assert admission.pending == 0
+
+
+def test_busy_nodes_turn_joins_away_until_the_joiner_backed_off():
+    now = [0.0]
+    backoffs = []
+    def sleep(secs: float):
+        backoffs.append(secs)
+        now[0] += 1.0
+
+    admission = JoinAdmission(rate_per_sec=1.0, burst=1, clock=lambda: now[0])
+    n1 = ChordNode(ResourceKey(0, 1024), admission=admission)
+    n2 = ChordNode(ResourceKey(100, 1024), sleep=sleep)
+    n3 = ChordNode(ResourceKey(200, 1024), sleep=sleep)
+    n1.initiate_join(n1)
+    n2.initiate_join(n1)
+    n3.initiate_join(n1)
+
+    assert len(backoffs) == 1 and admission.num_rejected == 1
+    assert n1.successor == n2 and n2.successor == n3 and n3.successor == n1
+    assert n1.predecessor == n3 and admission.pending == 0
+
+
+def test_nodes_bootstrap_through_the_nearest_preceding_member():
+    members = [IPEndpointId(f"10.0.0.{i}", "5555") for i in range(8)]
+    by_position = sorted(members, key=lambda m: m.value)
+    for i, member in enumerate(by_position):
+        joining = member + 1
+        others = set(members) - {member}
+        assert nearest_member(joining, set(members)) == member
+        assert nearest_member(joining, others) == by_position[i - 1]
@@ -1,4 +1,4 @@
-from chordlite import ResourceKey
+from chordlite import ResourceKey, ring_distance, in_interval
 
 
 def test_can_init_overflow_key():
@@ -39,3 +39,28 @@ def test_can_compare_lt_gt():
 
 def test_can_compare_within_range():
     assert ResourceKey(10, 128) < ResourceKey(13, 128) < ResourceKey(14, 128)
+
+
+def test_key_is_immutable():
+    key = ResourceKey(10, 128)
+    try:
+        key.value = 11
+        assert False
+    except AttributeError:
+        assert key.value == 10
+
+
+def test_can_compute_ring_distance():
+    assert ring_distance(10, 13, 128) == 3
+    assert ring_distance(13, 10, 128) == 125
+    assert ring_distance(10, 10, 128) == 0
+
+
+def test_can_check_interval_membership():
+    assert in_interval(11, 10, 13, 128)
+    assert not in_interval(13, 10, 13, 128)
+    assert in_interval(13, 10, 13, 128, inclusive=True)
+    assert in_interval(2, 120, 5, 128)
+    assert not in_interval(10, 10, 13, 128, inclusive=True)
+    assert in_interval(10, 10, 10, 128, inclusive=True)
+    assert not in_interval(10, 10, 10, 128)
@@ -0,0 +1,70 @@
+from chordlite import LocationCache, ResourceKey
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_can_resolve_keys_of_cached_arcs():
+    cache = LocationCache(1024)
+    cache.put(100, ResourceKey(200, 1024))
+    cache.put(900, ResourceKey(50, 1024))
+
+    assert cache.get(ResourceKey(150, 1024)) == ResourceKey(200, 1024)
+    assert cache.get(ResourceKey(200, 1024)) == ResourceKey(200, 1024)
+    assert cache.get(ResourceKey(1000, 1024)) == ResourceKey(50, 1024)
+    assert cache.get(ResourceKey(10, 1024)) == ResourceKey(50, 1024)
+    assert cache.get(ResourceKey(100, 1024)) is None
+    assert cache.get(ResourceKey(500, 1024)) is None
+    assert (cache.hits, cache.misses) == (4, 2)
+
+
+def test_can_evict_expired_and_least_recently_used_arcs():
+    clock = FakeClock()
+    cache = LocationCache(1024, max_entries=2, ttl_secs=10, clock=clock)
+    cache.put(0, ResourceKey(100, 1024))
+    cache.put(100, ResourceKey(200, 1024))
+    cache.get(ResourceKey(50, 1024))
+    cache.put(200, ResourceKey(300, 1024))
+
+    assert cache.get(ResourceKey(150, 1024)) is None
+    assert cache.get(ResourceKey(50, 1024)) == ResourceKey(100, 1024)
+    clock.now = 10
+    assert cache.get(ResourceKey(250, 1024)) is None
+    assert len(cache) == 1
+
+
+def test_can_invalidate_outdated_arcs():
+    cache = LocationCache(1024)
+    cache.put(0, ResourceKey(100, 1024))
+    cache.put(100, ResourceKey(200, 1024))
+    cache.put(200, ResourceKey(300, 1024))
+
+    # a node joined at 150, so the arc it splits is outdated
+    cache.invalidate(150)
+    assert cache.get(ResourceKey(120, 1024)) is None
+    assert cache.get(ResourceKey(50, 1024)) == ResourceKey(100, 1024)
+
+    # a newly resolved arc replaces the arcs of nodes it skips
+    cache.put(0, ResourceKey(300, 1024))
+    assert len(cache) == 1
+    assert cache.get(ResourceKey(50, 1024)) == ResourceKey(300, 1024)
+
+
+def test_can_replace_arcs_overlapping_new_ones():
+    cache = LocationCache(1024)
+    cache.put(100, ResourceKey(300, 1024))
+    cache.put(800, ResourceKey(50, 1024))
+
+    # nodes joined at 200 and 1000, so the arcs spanning them are outdated
+    cache.put(100, ResourceKey(200, 1024))
+    cache.put(900, ResourceKey(1000, 1024))
+    assert len(cache) == 2
+    assert cache.get(ResourceKey(250, 1024)) is None
+    assert cache.get(ResourceKey(20, 1024)) is None
+    assert cache.get(ResourceKey(150, 1024)) == ResourceKey(200, 1024)
+    assert cache.get(ResourceKey(950, 1024)) == ResourceKey(1000, 1024)
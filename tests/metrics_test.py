@@ -0,0 +1,102 @@
+from json import dumps
+from random import Random
+from chordlite import \
+    IPEndpointId, ResourceKey, VirtualNetwork, NetworkedChordNode, MetricsRegistry, create_ring
+from dht_service.dht import DHTService
+from dht_service.virtual_http import VirtualHttpNetwork
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    messages = registry.counter("messages_total", "Messages sent.", ("type",))
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    peers = registry.gauge("peers", "Known peers.", ("node",))
+    messages.inc("PING")
+    messages.inc("PING", amount=2)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5.0)
+    peers.collect_from(lambda: [(("a\"b",), 3)])
+    peers.collect_from(lambda: [(("a\"b",), 2)])
+
+    assert registry.counter("messages_total", "Messages sent.", ("type",)) is messages
+    assert registry.render().split("\n") == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 5.55",
+        "latency_seconds_count 3",
+        "# HELP messages_total Messages sent.",
+        "# TYPE messages_total counter",
+        'messages_total{type="PING"} 3',
+        "# HELP peers Known peers.",
+        "# TYPE peers gauge",
+        'peers{node="a\\"b"} 5',
+        ""
+    ]
+
+
+def test_nodes_report_chord_and_dht_metrics():
+    registry = MetricsRegistry()
+    http = VirtualHttpNetwork()
+    node_ids = [IPEndpointId(f"10.0.0.{i}", "5555") for i in range(8)]
+    nodes = create_ring(VirtualNetwork(), node_ids, iterative_lookup=True, metrics=registry)
+    services = [DHTService(n, http, lambda body, status: (body, status), dht_port=5555,
+                           metrics=registry)
+                for n in nodes]
+    for service in services:
+        service.activate()
+        http.register_service(f"{service.node.node_id.ip_address}:5555", service.routes)
+
+    rng = Random(42)
+    for i in range(20):
+        body = dumps({"resource_id": rng.randrange(2**64), "value": i}).encode("utf-8")
+        services[i % len(services)].routes["/insert"](body)
+
+    metrics = nodes[0].chord_metrics
+    assert metrics.messages.value("JOIN") > 0
+    assert metrics.messages.value("FIND_SUCC_BATCH") > 0
+    assert metrics.lookup_hops.count() > 0
+    assert metrics.finger_changes.value() > 0
+    assert metrics.ring_changes.value() > 0
+    assert metrics.join_lock_wait_secs.count() > 0
+    assert registry.counter("dht_requests_total", "", ("route",)).value("/insert") == 20
+
+    text = registry.render()
+    assert 'chord_messages_total{type="NEXT_HOP"}' in text
+    rtt_lines = [line for line in text.split("\n") if line.startswith("chord_peer_rtt")]
+    assert 0 < len(rtt_lines) <= len(nodes)
+    assert f'chord_peer_rtt_seconds{{peer="{nodes[1].node_id.address}"}}' in text
+    assert 'dht_request_seconds_count{route="/insert"} 20' in text
+
+
+def test_recursive_lookups_report_their_hops():
+    registry = MetricsRegistry()
+    nodes = create_ring(
+        VirtualNetwork(), [IPEndpointId(f"10.0.0.{i}", "5555") for i in range(16)],
+        metrics=registry)
+    hops = nodes[0].chord_metrics.lookup_hops
+    rng = Random(42)
+    keys = [ResourceKey(rng.getrandbits(256)) for _ in range(50)]
+
+    hops.counts.clear()
+    hops.sums.clear()
+    for key in keys:
+        nodes[0].node.find_successor(key)
+    # only the node starting a lookup observes it, with the hops of the whole route
+    assert hops.count() == len(keys)
+    recursive_hops = hops.sums[()]
+
+    hops.sums.clear()
+    nodes[0].node.iterative_lookup = True
+    for key in keys:
+        nodes[0].node.find_successor(key)
+    assert recursive_hops == hops.sums[()] > 0
+
+
+def test_nodes_without_registry_skip_metrics():
+    node = NetworkedChordNode(IPEndpointId("10.0.0.1", "5555"), VirtualNetwork())
+    assert node.chord_metrics is None and node.node.metrics is None
+    node.lookup(ResourceKey(42, node.node_id.keyspace))
@@ -1,8 +1,10 @@
 from typing import List
+from time import time, sleep
 from threading import Thread
+import pytest
 from chordlite import \
-    IPEndpointId, ChordNode, VirtualNetwork, \
-    NetworkedChordNode, ChordRemoteEndpoint
+    IPEndpointId, ChordNode, VirtualNetwork, ResourceKey, \
+    NetworkedChordNode, ChordRemoteEndpoint, ChordRequestType
 
 
 def test_can_init_network_over_sync_virtual_network():
@@ -35,7 +37,9 @@ def test_can_init_network_over_sync_virtual_network():
 
 def test_can_init_network_over_parallel_virtual_network():
     network = VirtualNetwork()
-    nodes = [NetworkedChordNode(IPEndpointId(f"10.0.0.{key}", "5555", 1 << 14), network)
+    nodes = [NetworkedChordNode(IPEndpointId(f"10.0.0.{key}", "5555", 1 << 14), network,
+                                finger_update_interval_secs=0.05,
+                                finger_update_jitter_secs=0.05)
              for key in range(128)]
     nodes = sorted(nodes, key=lambda n: n.node_id)
     assert len(set([n.node_id for n in nodes])) == 128
@@ -47,9 +51,7 @@ def test_can_init_network_over_parallel_virtual_network():
         network.register_node(node)
 
     bootstrap_id = min([n.node_id for n in nodes])
-    bootstrap_endpoints = [ChordRemoteEndpoint(n.node_id, bootstrap_id, network) for n in nodes]
-    threads = [Thread(target=lambda: n.join_network(b))
-               for n, b in zip(nodes, bootstrap_endpoints)]
+    threads = [Thread(target=n.join_network, args=(bootstrap_id,)) for n in nodes]
     for thread in threads:
         thread.start()
     for thread in threads:
@@ -58,6 +60,138 @@ def test_can_init_network_over_parallel_virtual_network():
     exp_succs = nodes[1:] + [nodes[0]]
     exp_preds = [nodes[-1]] + nodes[:-1]
     exp_fingers = [f.node_id for n in nodes for f in exp_fingers_of_node(n.node)]
+
+    def is_converged() -> bool:
+        return [n.node.successor.node_id for n in nodes] == [n.node_id for n in exp_succs] \
+            and [n.node.predecessor.node_id for n in nodes] == [n.node_id for n in exp_preds] \
+            and [f.node_id for n in nodes for f in n.node.fingers] == exp_fingers
+
+    deadline = time() + 60
+    while not is_converged() and time() < deadline:
+        sleep(0.1)
+    for node in nodes:
+        node.shutdown()
+
     assert [n.node.successor.node_id for n in nodes] == [n.node_id for n in exp_succs]
     assert [n.node.predecessor.node_id for n in nodes] == [n.node_id for n in exp_preds]
     assert [f.node_id for n in nodes for f in n.node.fingers] == exp_fingers
+
+
+def test_can_lookup_iteratively_over_virtual_network():
+    request_types = []
+    network = VirtualNetwork(logger=lambda m: request_types.append(m.request_type))
+    nodes = [NetworkedChordNode(IPEndpointId(f"10.0.0.{key}", "5555", 1 << 14),
+                                network, iterative_lookup=True)
+             for key in range(32)]
+    nodes = sorted(nodes, key=lambda n: n.node_id)
+    for node in nodes:
+        network.register_node(node)
+
+    bootstrap_id = min([n.node_id for n in nodes])
+    for node in nodes:
+        node.node.initiate_join(ChordRemoteEndpoint(node.node_id, bootstrap_id, network))
+    for node in nodes:
+        node.node.update_finger_table()
+
+    request_types.clear()
+    for key in range(0, 1 << 14, 97):
+        exp_owner = min(nodes, key=lambda n: n.node_id - key).node_id
+        assert nodes[0].lookup(ResourceKey(key, 1 << 14)) == exp_owner
+    assert ChordRequestType.FIND_PRED not in request_types
+    assert ChordRequestType.NEXT_HOP in request_types
+
+
+def test_can_resolve_many_keys_in_batches():
+    request_types = []
+    network = VirtualNetwork(logger=lambda m: request_types.append(m.request_type))
+    nodes = [NetworkedChordNode(IPEndpointId(f"10.0.0.{key}", "5555", 1 << 14), network,
+                                location_cache_size=0)
+             for key in range(64)]
+    nodes = sorted(nodes, key=lambda n: n.node_id)
+    for node in nodes:
+        network.register_node(node)
+
+    bootstrap_id = min([n.node_id for n in nodes])
+    for node in nodes:
+        node.node.initiate_join(ChordRemoteEndpoint(node.node_id, bootstrap_id, network))
+    for node in nodes:
+        node.node.update_finger_table()
+
+    keys = [ResourceKey(key, 1 << 14) for key in range(0, 1 << 14, 7)]
+    request_types.clear()
+    owners = nodes[0].lookup_many(keys)
+    num_batch_messages = len(request_types)
+
+    request_types.clear()
+    assert owners == [nodes[0].lookup(key) for key in keys]
+    assert num_batch_messages * 20 < len(request_types)
+
+
+def test_can_detect_stale_cached_owners():
+    request_types = []
+    network = VirtualNetwork(logger=lambda m: request_types.append(m.request_type))
+    nodes = [NetworkedChordNode(IPEndpointId(f"10.0.0.{key}", "5555", 1 << 14), network)
+             for key in range(32)]
+    nodes = sorted(nodes, key=lambda n: n.node_id)
+    for node in nodes:
+        network.register_node(node)
+    newcomer, nodes = nodes[16], nodes[:16] + nodes[17:]
+
+    bootstrap_id = nodes[0].node_id
+    for node in nodes:
+        node.node.initiate_join(ChordRemoteEndpoint(node.node_id, bootstrap_id, network))
+    for node in nodes:
+        node.node.update_finger_table()
+
+    key = ResourceKey(newcomer.node_id.value, 1 << 14)
+    client, pred, owner = nodes[0], nodes[15], nodes[16]
+    assert client.lookup(key) == owner.node_id
+    assert pred.lookup(key) == owner.node_id
+    request_types.clear()
+    assert client.lookup(key) == owner.node_id
+    assert not request_types and client.cache.hits == 1
+
+    newcomer.node.initiate_join(ChordRemoteEndpoint(newcomer.node_id, bootstrap_id, network))
+    # the predecessor saw the ring change, the far away client still has the stale owner
+    assert pred.lookup(key) == newcomer.node_id
+    assert client.lookup(key) == owner.node_id
+    with pytest.raises(LookupError):
+        client.owner_replicas(owner.node_id, 3, key)
+    client.invalidate_location(key)
+    assert client.lookup(key) == newcomer.node_id
+
+
+def test_can_resolve_keys_of_truncated_batches_one_by_one():
+    nodes = [ChordNode(ResourceKey(k, 1024)) for k in range(0, 1024, 64)]
+    for node in nodes:
+        node.initiate_join(nodes[0])
+    for node in nodes:
+        node.update_finger_table()
+    truncating = nodes[8]
+    find_successors = truncating.find_successors
+    truncating.find_successors = lambda keys: find_successors(keys)[:1]
+
+    keys = [ResourceKey(k, 1024) for k in range(600, 1000, 50)]
+    successors = nodes[0].find_successors(keys)
+    assert [s.node_id for s in successors] == \
+        [nodes[0].find_successor(key).node_id for key in keys]
+
+
+def test_founder_stays_linked_when_joining_through_a_later_node():
+    network = VirtualNetwork()
+    b, a, c = sorted([NetworkedChordNode(IPEndpointId(f"10.0.0.{i}", "5555"), network)
+                      for i in range(3)], key=lambda n: n.node_id)
+    for node in (a, b, c):
+        network.register_node(node)
+
+    # a and c join through b, then b asks a for the ring it already founded
+    b.node.initiate_join(ChordRemoteEndpoint(b.node_id, b.node_id, b.sender))
+    a.node.initiate_join(ChordRemoteEndpoint(a.node_id, b.node_id, a.sender))
+    c.node.initiate_join(ChordRemoteEndpoint(c.node_id, b.node_id, c.sender))
+    b.node.initiate_join(ChordRemoteEndpoint(b.node_id, a.node_id, b.sender))
+    for _ in range(3):
+        for node in (a, b, c):
+            node.node.stabilize()
+
+    assert [n.node.successor.node_id for n in (b, a, c)] == [a.node_id, c.node_id, b.node_id]
+    assert [n.node.predecessor.node_id for n in (b, a, c)] == [c.node_id, b.node_id, a.node_id]
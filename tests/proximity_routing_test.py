@@ -0,0 +1,85 @@
+from random import Random
+from threading import current_thread
+from typing import List, Optional
+from chordlite import \
+    IPEndpointId, ResourceKey, RttTracker, VirtualClock, VirtualNetwork, \
+    ChordRequestType, create_ring
+
+
+def test_rtt_tracker_averages_and_expires_estimates():
+    clock = VirtualClock()
+    tracker = RttTracker(alpha=0.5, max_age_secs=10, clock=clock)
+    peer = ResourceKey(1, 1024)
+    assert tracker.estimate(peer) is None
+
+    tracker.observe(peer, 0.1)
+    tracker.observe(peer, 0.3)
+    assert abs(tracker.estimate(peer) - 0.2) < 1e-9
+    assert abs(tracker.mean_rtt() - 0.2) < 1e-9
+
+    clock.advance(11)
+    assert tracker.estimate(peer) is None
+
+    tracker.observe(ResourceKey(2, 1024), 0.1)
+    assert list(tracker.estimates) == [ResourceKey(2, 1024)]
+
+
+def region_latency(sender: Optional[IPEndpointId], receiver: IPEndpointId) -> float:
+    if sender is None:
+        return 0.0
+    same_region = sender.ip_address.split(".")[2] == receiver.ip_address.split(".")[2]
+    return 0.002 if same_region else 0.05
+
+
+def mean_lookup_latency(num_nodes: int, **node_options) -> float:
+    keyspace = 1 << 20
+    network = VirtualNetwork(latency=region_latency)
+    node_ids = [IPEndpointId(f"10.0.{i % 4}.{i // 4}", "5555", keyspace)
+                for i in range(num_nodes)]
+    nodes = create_ring(network, node_ids, location_cache_size=0, successor_list_size=8,
+                        clock=network.clock, rtt_max_age_secs=float("inf"), **node_options)
+    # the first pass probes the candidates of unknown RTT in the background
+    for _ in range(2):
+        for node in nodes:
+            node.node.fix_fingers(len(node.node.fingers))
+            node.prober.drain()
+
+    rng = Random(42)
+    sorted_ids: List[IPEndpointId] = sorted(node_ids)
+    latencies = []
+    for _ in range(200):
+        node = rng.choice(nodes)
+        key = ResourceKey(rng.randrange(keyspace), keyspace)
+        start = network.clock()
+        owner_id = node.lookup(key)
+        latencies.append(network.clock() - start)
+        assert owner_id == min(sorted_ids, key=lambda n: n - key)
+    return sum(latencies) / len(latencies)
+
+
+def test_proximity_routing_lowers_lookup_latency():
+    baseline = mean_lookup_latency(64)
+    proximity = mean_lookup_latency(64, pns_candidates=8, proximity_hops=3)
+    assert proximity < 0.8 * baseline
+
+
+def test_finger_candidates_get_probed_in_the_background():
+    ping_threads = []
+    network = VirtualNetwork(latency=region_latency, logger=lambda m: ping_threads.append(
+        current_thread()) if m.request_type == ChordRequestType.PING else None)
+    node_ids = [IPEndpointId(f"10.0.{i % 4}.{i // 4}", "5555", 1 << 20) for i in range(32)]
+    nodes = create_ring(network, node_ids, successor_list_size=8, pns_candidates=8)
+
+    ping_threads.clear()
+    nodes[0].node.fix_fingers(len(nodes[0].node.fingers))
+    nodes[0].prober.drain()
+    assert ping_threads and current_thread() not in ping_threads
+    assert not nodes[0].prober.pending
+
+
+def test_rtts_are_only_sampled_for_proximity_routing():
+    node_ids = [IPEndpointId(f"10.0.{i % 4}.{i // 4}", "5555", 1 << 20) for i in range(16)]
+    plain = create_ring(VirtualNetwork(), node_ids)
+    proximity = create_ring(VirtualNetwork(), node_ids, proximity_hops=3)
+    assert all(not node.rtt.estimates for node in plain)
+    assert any(node.rtt.estimates for node in proximity)
@@ -0,0 +1,55 @@
+from math import log2
+from chordlite.simulation import \
+    RingSimulation, ChurnEvent, PartitionModel, constant_latency
+
+
+def test_can_simulate_lookups_on_a_stable_ring():
+    sim = RingSimulation(1000, latency=constant_latency(0.01))
+    sim.build_ring()
+    sim.schedule_lookups(100, 0, 5)
+    report = sim.run(5)
+
+    assert report.num_nodes == 1000
+    assert report.lookups == 500
+    assert report.failed_lookups == 0 and report.wrong_lookups == 0
+    assert sum(report.hop_counts.values()) == 500
+    assert report.mean_hops <= log2(1000)
+    assert report.messages["NEXT_HOP"] > 0
+    assert report.convergence_secs == 0.0
+
+
+def test_ring_converges_after_churn():
+    sim = RingSimulation(200)
+    sim.build_ring()
+    sim.schedule_churn([ChurnEvent(2, joins=20), ChurnEvent(4, leaves=10)])
+    sim.schedule_lookups(20, 10, 15)
+    report = sim.run(15)
+
+    assert report.num_nodes == 210
+    assert report.convergence_secs is not None
+    assert sim.is_converged()
+
+
+def test_partition_and_message_loss_fail_lookups():
+    sim = RingSimulation(200, partition=PartitionModel(start_secs=2, end_secs=4))
+    sim.build_ring()
+    sim.schedule_lookups(50, 0, 6)
+    report = sim.run(6)
+    assert report.dropped_messages > 0
+    assert 0 < report.failed_lookups < report.lookups
+
+    lossy = RingSimulation(200, loss_rate=0.1)
+    lossy.build_ring()
+    lossy.schedule_lookups(50, 0, 2)
+    assert lossy.run(2).failed_lookups > 0
+
+
+def test_nodes_and_network_share_the_simulated_clock():
+    sim = RingSimulation(200, latency=constant_latency(0.01))
+    sim.build_ring()
+    sim.schedule_lookups(20, 0, 10)
+    report = sim.run(10)
+
+    clocks = {node.clock() for node in sim.nodes.values()} | {sim.network.clock()}
+    assert clocks == {10.0}
+    assert 0 < max(report.lookup_latencies) <= 0.02 * log2(200) + 0.1
@@ -75,3 +75,27 @@ def test_can_init_arbitrary_large_network_unordered():
     assert [n.successor.node_id for n in nodes] == [n.node_id for n in exp_succs]
     assert [n.predecessor.node_id for n in nodes] == [n.node_id for n in exp_preds]
     assert [f.node_id for n in nodes for f in n.fingers] == exp_fingers
+
+
+def test_can_converge_by_stabilization_rounds():
+    nodes = [ChordNode(ResourceKey(k, 1024)) for k in range(0, 1024, 8)]
+    join_sequence = list(range(len(nodes)))
+    shuffle(join_sequence)
+
+    def exp_fingers_of_node(node: ChordNode) -> List[ChordNode]:
+        return [min(nodes, key=lambda f: f.node_id - s) for s in node.finger_starts]
+
+    bootstrap = min(nodes, key=lambda n: n.node_id)
+    for i in join_sequence:
+        nodes[i].initiate_join(bootstrap)
+    for _ in range(3):
+        for node in nodes:
+            node.stabilize()
+            node.fix_fingers(4)
+
+    exp_succs = nodes[1:] + [nodes[0]]
+    exp_preds = [nodes[-1]] + nodes[:-1]
+    exp_fingers = [f.node_id for n in nodes for f in exp_fingers_of_node(n)]
+    assert [n.successor.node_id for n in nodes] == [n.node_id for n in exp_succs]
+    assert [n.predecessor.node_id for n in nodes] == [n.node_id for n in exp_preds]
+    assert [f.node_id for n in nodes for f in n.fingers] == exp_fingers
@@ -0,0 +1,63 @@
+from json import dumps
+from chordlite import \
+    IPEndpointId, ResourceKey, VirtualNetwork, Tracer, JsonlSpanSink, create_ring
+from chordlite.tracing import read_spans, format_trace
+from dht_service.dht import DHTService
+from dht_service.virtual_http import VirtualHttpNetwork
+
+
+def create_traced_ring(num_nodes: int, tracer: Tracer):
+    node_ids = [IPEndpointId(f"10.0.0.{i}", "5555") for i in range(num_nodes)]
+    return create_ring(VirtualNetwork(), node_ids, location_cache_size=0, tracer=tracer)
+
+
+def test_recursive_lookup_records_a_span_per_hop():
+    spans = []
+    tracer = Tracer(spans.append, sample_rate=0.0)
+    nodes = create_traced_ring(16, tracer)
+
+    # unsampled requests don't carry a trace context
+    nodes[0].lookup(ResourceKey(nodes[8].node_id.value, nodes[0].node_id.keyspace))
+    assert not spans
+
+    tracer.sample_rate = 1.0
+    root = tracer.start_trace("test", "client")
+    owner_id = nodes[0].lookup(nodes[8].node_id - 1)
+    tracer.finish(root)
+    assert owner_id == nodes[8].node_id
+
+    hops = [span for span in spans if span.name == "chord/FIND_PRED"]
+    assert hops and all(span.trace_id == root.trace_id for span in spans)
+    # every hop forwards the lookup to the next one, so the spans form a chain
+    lookup = next(span for span in spans if span.name == "chord/lookup")
+    parent = lookup
+    for _ in hops:
+        child = next(span for span in hops if span.parent_id == parent.span_id)
+        assert parent.start_secs <= child.start_secs <= child.end_secs <= parent.end_secs
+        parent = child
+    assert parent.node == str(nodes[7].node_id)
+
+
+def test_traced_dht_requests_span_replicas(tmp_path):
+    sink = JsonlSpanSink(str(tmp_path / "spans.jsonl"))
+    tracer = Tracer(sink, sample_rate=1.0)
+    nodes = create_traced_ring(8, tracer)
+    http = VirtualHttpNetwork()
+    services = [DHTService(n, http, lambda body, status: (body, status), dht_port=5555,
+                           tracer=tracer)
+                for n in nodes]
+    for service in services:
+        service.activate()
+        http.register_service(f"{service.node.node_id.ip_address}:5555", service.routes)
+
+    body = dumps({"resource_id": 42, "value": "x"}).encode("utf-8")
+    assert services[0].routes["/insert"](body) == body
+    sink.close()
+
+    spans = read_spans([str(tmp_path / "spans.jsonl")])
+    names = {span.name for span in spans}
+    assert {"dht/insert", "dht/forward/mput", "dht/replica/mput"} <= names
+    assert len({span.trace_id for span in spans}) == 1
+    lines = format_trace(spans)
+    assert lines[0].startswith(f"dht/insert @ {nodes[0].node_id}")
+    assert any(line.startswith("    dht/replica/mput") for line in lines)
@@ -0,0 +1,52 @@
+from chordlite import \
+    IPEndpointId, ResourceKey, VirtualNetwork, VirtualNodeHost, JSON_CODEC, BINARY_CODEC, \
+    ChordResponse
+from chordlite.key import SHA256_KEYSPACE
+
+
+def test_vnodes_take_distinct_ring_positions():
+    host = VirtualNodeHost("10.0.0.1", "5555", VirtualNetwork(), num_vnodes=4)
+    assert host.node_id == IPEndpointId("10.0.0.1", "5555")
+    assert len(set(v.node_id.value for v in host.vnodes)) == 4
+    assert all(v.node_id.address == "10.0.0.1:5555" for v in host.vnodes)
+
+    big_host = VirtualNodeHost.weighted("10.0.0.2", "5555", VirtualNetwork(), 2.5, 4)
+    assert len(big_host.vnodes) == 10
+
+
+def test_can_transmit_vnode_endpoints():
+    orig_response = ChordResponse(
+        IPEndpointId("10.0.0.2", "5555", vnode=3),
+        IPEndpointId("dht-node", "5555", vnode=300),
+        IPEndpointId("::1", "5555"),
+        successor_ids=[IPEndpointId("10.0.0.4", "5555", vnode=i) for i in range(3)]
+    )
+    for codec in [JSON_CODEC, BINARY_CODEC]:
+        ser_response = codec.serialize_response(orig_response)
+        deser_response = codec.deserialize_response(ser_response, SHA256_KEYSPACE)
+        assert orig_response == deser_response
+        assert deser_response.successor_id.vnode == 300
+
+
+def test_can_route_between_vnode_hosts():
+    network = VirtualNetwork()
+    hosts = [VirtualNodeHost(f"10.0.0.{i}", "5555", network, num_vnodes=4) for i in range(8)]
+    for host in hosts:
+        network.register_host(host)
+    for host in hosts:
+        host.join_network(hosts[0].node_id)
+    vnodes = [v for host in hosts for v in host.vnodes]
+    for vnode in vnodes:
+        vnode.shutdown()
+    for _ in range(3):
+        for vnode in vnodes:
+            vnode.node.stabilize()
+    for vnode in vnodes:
+        vnode.node.update_finger_table()
+
+    for key in range(0, 2 ** 256, 2 ** 250):
+        exp_owner = min(vnodes, key=lambda v: v.node_id - key).node_id
+        assert hosts[3].lookup(ResourceKey(key)) == exp_owner
+        replicas = hosts[5].owner_replicas(exp_owner, 3)
+        assert replicas[0] == exp_owner
+        assert len(set(r.address for r in replicas)) == 3